@@ -0,0 +1,122 @@
+"""
+Deep Analysis Cascade - Cheap checks before the full agent
+Runs known-content lookup, local forensics and the remote classifier ahead of
+the LLM agent; when one of them is confident enough, /analyze answers from it
+directly. Classifier responses are cached by hf_client, so falling through to
+the agent does not pay for the classifier twice.
+"""
+import asyncio
+from typing import Awaitable, Dict, Optional, Tuple
+import logging
+
+from app.agents.text_agent import detect_ai_text
+from app.agents.image_agent import detect_deepfake_image
+from app.agents.audio_agent import detect_deepfake_audio
+from app.agents.video_agent import detect_deepfake_video
+from app.core.cascade import CascadeRun
+from app.core.config import settings
+from app.core.forensics import get_forensics
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_TOOLS = {
+    "text": detect_ai_text,
+    "image": detect_deepfake_image,
+    "audio": detect_deepfake_audio,
+    "video": detect_deepfake_video
+}
+
+# Time allowed on top of FORENSICS_TIME_BUDGET_SECONDS for the rest of the image checks
+FORENSICS_STAGE_MARGIN_SECONDS = 2.0
+
+
+def parse_tool_result(raw: str) -> Optional[Tuple[str, float]]:
+    """'Label|0.93' -> ('Label', 0.93); None for errors and unusable ("Unknown ...") results"""
+    label, sep, score = raw.rpartition("|")
+    if not sep or not label or label.startswith(("Error", "Unknown")):
+        return None
+    try:
+        return label, float(score)
+    except ValueError:
+        return None
+
+
+def _report(stage: str, label: str, confidence: float, details: str) -> str:
+    """Markdown report for an answer produced before the agent stage"""
+    return (
+        f"**🔍 Fast-Path Analysis**\n\n"
+        f"**Result:** {label}  \n"
+        f"**Confidence:** {int(round(confidence * 100))}%  \n"
+        f"**Decided by:** {stage.replace('_', ' ')}\n\n"
+        f"{details}\n\n"
+        f"Full agent reasoning was skipped because this stage was confident enough."
+    )
+
+
+async def _image_checks(content: str, cascade: CascadeRun) -> Optional[Dict]:
+    """Known-image lookup and pixel forensics (local, no network)"""
+    forensics = get_forensics()
+    budget = settings.FORENSICS_TIME_BUDGET_SECONDS
+    try:
+        # Pixel forensics stops itself at the budget; the margin covers decoding, EXIF and hashing
+        result = await asyncio.wait_for(
+            asyncio.to_thread(forensics.analyze_image, content, budget),
+            budget + FORENSICS_STAGE_MARGIN_SECONDS
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Image checks exceeded their time budget; continuing with the classifier")
+        return None
+    if "error" in result:
+        return None
+
+    matches = forensics.lookup_known_hashes(result.get("hashes", {}))
+    if cascade.check("exact_match", 1.0 if matches else None):
+        source = matches[0].get("description") or matches[0].get("source") or "known manipulated image"
+        return {"stage": "exact_match", "label": "Fake", "confidence": 1.0,
+                "details": f"Perceptual hash matches a known manipulated image ({source})."}
+
+    # Forensics can only confirm manipulation, never authenticity
+    score = result.get("manipulation_score", 0.0) if result.get("manipulation_detected") else None
+    if cascade.check("forensics", score):
+        return {"stage": "forensics", "label": "Fake", "confidence": score,
+                "details": "Pixel-level forensics (error level, noise residual, copy-move) found strong manipulation evidence."}
+    return None
+
+
+async def run_deep_cascade(content: str, content_type: str,
+                           classifier: Optional[Awaitable[str]] = None) -> Optional[Dict]:
+    """
+    Run the pre-agent stages for a content type
+
+    Args:
+        classifier: Classifier tool output already being computed for this content
+            (e.g. by a multimodal branch); awaited instead of calling the tool again
+
+    Returns:
+        {"stage", "label", "confidence", "report", "trace"} when a stage is confident
+        enough, else None (the caller runs the full agent)
+    """
+    cascade = CascadeRun(f"deep_{content_type}")
+    answer = None
+    try:
+        if content_type == "image":
+            answer = await _image_checks(content, cascade)
+
+        if answer is None and content_type in CLASSIFIER_TOOLS:
+            raw = await (classifier if classifier is not None else CLASSIFIER_TOOLS[content_type](content))
+            parsed = parse_tool_result(raw)
+            label, score = parsed if parsed else (None, None)
+            if cascade.check("classifier", score):
+                answer = {"stage": "classifier", "label": label, "confidence": score,
+                          "details": f"The {content_type} detection model returned '{label}' with high confidence."}
+    except Exception as e:
+        logger.warning(f"Cascade for {content_type} failed, falling back to the agent: {e}")
+        answer = None
+
+    if answer is None:
+        cascade.finish("llm")
+        return None
+
+    answer["report"] = _report(answer["stage"], answer["label"], answer["confidence"], answer.pop("details"))
+    answer["trace"] = cascade.trace
+    return answer
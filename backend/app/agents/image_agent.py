@@ -1,28 +1,30 @@
 from langchain.agents import create_agent
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import Tool
 from app.core.llm import get_vision_llm
-from app.core.huggingface import hf_client, MODELS
+from app.core.config import settings
+from app.core.huggingface import hf_client, MODELS, MODEL_INPUT_SIZES
+from app.core.payloads import preprocess_image
+from app.core.uploads import content_bytes
 from PIL import Image
+import asyncio
 import io
 import base64
 
 async def detect_deepfake_image(image_data: str) -> str:
     """
     Detects if an image is a deepfake using HuggingFace model.
-    Input: Base64 string of the image.
+    Input: Base64 string of the image or an upload:// reference.
     """
     try:
-        # Remove header if present (data:image/jpeg;base64,...)
-        if "," in image_data:
-            image_data = image_data.split(",")[1]
-            
-        # Decode to bytes
-        image_bytes = base64.b64decode(image_data)
+        # Downscale to the detector's native resolution before upload (off the event loop)
+        payload, _ = await asyncio.to_thread(
+            lambda: preprocess_image(content_bytes(image_data), MODEL_INPUT_SIZES["image_detection"], "image_detection")
+        )
         
         result = await hf_client.query(
             MODELS["image_detection"], 
-            {"inputs": image_data} 
+            {"inputs": base64.b64encode(payload).decode("ascii")} 
         )
         
         if "error" in result:
@@ -42,10 +44,7 @@ def extract_metadata(image_data: str) -> str:
     Extracts EXIF metadata from the image.
     """
     try:
-        if "," in image_data:
-            image_data = image_data.split(",")[1]
-        image_bytes = base64.b64decode(image_data)
-        img = Image.open(io.BytesIO(image_bytes))
+        img = Image.open(io.BytesIO(content_bytes(image_data)))
         
         # Basic metadata summary
         info = f"Format: {img.format}, Size: {img.size}, Mode: {img.mode}"
@@ -53,6 +52,18 @@ def extract_metadata(image_data: str) -> str:
     except Exception as e:
         return f"Error extracting metadata: {str(e)}"
 
+def build_image_message(image_ref: str) -> HumanMessage:
+    """
+    Builds the agent input: the upload reference for tools plus a copy
+    downscaled to the vision LLM's input resolution.
+    """
+    vision_bytes, _ = preprocess_image(content_bytes(image_ref), settings.VISION_LLM_INPUT_SIZE, "vision_llm_image")
+    data_url = "data:image/jpeg;base64," + base64.b64encode(vision_bytes).decode("ascii")
+    return HumanMessage(content=[
+        {"type": "text", "text": f"Analyze this image. Pass this reference to tools as input: {image_ref}"},
+        {"type": "image_url", "image_url": {"url": data_url}}
+    ])
+
 def get_image_agent():
     """
     Creates the Image Forensics Agent.
@@ -62,7 +73,8 @@ def get_image_agent():
     tools = [
         Tool(
             name="Deepfake_Image_Detector",
-            func=detect_deepfake_image,
+            func=None,
+            coroutine=detect_deepfake_image,
             description="Detects if an image is AI-generated or manipulated. Returns 'label|confidence'."
         ),
         Tool(
@@ -0,0 +1,113 @@
+"""
+Multimodal Analysis - Concurrent fan-out over the specialist agents
+A post made of a caption, an image, audio or video is split into parts; every
+part runs through its specialist at the same time (bounded by a process-wide
+semaphore), so latency is that of the slowest branch. The per-part classifier
+scores are then merged into one verdict and report.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+from app.agents.deep_cascade import parse_tool_result
+from app.core.config import settings
+from app.core.huggingface import fake_probability
+
+logger = logging.getLogger(__name__)
+
+VERDICT_LABELS = {
+    "FAKE": "🚨 Likely manipulated",
+    "SUSPECT": "⚠️ Suspicious",
+    "VERIFIED": "✅ No manipulation detected",
+    "MIXED": "❔ Inconclusive"
+}
+
+_branch_slots: Optional[asyncio.Semaphore] = None
+
+
+def _slots() -> asyncio.Semaphore:
+    """Process-wide limit on branches running at once (created inside the event loop)"""
+    global _branch_slots
+    if _branch_slots is None:
+        _branch_slots = asyncio.Semaphore(settings.MULTIMODAL_CONCURRENCY)
+    return _branch_slots
+
+
+def signal_from_result(raw: str) -> Optional[Dict]:
+    """Merge signal from a classifier tool's 'Label|score' output, or None if unusable"""
+    parsed = parse_tool_result(raw)
+    if parsed is None:
+        return None
+    label, confidence = parsed
+    return {"label": label, "confidence": confidence, "fake_probability": round(fake_probability(label, confidence), 3)}
+
+
+async def fan_out(parts: List[Dict], run_branch: Callable[[str, str], Awaitable[Dict]]) -> List[Dict]:
+    """
+    Run one branch per part concurrently
+
+    Args:
+        parts: [{"content", "content_type"}] in request order
+        run_branch: Coroutine producing a branch result for (content, content_type)
+
+    Returns:
+        Branch results in request order; a failed branch carries "error" instead of failing the request
+    """
+    async def guarded(index: int, part: Dict) -> Dict:
+        async with _slots():
+            started = time.monotonic()
+            try:
+                result = await run_branch(part["content"], part["content_type"])
+            except Exception as e:
+                logger.warning(f"Multimodal branch {index} ({part['content_type']}) failed: {e}")
+                result = {"error": str(e)}
+            result.update(index=index, content_type=part["content_type"],
+                          elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+            return result
+
+    return list(await asyncio.gather(*(guarded(i, part) for i, part in enumerate(parts))))
+
+
+def merge_verdicts(branches: List[Dict]) -> Dict:
+    """
+    Combine per-part signals into one verdict
+
+    A post is as misleading as its most manipulated part, so the highest fake
+    probability decides; parts without a usable signal do not vote.
+    """
+    scored = [b for b in branches if b.get("signal")]
+    if not scored:
+        return {"verdict": "MIXED", "fake_probability": None, "decided_by": None}
+
+    top = max(scored, key=lambda b: b["signal"]["fake_probability"])
+    probability = top["signal"]["fake_probability"]
+    if probability >= settings.MULTIMODAL_FAKE_THRESHOLD:
+        verdict = "FAKE"
+    elif probability >= settings.MULTIMODAL_SUSPECT_THRESHOLD:
+        verdict = "SUSPECT"
+    elif len(scored) < len(branches):
+        # Nothing suspicious in the parts we could score, but some parts were not scored
+        verdict = "MIXED"
+    else:
+        verdict = "VERIFIED"
+    return {"verdict": verdict, "fake_probability": probability, "decided_by": top["content_type"]}
+
+
+def merged_report(merged: Dict, branches: List[Dict]) -> str:
+    """Markdown report: overall verdict followed by each specialist's findings"""
+    lines = [f"**🧩 Multimodal Analysis**\n\n**Overall:** {VERDICT_LABELS[merged['verdict']]}"]
+    if merged["fake_probability"] is not None:
+        lines.append(f"**Highest fake probability:** {int(round(merged['fake_probability'] * 100))}% "
+                     f"({merged['decided_by']})")
+
+    for branch in branches:
+        title = f"\n---\n**Part {branch['index'] + 1} - {branch['content_type']}**"
+        if branch.get("agent_used"):
+            title += f" ({branch['agent_used']})"
+        lines.append(title)
+        if branch.get("error"):
+            lines.append(f"Analysis failed: {branch['error']}")
+        else:
+            lines.append(branch.get("result") or "No findings returned.")
+    return "\n\n".join(lines)
@@ -5,10 +5,18 @@ Provides rapid analysis with verdict, confidence, and brief summary
 from langchain.agents import create_agent
 from langchain_core.messages import SystemMessage
 from langchain_core.tools import Tool
+from app.core.admission import Ticket
+from app.core.cascade import CascadeRun
+from app.core.config import settings
+from app.core.deadline import Deadline, StageSkipped
 from app.core.llm import get_llm
 from app.core.embeddings import get_embeddings_manager
 from app.core.forensics import get_forensics
-from typing import Dict
+from app.core.streaming import stream_to_workers
+from app.core.summary_cache import get_summary_cache
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,11 +28,64 @@ class QuickAnalyzer:
         self.llm = get_llm(temperature=0.2)
         self.embeddings = get_embeddings_manager()
         self.forensics = get_forensics()
+        self.summary_cache = get_summary_cache() if settings.SUMMARY_CACHE_ENABLED else None
     
-    def analyze_text(self, text: str) -> Dict:
-        """Quick text analysis using similarity search"""
+    @staticmethod
+    def new_deadline(seconds: Optional[float] = None) -> Deadline:
+        """Request deadline (defaults to QUICK_DEADLINE_SECONDS)"""
+        return Deadline(settings.QUICK_DEADLINE_SECONDS if seconds is None else seconds,
+                        reserve=settings.QUICK_DEADLINE_RESERVE_SECONDS)
+    
+    def _search(self, text: str):
+        """Embed once; the vector serves both the hoax search and the summary cache"""
+        embedding = self.embeddings.encode(text)
+        return embedding, self.embeddings.search_similar(text, k=3, threshold=0.7, embedding=embedding)
+    
+    async def analyze_text(self, text: str, deadline: Optional[Deadline] = None,
+                           prefetched: Optional[Tuple[np.ndarray, List[Dict]]] = None) -> Dict:
+        """
+        Quick text analysis within the request deadline, as a cascade:
+        exact match -> embedding similarity -> LLM summary. A confident early
+        stage ends the cascade and the summary is built without the LLM.
+        
+        prefetched: (embedding, matches) already computed by a batch search
+        """
+        deadline = deadline or self.new_deadline()
+        cascade = CascadeRun("quick_text")
+        embedding, similar_hoaxes = None, []
+        
+        # Exact (normalized) copy of an indexed claim
+        exact = self.embeddings.find_exact(text) if settings.CASCADE_ENABLED else None
+        if cascade.check("exact_match", 1.0 if exact else None):
+            verdict = exact.get("verdict", "SUSPECT")
+            summary = self._template_summary(verdict, [{"similarity": 1.0, "match": exact}])
+            return {
+                "verdict": verdict,
+                "confidence": 100,
+                "summary_one_liner": summary["one_liner"],
+                "tl_dr_bullets": summary["bullets"],
+                "evidence": [{
+                    "type": "exact_match",
+                    "score": 1.0,
+                    "matched_text": exact["text"],
+                    "category": exact.get("category", "unknown")
+                }],
+                "reasons": [f"Exact copy of a known {verdict.lower()} claim"],
+                "decided_by": cascade.exit_stage,
+                "cascade": cascade.trace,
+                **deadline.report()
+            }
+        
         # Search for similar known hoaxes
-        similar_hoaxes = self.embeddings.search_similar(text, k=3, threshold=0.7)
+        if prefetched is not None:
+            embedding, similar_hoaxes = prefetched
+        else:
+            try:
+                embedding, similar_hoaxes = await deadline.run(
+                    "similarity_search", asyncio.to_thread(self._search, text), settings.QUICK_BUDGET_SEARCH_SECONDS
+                )
+            except StageSkipped:
+                pass
         
         # Determine verdict based on similarity
         if similar_hoaxes:
@@ -49,9 +110,16 @@ class QuickAnalyzer:
             verdict = "MIXED"
             evidence = []
             reasons = ["No clear matches to known hoaxes or verified claims"]
+            if "similarity_search" in deadline.skipped:
+                reasons = ["Similarity search did not finish within the time budget"]
         
-        # Generate summary using LLM
-        summary = self._generate_summary(text, verdict, similar_hoaxes)
+        # A near-certain match needs no LLM; otherwise generate the summary with it
+        top_similarity = similar_hoaxes[0]["similarity"] if similar_hoaxes else None
+        if settings.CASCADE_ENABLED and cascade.check("similarity", top_similarity):
+            summary = self._template_summary(verdict, similar_hoaxes)
+        else:
+            cascade.finish("llm")
+            summary = await self._generate_summary(text, verdict, similar_hoaxes, embedding, deadline)
         
         return {
             "verdict": verdict,
@@ -59,12 +127,31 @@ class QuickAnalyzer:
             "summary_one_liner": summary["one_liner"],
             "tl_dr_bullets": summary["bullets"],
             "evidence": evidence,
-            "reasons": reasons
+            "reasons": reasons,
+            "decided_by": cascade.exit_stage,
+            "cascade": cascade.trace,
+            **deadline.report()
         }
     
-    def analyze_image(self, image_data: str) -> Dict:
-        """Quick image analysis using forensics"""
-        forensics_result = self.forensics.analyze_image(image_data)
+    async def analyze_image(self, image_data: str, deadline: Optional[Deadline] = None,
+                            forensics_result: Optional[Dict] = None) -> Dict:
+        """
+        Quick image analysis using forensics, within the request deadline
+        
+        forensics_result: Result already computed by a batch forensics pass
+        """
+        deadline = deadline or self.new_deadline()
+        if forensics_result is None:
+            budget = deadline.budget(settings.QUICK_BUDGET_FORENSICS_SECONDS)
+            try:
+                # Pixel forensics degrades on its own budget; the rest covers decoding, EXIF and hashing
+                forensics_result = await deadline.run(
+                    "forensics",
+                    asyncio.to_thread(self.forensics.analyze_image, image_data, budget * 0.7),
+                    budget
+                )
+            except StageSkipped:
+                forensics_result = {"verdict": "UNKNOWN", "manipulation_score": 0.0}
         
         # Determine verdict from forensics
         verdict = forensics_result.get("verdict", "UNKNOWN")
@@ -92,6 +179,7 @@ class QuickAnalyzer:
             "type": "image_forensics",
             "exif_data": forensics_result.get("exif", {}),
             "hashes": forensics_result.get("hashes", {}),
+            "pixel_forensics": forensics_result.get("pixel_forensics", {}),
             "manipulation_score": manipulation_score
         }]
         
@@ -104,6 +192,19 @@ class QuickAnalyzer:
             reasons.append("Image shows signs of editing software")
         if manipulation_score > 0.5:
             reasons.append(f"High manipulation score: {manipulation_score:.0%}")
+        pixel = forensics_result.get("pixel_forensics") or {}
+        if pixel.get("ela", {}).get("score", 0.0) > 0.5:
+            reasons.append("Inconsistent JPEG error levels across regions")
+        if pixel.get("noise", {}).get("score", 0.0) > 0.5:
+            reasons.append("Noise pattern differs between image regions")
+        if pixel.get("copy_move", {}).get("score", 0.0) > 0.5:
+            reasons.append("Duplicated (copy-moved) regions detected")
+        if "forensics" in deadline.skipped:
+            reasons.append("Forensics did not finish within the time budget")
+        elif pixel and not pixel.get("complete", True):
+            # Reported as skipped so the degraded verdict is not cached
+            deadline.skip("pixel_forensics", "cut short")
+            reasons.append("Pixel forensics cut short by the time budget")
         if not reasons:
             reasons.append("Basic forensics checks passed")
         
@@ -116,11 +217,117 @@ class QuickAnalyzer:
             "summary_one_liner": summary["one_liner"],
             "tl_dr_bullets": summary["bullets"],
             "evidence": evidence,
-            "reasons": reasons
+            "reasons": reasons,
+            **deadline.report()
         }
     
-    def _generate_summary(self, text: str, verdict: str, matches: list) -> Dict:
-        """Generate concise summary using LLM"""
+    async def analyze_batch(self, items: List[Dict], deadline_seconds: Optional[float] = None,
+                            admit: Optional[Callable[[str, float], Awaitable[Ticket]]] = None
+                            ) -> AsyncIterator[Tuple[int, Dict]]:
+        """
+        Quick analysis of many items, yielding (index, result) as each finishes
+        
+        The shared work is vectorized across the batch: one encode call for all
+        texts and one multi-query FAISS search, while pixel forensics for the
+        images is spread over worker processes. Text items are finished as soon
+        as the search returns and image items as their forensics complete; each
+        item's deadline starts when the batch does.
+        
+        Args:
+            items: [{"content", "content_type": "text" | "image"}]
+            deadline_seconds: Per-item deadline (defaults to QUICK_DEADLINE_SECONDS)
+            admit: Admission per item, called with (content type, seconds left); an item
+                that is not admitted fails with the rejection as its error
+        
+        Yields:
+            (index, result); result is {"error": ...} for a failed item
+        """
+        text_positions = [i for i, item in enumerate(items) if item["content_type"] == "text"]
+        image_positions = [i for i, item in enumerate(items) if item["content_type"] == "image"]
+        deadlines = {i: self.new_deadline(deadline_seconds) for i in text_positions + image_positions}
+        finished: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(settings.QUICK_BATCH_CONCURRENCY)
+        
+        async def finish(index: int, prefetched) -> None:
+            async with slots:
+                try:
+                    ticket = Ticket(None) if admit is None else await admit(
+                        items[index]["content_type"], deadlines[index].remaining()
+                    )
+                    async with ticket:
+                        if items[index]["content_type"] == "image":
+                            result = await self.analyze_image(items[index]["content"], deadlines[index], prefetched)
+                        else:
+                            result = await self.analyze_text(items[index]["content"], deadlines[index], prefetched)
+                except Exception as e:
+                    logger.error(f"Batch item {index} failed: {e}")
+                    result = {"error": str(e)}
+            finished.put_nowait((index, result))
+        
+        # Exact copies end the cascade before the similarity stage, so they are not encoded
+        search_positions = [i for i in text_positions
+                            if not (settings.CASCADE_ENABLED and self.embeddings.find_exact(items[i]["content"]))]
+        
+        def search_all():
+            texts = [items[i]["content"] for i in search_positions]
+            embeddings = self.embeddings.encode_batch(texts, settings.QUICK_BATCH_ENCODE_SIZE)
+            matches = self.embeddings.search_similar_batch(embeddings, k=3, threshold=0.7)
+            return dict(zip(search_positions, zip(embeddings, matches)))
+        
+        async def texts():
+            try:
+                searched = await asyncio.to_thread(search_all) if search_positions else {}
+            except Exception as e:
+                # Each item falls back to its own search within its deadline
+                logger.error(f"Batch similarity search failed: {e}")
+                searched = {}
+            await asyncio.gather(*(finish(i, searched.get(i)) for i in text_positions))
+        
+        async def images():
+            seconds = settings.QUICK_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+            contents = [items[i]["content"] for i in image_positions]
+            done = set()
+            
+            async def handle(pair: Tuple[int, Dict]):
+                done.add(pair[0])
+                await finish(image_positions[pair[0]], pair[1])
+            
+            try:
+                await stream_to_workers(
+                    lambda: self.forensics.iter_images(
+                        contents, seconds * 0.7, timeout=max(seconds - settings.QUICK_DEADLINE_RESERVE_SECONDS, 0.0)
+                    ),
+                    handle, settings.QUICK_BATCH_CONCURRENCY
+                )
+            except Exception as e:
+                logger.error(f"Batch image forensics failed: {e}")
+                for position, index in enumerate(image_positions):
+                    if position not in done:
+                        finished.put_nowait((index, {"error": str(e)}))
+        
+        phases = [asyncio.create_task(texts())]
+        if image_positions:
+            phases.append(asyncio.create_task(images()))
+        try:
+            for _ in range(len(deadlines)):
+                yield await finished.get()
+        finally:
+            # The consumer went away (e.g. client disconnected): drop the remaining items
+            for phase in phases:
+                phase.cancel()
+    
+    async def _generate_summary(self, text: str, verdict: str, matches: list, embedding: Optional[np.ndarray] = None,
+                                deadline: Optional[Deadline] = None) -> Dict:
+        """
+        Generate concise summary using LLM (reused for near-duplicate claims with the same verdict).
+        Falls back to a template summary when the LLM does not fit the deadline.
+        """
+        if self.summary_cache is not None and embedding is not None:
+            cached = self.summary_cache.lookup(embedding, verdict)
+            if cached is not None:
+                return cached["summary"]
+        
+        deadline = deadline or self.new_deadline()
         try:
             prompt = f"""Analyze this claim and provide a brief summary.
 
@@ -134,23 +341,42 @@ Provide:
 
 Be concise and factual."""
             
-            response = self.llm.invoke(prompt)
+            response = await deadline.run("llm_summary", self.llm.ainvoke(prompt), settings.QUICK_BUDGET_SUMMARY_SECONDS)
             
             # Parse response (simplified - in production, use structured output)
             lines = response.content.strip().split('\n')
             one_liner = lines[0] if lines else "Analysis pending"
             bullets = [line.strip('- •').strip() for line in lines[1:4] if line.strip()]
             
-            return {
+            summary = {
                 "one_liner": one_liner[:150],
                 "bullets": bullets[:3] if bullets else ["No additional details"]
             }
+            if self.summary_cache is not None and embedding is not None:
+                self.summary_cache.put(embedding, text, verdict, summary)
+            return summary
+        except StageSkipped:
+            return self._template_summary(verdict, matches)
         except Exception as e:
             logger.error(f"Error generating summary: {e}")
+            return self._template_summary(verdict, matches)
+    
+    def _template_summary(self, verdict: str, matches: list) -> Dict:
+        """Summary built from the analysis itself, used when the LLM is unavailable or too slow"""
+        if matches:
+            top = matches[0]
             return {
-                "one_liner": f"{verdict}: Claim requires verification",
-                "bullets": ["Analysis completed", "Review evidence for details", "Manual verification recommended"]
+                "one_liner": f"{verdict}: Closely matches a known {top['match'].get('category', 'unknown').replace('_', ' ')} claim",
+                "bullets": [
+                    f"Similarity to known claim: {int(top['similarity'] * 100)}%",
+                    f"Matched: \"{top['match']['text'][:80]}\"",
+                    "Review evidence for details"
+                ]
             }
+        return {
+            "one_liner": f"{verdict}: Claim requires verification",
+            "bullets": ["Analysis completed", "Review evidence for details", "Manual verification recommended"]
+        }
     
     def _generate_image_summary(self, verdict: str, forensics: Dict) -> Dict:
         """Generate summary for image analysis"""
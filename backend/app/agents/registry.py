@@ -0,0 +1,54 @@
+"""
+Agent Registry - Prebuilt, reusable agent graphs
+Each agent graph is compiled once per process and shared by all requests;
+graphs carry no per-request state, so concurrent invocations are safe.
+"""
+import threading
+from typing import Callable, Dict
+import logging
+
+from app.agents.text_agent import get_text_agent
+from app.agents.image_agent import get_image_agent
+from app.agents.audio_agent import get_audio_agent
+from app.agents.video_agent import get_video_agent
+
+logger = logging.getLogger(__name__)
+
+def _build_supervisor():
+    # Imported lazily: the supervisor itself resolves its sub-agents through this registry
+    from app.agents.supervisor import get_supervisor_agent
+    return get_supervisor_agent()
+
+AGENT_FACTORIES: Dict[str, Callable] = {
+    "text": get_text_agent,
+    "image": get_image_agent,
+    "audio": get_audio_agent,
+    "video": get_video_agent,
+    "supervisor": _build_supervisor
+}
+
+_agents: Dict[str, object] = {}
+_lock = threading.Lock()
+
+def get_agent(name: str):
+    """Get the prebuilt agent graph for a name in AGENT_FACTORIES, building it on first use"""
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+
+    if name not in AGENT_FACTORIES:
+        raise KeyError(f"Unknown agent: {name}")
+
+    with _lock:
+        if name not in _agents:
+            _agents[name] = AGENT_FACTORIES[name]()
+            logger.info(f"Built agent graph '{name}'")
+        return _agents[name]
+
+def warm_up(names=None):
+    """Build agent graphs ahead of the first request"""
+    for name in names or AGENT_FACTORIES:
+        try:
+            get_agent(name)
+        except Exception as e:
+            logger.error(f"Could not build agent '{name}': {e}")
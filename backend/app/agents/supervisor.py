@@ -3,62 +3,129 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import Tool
 from langchain_core.prompts import PromptTemplate
 from app.core.llm import get_llm
-from app.agents.text_agent import get_text_agent
-from app.agents.image_agent import get_image_agent
-from app.agents.audio_agent import get_audio_agent
-from app.agents.video_agent import get_video_agent
-
-# Initialize Sub-Agents
-text_agent = get_text_agent()
-image_agent = get_image_agent()
-audio_agent = get_audio_agent()
-video_agent = get_video_agent()
-
-def route_text_analysis(input_text: str) -> str:
+from app.core.sniffing import sniff
+from app.agents.registry import get_agent
+from typing import Any, Dict, NamedTuple
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = ("text", "image", "audio", "video")
+
+class RoutingDecision(NamedTuple):
+    content_type: str
+    method: str        # upload / mime / magic / text / llm
+    micros: float      # Time spent deciding
+
+# method -> {"count", "total_micros", "max_micros"}
+_routing_stats: Dict[str, Dict[str, float]] = {}
+
+async def _llm_route(content: str) -> str:
+    """Ask the LLM to classify content the sniffer could not place (rare)"""
+    prompt = (
+        "Classify the following input as exactly one word: text, image, audio or video.\n\n"
+        f"Input (truncated): {content[:300]}"
+    )
+    response = await get_llm(temperature=0).ainvoke(prompt)
+    answer = str(response.content).strip().lower()
+    return next((t for t in CONTENT_TYPES if t in answer), "text")
+
+async def route_content(content: str) -> RoutingDecision:
+    """
+    Decide which specialist handles the content
+
+    Upload metadata, data-URL MIME types and magic bytes settle almost every
+    input deterministically; the LLM is consulted only when they are ambiguous.
+    """
+    started = time.perf_counter()
+    content_type, method = sniff(content)
+    if content_type is None:
+        try:
+            content_type, method = await _llm_route(content), "llm"
+        except Exception as e:
+            logger.warning(f"LLM routing failed, defaulting to text: {e}")
+            content_type, method = "text", "default"
+    micros = round((time.perf_counter() - started) * 1e6, 1)
+    stats = _routing_stats.setdefault(method, {"count": 0, "total_micros": 0.0, "max_micros": 0.0})
+    stats["count"] += 1
+    stats["total_micros"] += micros
+    stats["max_micros"] = max(stats["max_micros"], micros)
+    return RoutingDecision(content_type, method, micros)
+
+def get_routing_stats() -> Dict[str, Dict[str, Any]]:
+    """Per routing method: how often it decided (llm should be rare) and how long deciding took"""
+    return {
+        method: {
+            "count": stats["count"],
+            "avg_micros": round(stats["total_micros"] / stats["count"], 1),
+            "max_micros": stats["max_micros"]
+        }
+        for method, stats in _routing_stats.items()
+    }
+
+async def run_supervisor(content: str) -> Dict:
+    """Route content to its specialist and return the specialist's report"""
+    decision = await route_content(content)
+    result = await get_agent(decision.content_type).ainvoke({"messages": [HumanMessage(content=content)]})
+    return {
+        "result": result["messages"][-1].content,
+        "content_type": decision.content_type,
+        "routed_by": decision.method
+    }
+
+async def route_text_analysis(input_text: str) -> str:
     """Routes to Text Agent"""
-    result = text_agent.invoke({"messages": [HumanMessage(content=input_text)]})
+    result = await get_agent("text").ainvoke({"messages": [HumanMessage(content=input_text)]})
     return result["messages"][-1].content
 
-def route_image_analysis(input_image: str) -> str:
+async def route_image_analysis(input_image: str) -> str:
     """Routes to Image Agent"""
-    result = image_agent.invoke({"messages": [HumanMessage(content=input_image)]})
+    result = await get_agent("image").ainvoke({"messages": [HumanMessage(content=input_image)]})
     return result["messages"][-1].content
 
-def route_audio_analysis(input_audio: str) -> str:
+async def route_audio_analysis(input_audio: str) -> str:
     """Routes to Audio Agent"""
-    result = audio_agent.invoke({"messages": [HumanMessage(content=input_audio)]})
+    result = await get_agent("audio").ainvoke({"messages": [HumanMessage(content=input_audio)]})
     return result["messages"][-1].content
 
-def route_video_analysis(input_video: str) -> str:
+async def route_video_analysis(input_video: str) -> str:
     """Routes to Video Agent"""
-    result = video_agent.invoke({"messages": [HumanMessage(content=input_video)]})
+    result = await get_agent("video").ainvoke({"messages": [HumanMessage(content=input_video)]})
     return result["messages"][-1].content
 
 def get_supervisor_agent():
     """
-    Creates the Supervisor Agent that routes requests.
+    Creates the LLM-driven Supervisor Agent.
+    
+    Prefer route_content / run_supervisor: they route deterministically and
+    only fall back to the LLM for ambiguous input.
     """
     llm = get_llm(temperature=0)
     
     tools = [
         Tool(
             name="Text_Analysis_Specialist",
-            func=route_text_analysis,
+            func=None,
+            coroutine=route_text_analysis,
             description="Use this for analyzing text content, articles, or claims."
         ),
         Tool(
             name="Image_Forensics_Specialist",
-            func=route_image_analysis,
+            func=None,
+            coroutine=route_image_analysis,
             description="Use this for analyzing images, photos, or screenshots."
         ),
         Tool(
             name="Audio_Verification_Specialist",
-            func=route_audio_analysis,
+            func=None,
+            coroutine=route_audio_analysis,
             description="Use this for analyzing audio clips, voice recordings, or speech."
         ),
         Tool(
             name="Video_Analysis_Specialist",
-            func=route_video_analysis,
+            func=None,
+            coroutine=route_video_analysis,
             description="Use this for analyzing video files or clips."
         )
     ]
@@ -49,7 +49,8 @@ def get_text_agent():
     tools = [
         Tool(
             name="AI_Text_Detector",
-            func=detect_ai_text,
+            func=None,
+            coroutine=detect_ai_text,
             description="Detects if text was written by AI or human. Returns result in format 'label|confidence'."
         )
     ]
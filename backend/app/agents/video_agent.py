@@ -1,53 +1,354 @@
 from langchain.agents import create_agent
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import Tool
 from app.core.llm import get_vision_llm
-from app.core.huggingface import hf_client, MODELS
+from app.core.config import settings
+from app.core.huggingface import hf_client, MODELS, MODEL_INPUT_SIZES, fake_probability
+from app.core.forensics import get_forensics
+from app.core.keyframes import Keyframe, iter_keyframes
+from app.core.payloads import get_payload_metrics
+from app.core.streaming import stream_to_workers
+from app.core.video_fingerprint import compute_fingerprint, get_video_fingerprint_index
+from app.core.uploads import content_file
+from collections import OrderedDict
+from contextlib import closing
+from PIL import Image
+from typing import Dict, List
+import asyncio
 import base64
+import hashlib
+import imagehash
+import os
+import tempfile
+import time
 import cv2
 import numpy as np
 
-async def detect_deepfake_video(video_data: str) -> str:
+# Recent frame-scoring results, so both tools can share one decode pass
+_frame_score_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_FRAME_SCORE_CACHE_SIZE = 8
+
+def _fit(width: int, height: int, max_side: int):
+    """Target size keeping aspect ratio, longest side at most max_side (even dimensions for codecs)"""
+    scale = min(1.0, max_side / max(width, height))
+    return max(int(width * scale) // 2 * 2, 2), max(int(height * scale) // 2 * 2, 2)
+
+def prepare_video_for_detector(video_data: str) -> bytes:
     """
-    Detects if a video contains deepfakes by analyzing frames.
-    Input: Base64 string of the video.
+    Re-encodes the video at the detector's native resolution before upload.
+    Falls back to the original bytes if that would not be smaller.
     """
-    try:
-        # Remove header if present
-        if "," in video_data:
-            video_data = video_data.split(",")[1]
+    start = time.perf_counter()
+    max_side = MODEL_INPUT_SIZES["video_detection"]
+    
+    with content_file(video_data) as src_path:
+        original_size = os.path.getsize(src_path)
+        cap = cv2.VideoCapture(src_path)
+        fd, out_path = tempfile.mkstemp(suffix=".mp4", dir=settings.UPLOAD_TEMP_DIR)
+        os.close(fd)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            
+            processed = None
+            if width > 0 and height > 0:
+                size = _fit(width, height, max_side)
+                writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+                try:
+                    # Frame by frame, so memory does not grow with video length
+                    while True:
+                        ok, frame = cap.read()
+                        if not ok:
+                            break
+                        writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+                finally:
+                    writer.release()
+                if 0 < os.path.getsize(out_path) < original_size:
+                    with open(out_path, "rb") as f:
+                        processed = f.read()
             
-        # For video, we might need to extract frames and analyze them
+            if processed is None:
+                with open(src_path, "rb") as f:
+                    processed = f.read()
+        finally:
+            cap.release()
+            os.unlink(out_path)
+    
+    get_payload_metrics().record("video_detection", original_size, len(processed), time.perf_counter() - start)
+    return processed
+
+def sample_preview_frames(video_data: str, count: int = 3) -> List[bytes]:
+    """
+    Extracts a few evenly spaced frames, downscaled and JPEG-encoded, for the vision LLM.
+    """
+    start = time.perf_counter()
+    frames = []
+    
+    with content_file(video_data) as src_path:
+        original_size = os.path.getsize(src_path)
+        cap = cv2.VideoCapture(src_path)
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            positions = [int(total * (i + 0.5) / count) for i in range(count)] if total > 0 else [0]
+            for position in positions:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ok, frame = cap.read()
+                if not ok:
+                    continue
+                height, width = frame.shape[:2]
+                frame = cv2.resize(frame, _fit(width, height, settings.VISION_LLM_INPUT_SIZE), interpolation=cv2.INTER_AREA)
+                ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, settings.PAYLOAD_JPEG_QUALITY])
+                if ok:
+                    frames.append(encoded.tobytes())
+        finally:
+            cap.release()
+    
+    get_payload_metrics().record("vision_llm_video", original_size, sum(len(f) for f in frames), time.perf_counter() - start)
+    return frames
+
+def _prepare_frame(keyframe: Keyframe) -> Dict:
+    """
+    CPU-side frame work (runs in the decoder thread): downscale to the detector's
+    input size, JPEG-encode and compute perceptual hashes.
+    """
+    height, width = keyframe.frame.shape[:2]
+    small = cv2.resize(keyframe.frame, _fit(width, height, MODEL_INPUT_SIZES["image_detection"]), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, settings.PAYLOAD_JPEG_QUALITY])
+    if not ok:
+        raise ValueError(f"Could not encode frame {keyframe.index}")
+    
+    pil_image = Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+    return {
+        "index": keyframe.index,
+        "timestamp": round(keyframe.timestamp, 2),
+        "scene_change": round(keyframe.scene_change, 3),
+        "jpeg": encoded.tobytes(),
+        "hashes": {
+            "perceptual_hash": str(imagehash.phash(pil_image)),
+            "average_hash": str(imagehash.average_hash(pil_image))
+        }
+    }
+
+async def _score_frame(frame: Dict) -> Dict:
+    """Score one prepared frame with the image detector and the known-hash store"""
+    scored = {
+        "index": frame["index"],
+        "timestamp": frame["timestamp"],
+        "perceptual_hash": frame["hashes"]["perceptual_hash"],
+        "known_matches": get_forensics().lookup_known_hashes(frame["hashes"]),
+        "fake_probability": None
+    }
+    try:
         result = await hf_client.query(
-            MODELS["video_detection"], 
-            {"inputs": video_data}
+            MODELS["image_detection"],
+            {"inputs": base64.b64encode(frame["jpeg"]).decode("ascii")}
         )
-         
-        if "error" in result:
-            return f"Error|0.0"
-            
-        # Parse result
-        if isinstance(result, list):
+        if isinstance(result, list) and result:
             top_result = sorted(result, key=lambda x: x['score'], reverse=True)[0]
-            return f"{top_result['label']}|{top_result['score']:.2f}"
+            scored["fake_probability"] = fake_probability(top_result['label'], top_result['score'])
+    except Exception as e:
+        scored["error"] = str(e)
+    return scored
+
+def _temporal_score(frames: List[Dict]) -> Dict:
+    """Combine per-frame probabilities into a single temporal score"""
+    frames = sorted(frames, key=lambda f: f["index"])
+    known_matches = [m for f in frames for m in f["known_matches"]]
+    probs = np.array([f["fake_probability"] for f in frames if f["fake_probability"] is not None], dtype=np.float32)
+    
+    summary = {
+        "frames_sampled": len(frames),
+        "frames_scored": int(probs.size),
+        "known_matches": known_matches,
+        "frame_hashes": [[f["timestamp"], f["perceptual_hash"]] for f in frames],
+        "suspicious_frames": [
+            {"timestamp": f["timestamp"], "fake_probability": round(f["fake_probability"], 3)}
+            for f in frames if f["fake_probability"] is not None and f["fake_probability"] >= 0.5
+        ][:10]
+    }
+    
+    if probs.size == 0:
+        summary.update({"temporal_score": 0.95 if known_matches else None, "mean": None, "peak": None, "flicker": None})
+        return summary
+    
+    # A short run of fake frames (e.g. a swapped face in one scene) should count,
+    # but a single noisy frame should not: take the peak of a 3-frame moving average
+    window = min(3, probs.size)
+    smoothed = np.convolve(probs, np.ones(window) / window, mode="valid")
+    temporal = 0.5 * float(probs.mean()) + 0.5 * float(smoothed.max())
+    if known_matches:
+        temporal = max(temporal, 0.95)
+    
+    summary.update({
+        "temporal_score": round(temporal, 3),
+        "mean": round(float(probs.mean()), 3),
+        "peak": round(float(smoothed.max()), 3),
+        # Large frame-to-frame swings are themselves a deepfake artifact
+        "flicker": round(float(np.abs(np.diff(probs)).mean()), 3) if probs.size > 1 else 0.0
+    })
+    return summary
+
+async def score_video_frames(video_data: str) -> Dict:
+    """
+    Streams keyframes out of the video and scores them concurrently.
+    
+    Decoding runs in a worker thread and feeds a bounded queue, so at most a
+    handful of downscaled frames are in memory regardless of video length.
+    """
+    cache_key = hashlib.sha1(video_data.encode()).hexdigest()
+    if cache_key in _frame_score_cache:
+        _frame_score_cache.move_to_end(cache_key)
+        return _frame_score_cache[cache_key]
+    
+    # Known videos (including trimmed / re-encoded copies) resolve locally
+    fingerprint_index = get_video_fingerprint_index()
+    
+    def fingerprint():
+        with content_file(video_data) as path:
+            video_fingerprint = compute_fingerprint(path)
+        return video_fingerprint, fingerprint_index.lookup(video_fingerprint)
+    
+    fingerprinting = None
+    if fingerprint_index.verified:
+        video_fingerprint, known = await asyncio.to_thread(fingerprint)
+        if known is not None and known.get("verified"):
+            return _remember_frame_scores(cache_key, {
+                "fingerprint_match": known,
+                "temporal_score": known.get("temporal_score"),
+                "frames_sampled": 0,
+                "frames_scored": 0,
+                "known_matches": [],
+                "suspicious_frames": []
+            })
+    else:
+        # Nothing verified to short-circuit on: fingerprint alongside scoring, for history only
+        fingerprinting = asyncio.ensure_future(asyncio.to_thread(fingerprint))
+    
+    def frames():
+        with content_file(video_data) as path:
+            with closing(iter_keyframes(path)) as keyframes:
+                for keyframe in keyframes:
+                    yield _prepare_frame(keyframe)
+    
+    scored = []
+    
+    async def score(frame: Dict):
+        scored.append(await _score_frame(frame))
+    
+    # Decoding runs in a thread with backpressure; it stops if this request is cancelled
+    try:
+        await stream_to_workers(frames, score, settings.VIDEO_FRAME_CONCURRENCY)
+    except BaseException:
+        if fingerprinting is not None:
+            fingerprinting.cancel()
+        raise
+    if fingerprinting is not None:
+        video_fingerprint, known = await fingerprinting
+    
+    summary = _temporal_score(scored)
+    if known is not None:
+        # Model verdicts are indexed unverified: shown as history, never reused as the answer
+        summary["previous_analysis"] = known
+    elif summary["temporal_score"] is not None and summary["frames_scored"] and video_fingerprint.size:
+        await asyncio.to_thread(fingerprint_index.add, video_fingerprint, {
+            "temporal_score": summary["temporal_score"],
+            "verdict": "FAKE" if summary["temporal_score"] >= 0.5 else "REAL",
+            "source": "frame_analysis"
+        })
+    return _remember_frame_scores(cache_key, summary)
+
+def _remember_frame_scores(cache_key: str, summary: Dict) -> Dict:
+    """Cache a frame-scoring summary, evicting the least recently used beyond the cache size"""
+    _frame_score_cache[cache_key] = summary
+    while len(_frame_score_cache) > _FRAME_SCORE_CACHE_SIZE:
+        _frame_score_cache.popitem(last=False)
+    return summary
+
+async def detect_deepfake_video(video_data: str) -> str:
+    """
+    Detects if a video contains deepfakes by analyzing frames.
+    Input: Base64 string of the video or an upload:// reference.
+    """
+    try:
+        summary = await score_video_frames(video_data)
+        temporal = summary["temporal_score"]
+        
+        if temporal is None:
+            # No frame could be scored; fall back to the whole-video model
+            payload = await asyncio.to_thread(prepare_video_for_detector, video_data)
+            result = await hf_client.query(
+                MODELS["video_detection"], 
+                {"inputs": base64.b64encode(payload).decode("ascii")}
+            )
             
-        return "Unknown|0.5"
+            if "error" in result:
+                return f"Error|0.0"
+                
+            # Parse result
+            if isinstance(result, list):
+                top_result = sorted(result, key=lambda x: x['score'], reverse=True)[0]
+                return f"{top_result['label']}|{top_result['score']:.2f}"
+                
+            return "Unknown|0.5"
+        
+        if temporal >= 0.5:
+            return f"Fake|{temporal:.2f}"
+        return f"Real|{1.0 - temporal:.2f}"
     except Exception as e:
         return f"Error|0.0"
 
-def analyze_video_frames(video_data: str) -> str:
+async def analyze_video_frames(video_data: str) -> str:
     """
     Extracts and analyzes key frames from the video.
     """
     try:
-        # This is a placeholder. Real implementation would:
-        # 1. Decode base64 to video file
-        # 2. Use cv2 to extract frames
-        # 3. Analyze frames for inconsistencies
-        return "Frame analysis not yet fully implemented."
+        summary = await score_video_frames(video_data)
+        known = summary.get("fingerprint_match")
+        if known:
+            return (
+                f"Matches previously analyzed video #{known['id']} "
+                f"({known['matched_frames']} frames, coverage {known['coverage']:.0%}, "
+                f"offset {known['offset_seconds']}s). "
+                f"Confirmed verdict: {known.get('verdict', 'UNKNOWN')}, temporal fake score: {known.get('temporal_score')}"
+            )
+        if summary["frames_sampled"] == 0:
+            return "No frames could be decoded from the video."
+        
+        lines = [
+            f"Keyframes sampled: {summary['frames_sampled']} (scored: {summary['frames_scored']})",
+            f"Temporal fake score: {summary['temporal_score']}",
+            f"Mean frame score: {summary['mean']}, peak (3-frame window): {summary['peak']}",
+            f"Frame-to-frame flicker: {summary['flicker']}"
+        ]
+        if summary["suspicious_frames"]:
+            times = ", ".join(f"{f['timestamp']}s ({f['fake_probability']:.2f})" for f in summary["suspicious_frames"])
+            lines.append(f"Suspicious frames: {times}")
+        if summary["known_matches"]:
+            lines.append(f"Frames match {len(summary['known_matches'])} known manipulated image(s)")
+        previous = summary.get("previous_analysis")
+        if previous:
+            lines.append(
+                f"Previously analyzed as video #{previous['id']} (unverified model verdict: "
+                f"{previous.get('verdict', 'UNKNOWN')}, coverage {previous['coverage']:.0%})"
+            )
+        return "\n".join(lines)
     except Exception as e:
         return f"Error in frame analysis: {str(e)}"
 
+def build_video_message(video_ref: str) -> HumanMessage:
+    """
+    Builds the agent input: the upload reference for tools plus a few
+    downscaled preview frames for the vision LLM.
+    """
+    content = [{"type": "text", "text": f"Analyze this video. Pass this reference to tools as input: {video_ref}"}]
+    for frame in sample_preview_frames(video_ref):
+        content.append({
+            "type": "image_url",
+            "image_url": {"url": "data:image/jpeg;base64," + base64.b64encode(frame).decode("ascii")}
+        })
+    return HumanMessage(content=content)
+
 def get_video_agent():
     """
     Creates the Video Analysis Agent.
@@ -57,13 +358,15 @@ def get_video_agent():
     tools = [
         Tool(
             name="Deepfake_Video_Detector",
-            func=detect_deepfake_video,
+            func=None,
+            coroutine=detect_deepfake_video,
             description="Detects if a video contains deepfake content. Returns 'label|confidence'."
         ),
         Tool(
             name="Frame_Analyzer",
-            func=analyze_video_frames,
-            description="Provides basic frame analysis information."
+            func=None,
+            coroutine=analyze_video_frames,
+            description="Samples keyframes and reports per-frame and temporal deepfake scores."
         )
     ]
     
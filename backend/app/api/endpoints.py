@@ -1,30 +1,92 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, List, Literal
-from langchain_core.messages import HumanMessage
-from app.agents.supervisor import get_supervisor_agent
-from app.agents.text_agent import get_text_agent
-from app.agents.image_agent import get_image_agent
-from app.agents.audio_agent import get_audio_agent
-from app.agents.video_agent import get_video_agent
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import AnyHttpUrl, BaseModel
+from typing import AsyncIterator, Awaitable, Dict, Optional, List, Literal
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from app.agents.registry import get_agent
+from app.agents.deep_cascade import CLASSIFIER_TOOLS, run_deep_cascade
+from app.agents.multimodal import fan_out, merge_verdicts, merged_report, signal_from_result
+from app.agents.supervisor import route_content
+from app.agents.image_agent import build_image_message
+from app.agents.video_agent import build_video_message
 from app.agents.quick_agent import get_quick_analyzer
+from app.core.admission import Ticket, get_admission_controller, remain_seconds
+from app.core.config import settings
+from app.core.jobs import check_webhook_url, get_job_queue, get_job_workers
+from app.core.sniffing import type_from_mime
 from app.core.storage import get_storage
+from app.core.verdict_cache import VerdictCache, get_verdict_cache
+from app.core.uploads import (
+    UPLOAD_SCHEME, StoredUpload, UploadTooLarge, content_bytes, data_mime_type,
+    get_upload_registry, limit_receive, max_upload_bytes, spool_stream
+)
 
 router = APIRouter()
 
 class AnalysisRequest(BaseModel):
     content: str
-    content_type: str  # text, image, audio, video
+    content_type: Optional[str] = None  # text, image, audio, video; detected when omitted or "auto"
 
 class AnalysisResponse(BaseModel):
     result: str
     agent_used: str
 
+class MultimodalPart(BaseModel):
+    content: str
+    content_type: Optional[str] = None  # Detected when omitted or "auto"
+
+class MultimodalRequest(BaseModel):
+    parts: List[MultimodalPart]  # e.g. caption + image + video of one post
+
+class MultimodalBranch(BaseModel):
+    index: int
+    content_type: str
+    agent_used: Optional[str] = None
+    result: Optional[str] = None
+    signal: Optional[dict] = None  # Classifier label, confidence and fake probability
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+class MultimodalResponse(BaseModel):
+    verdict: Literal["FAKE", "SUSPECT", "MIXED", "VERIFIED"]
+    fake_probability: Optional[float] = None
+    decided_by: Optional[str] = None  # Content type of the part that set the verdict
+    result: str
+    branches: List[MultimodalBranch]
+    elapsed_ms: float = 0.0
+
+class JobSubmitRequest(BaseModel):
+    content: str
+    content_type: Optional[str] = None  # Detected when omitted or "auto"
+    priority: int = 0  # Higher runs first
+    webhook_url: Optional[AnyHttpUrl] = None  # Receives the result (or error) when the job finishes
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    content_type: str
+    priority: int = 0
+    attempts: int = 0
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+    webhook_status: Optional[str] = None
+
 # New models for quick analysis
 class QuickAnalysisRequest(BaseModel):
     content: str
     content_type: Literal["text", "image"]
     metadata: dict = {}
+    deadline_ms: Optional[int] = None  # Defaults to QUICK_DEADLINE_SECONDS
 
 class QuickAnalysisResponse(BaseModel):
     verdict: Literal["FAKE", "SUSPECT", "MIXED", "VERIFIED"]
@@ -33,6 +95,22 @@ class QuickAnalysisResponse(BaseModel):
     tl_dr_bullets: List[str]
     evidence: List[dict]
     reasons: List[str]
+    decided_by: Optional[str] = None  # Cascade stage that produced the verdict
+    cascade: List[dict] = []
+    skipped_stages: List[str] = []  # Stages dropped or cut short to meet the deadline
+    stage_timings_ms: Dict[str, float] = {}
+    elapsed_ms: float = 0.0
+    analysis_id: Optional[str] = None  # Stored analysis (the original one for cached verdicts)
+    cached: bool = False  # Served from the verdict cache
+
+class QuickBatchItem(BaseModel):
+    content: str
+    content_type: Literal["text", "image"]
+    metadata: dict = {}
+
+class QuickBatchRequest(BaseModel):
+    items: List[QuickBatchItem]
+    deadline_ms: Optional[int] = None  # Per item; defaults to QUICK_DEADLINE_SECONDS
 
 class FeedbackRequest(BaseModel):
     analysis_id: Optional[str] = None
@@ -42,70 +120,570 @@ class FeedbackRequest(BaseModel):
     user_confidence: int  # 1-5
     comments: Optional[str] = None
 
-@router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_content(request: AnalysisRequest):
+# Content type -> display name; graphs come prebuilt from the agent registry
+DEEP_AGENTS = {
+    "text": "Text Analysis Agent",
+    "image": "Image Forensics Agent",
+    "audio": "Audio Verification Agent",
+    "video": "Video Analysis Agent"
+}
+
+# Agents whose input message carries a downscaled preview for the vision LLM
+MESSAGE_BUILDERS = {
+    "image": build_image_message,
+    "video": build_video_message
+}
+
+async def _resolve_content_type(content: str, content_type: Optional[str]) -> str:
+    """Use the declared content type, or detect it (MIME / magic bytes, LLM only if ambiguous)"""
+    if content_type and content_type != "auto":
+        return content_type
+    return (await route_content(content)).content_type
+
+async def _register_media(content: str, content_type: str) -> Optional[str]:
+    """Swap a media payload for an upload reference (base64 is decoded off the event loop)"""
+    if content_type == "text" or content[:64].strip().startswith(UPLOAD_SCHEME):
+        return None
+    data = await asyncio.to_thread(content_bytes, content)
+    return get_upload_registry().register_bytes(data, content_type, data_mime_type(content))
+
+async def _build_message(content: str, content_type: str) -> HumanMessage:
+    """Agent input message; preview builders decode and downscale media, so they run in a thread"""
+    build_message = MESSAGE_BUILDERS.get(content_type)
+    if build_message is None:
+        return HumanMessage(content=content)
+    return await asyncio.to_thread(build_message, content)
+
+async def _run_deep_analysis(content: str, content_type: str,
+                             classifier: Optional[Awaitable[str]] = None) -> AnalysisResponse:
     """
-    Standard deep analysis endpoint - uses full agent reasoning
+    Run the specialist agent for a content type (fully async: LLM calls and tools are awaited)
+    
+    classifier: Classifier output the caller is already computing, reused by the cascade
     """
+    if content_type not in DEEP_AGENTS:
+        raise HTTPException(status_code=400, detail="Unsupported content type")
+    
+    # Media goes to the agent as a short upload reference rather than a base64 payload
+    reference = await _register_media(content, content_type)
+    content = reference or content
+    
     try:
-        if request.content_type == "text":
-            agent = get_text_agent()
-            result = agent.invoke({"messages": [HumanMessage(content=request.content)]})
-            return AnalysisResponse(result=result["messages"][-1].content, agent_used="Text Analysis Agent")
-            
-        elif request.content_type == "image":
-            agent = get_image_agent()
-            result = agent.invoke({"messages": [HumanMessage(content=request.content)]})
-            return AnalysisResponse(result=result["messages"][-1].content, agent_used="Image Forensics Agent")
-            
-        elif request.content_type == "audio":
-            agent = get_audio_agent()
-            result = agent.invoke({"messages": [HumanMessage(content=request.content)]})
-            return AnalysisResponse(result=result["messages"][-1].content, agent_used="Audio Verification Agent")
+        agent_name = DEEP_AGENTS[content_type]
+        
+        # Obvious cases are answered by a cheaper stage without the LLM agent
+        if settings.CASCADE_ENABLED:
+            early = await run_deep_cascade(content, content_type, classifier)
+            if early is not None:
+                return AnalysisResponse(result=early["report"], agent_used=f"{agent_name} (cascade: {early['stage']})")
+        
+        agent = get_agent(content_type)
+        result = await agent.ainvoke({"messages": [await _build_message(content, content_type)]})
+        return AnalysisResponse(result=result["messages"][-1].content, agent_used=agent_name)
+    finally:
+        if reference:
+            get_upload_registry().release(reference)
+
+async def _run_multimodal_branch(content: str, content_type: str) -> Dict:
+    """One fan-out branch: the specialist agent plus the classifier score used for merging"""
+    reference = await _register_media(content, content_type)
+    content = reference or content
+    # The classifier runs once: the cascade's classifier stage awaits the same task,
+    # so media is not decoded and scored twice
+    tool = CLASSIFIER_TOOLS.get(content_type)
+    classifier = asyncio.ensure_future(tool(content)) if tool else None
+    try:
+        analysis = await _run_deep_analysis(content, content_type, classifier)
+        signal = signal_from_result(await classifier) if classifier else None
+        return {"result": analysis.result, "agent_used": analysis.agent_used, "signal": signal}
+    finally:
+        if classifier and not classifier.done():
+            classifier.cancel()
+        if reference:
+            get_upload_registry().release(reference)
+
+async def run_analysis_job(content_type: str, payload: dict) -> dict:
+    """Job handler for the durable queue: deep analysis of a queued submission"""
+    return (await _run_deep_analysis(payload["content"], content_type)).model_dump()
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _message_text(content) -> str:
+    """Text of a message whose content may be a string or a list of content parts"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part) for part in content or []
+    )
+
+async def _stream_deep_analysis(content: str, content_type: str) -> AsyncIterator[str]:
+    """
+    Run the specialist agent and yield SSE events as the analysis progresses:
+    route -> tool_call / tool_result (per tool) -> token (LLM output) -> done
+    """
+    reference = None
+    try:
+        reference = await _register_media(content, content_type)
+        content = reference or content
+        
+        agent_name = DEEP_AGENTS[content_type]
+        yield _sse("route", {"content_type": content_type, "agent": agent_name})
+        
+        if settings.CASCADE_ENABLED:
+            early = await run_deep_cascade(content, content_type)
+            if early is not None:
+                yield _sse("cascade", {"stage": early["stage"], "label": early["label"],
+                                       "confidence": early["confidence"], "trace": early["trace"]})
+                yield _sse("done", {"result": early["report"], "agent_used": f"{agent_name} (cascade: {early['stage']})"})
+                return
+        
+        agent = get_agent(content_type)
+        message = await _build_message(content, content_type)
+        final_text = ""
+        
+        async for mode, chunk in agent.astream(
+            {"messages": [message]}, stream_mode=["updates", "messages"]
+        ):
+            if mode == "messages":
+                # LLM tokens as they are generated (tool-call chunks carry no text)
+                message, _ = chunk
+                if isinstance(message, AIMessageChunk):
+                    text = _message_text(message.content)
+                    if text:
+                        yield _sse("token", {"text": text})
+                continue
             
-        elif request.content_type == "video":
-            agent = get_video_agent()
-            result = agent.invoke({"messages": [HumanMessage(content=request.content)]})
-            return AnalysisResponse(result=result["messages"][-1].content, agent_used="Video Analysis Agent")
+            # Completed node outputs: tool calls requested by the model, then their results
+            for update in chunk.values():
+                for message in (update or {}).get("messages", []):
+                    if isinstance(message, ToolMessage):
+                        yield _sse("tool_result", {"tool": message.name, "content": _message_text(message.content)})
+                    elif isinstance(message, AIMessage):
+                        if message.tool_calls:
+                            for call in message.tool_calls:
+                                yield _sse("tool_call", {"tool": call["name"]})
+                        else:
+                            final_text = _message_text(message.content)
+        
+        yield _sse("done", {"result": final_text, "agent_used": agent_name})
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+    finally:
+        if reference:
+            get_upload_registry().release(reference)
+
+async def _release_after(stream: AsyncIterator[str], ticket: Ticket) -> AsyncIterator[str]:
+    """Hold an admission slot for as long as a streamed response is being produced"""
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        ticket.release()
+
+def _quick_deadline(deadline_ms: Optional[int]) -> float:
+    return deadline_ms / 1000.0 if deadline_ms else settings.QUICK_DEADLINE_SECONDS
+
+def _analysis_record(content_type: str, result: dict, metadata: dict, content=None) -> dict:
+    """
+    Stored form of a quick analysis; image hashes let confirmed feedback reach the known-image
+    store, and a text digest lets feedback be checked against the claim that was analyzed
+    """
+    record = {
+        "content_type": content_type,
+        "verdict": result["verdict"],
+        "confidence": result["confidence"],
+        "metadata": metadata
+    }
+    if content_type == "text" and content is not None:
+        record["content_digest"] = VerdictCache.digest(content, "text")
+    if content_type == "image":
+        hashes = next((e.get("hashes") for e in result.get("evidence", []) if e.get("type") == "image_forensics"), None)
+        if hashes:
+            record["image_hashes"] = hashes
+    return record
+
+def _cacheable(result: dict) -> bool:
+    """Only complete analyses are cached; deadline-degraded ones are recomputed next time"""
+    return not result.get("skipped_stages")
+
+def _store_quick_results(batch: List[tuple]) -> List[str]:
+    """Write (record, verdict cache key, result) tuples to storage in one write and cache the verdicts"""
+    ids = get_storage().save_analyses([record for record, _, _ in batch])
+    verdict_cache = get_verdict_cache()
+    for analysis_id, (_, key, result) in zip(ids, batch):
+        if key and _cacheable(result):
+            verdict_cache.put(key, analysis_id, result)
+    return ids
+
+async def _run_quick_analysis(content, content_type: str, metadata: dict,
+                              deadline_seconds: Optional[float] = None) -> QuickAnalysisResponse:
+    """Run the quick analyzer within what is left of the request deadline and record the result"""
+    analyzer = get_quick_analyzer()
+    storage = get_storage()
+    deadline = analyzer.new_deadline(deadline_seconds)
+    if content_type not in ("text", "image"):
+        raise HTTPException(status_code=422, detail=f"Content type '{content_type}' not yet supported for quick analysis")
+    
+    # Same (normalized) content seen before: answer with the stored analysis, no rerun and no new record
+    verdict_cache = get_verdict_cache() if settings.VERDICT_CACHE_ENABLED else None
+    cache_key = None
+    if verdict_cache is not None:
+        cache_key = await asyncio.to_thread(verdict_cache.key, content, content_type)
+        cached = await asyncio.to_thread(verdict_cache.get, cache_key)
+        if cached is not None:
+            report = deadline.report()
+            return QuickAnalysisResponse(**{
+                **cached["result"],
+                "analysis_id": cached["analysis_id"],
+                "cached": True,
+                "skipped_stages": [],
+                "stage_timings_ms": {"verdict_cache": report["elapsed_ms"]},
+                "elapsed_ms": report["elapsed_ms"]
+            })
+    
+    # Route based on content type
+    if content_type == "text":
+        result = await analyzer.analyze_text(content, deadline)
+    else:
+        result = await analyzer.analyze_image(content, deadline)
+    
+    # Save to storage
+    analysis_id = storage.save_analysis(_analysis_record(content_type, result, metadata, content))
+    if cache_key and _cacheable(result):
+        await asyncio.to_thread(verdict_cache.put, cache_key, analysis_id, result)
+    
+    return QuickAnalysisResponse(**result, analysis_id=analysis_id)
+
+async def _stream_quick_batch(request: QuickBatchRequest, scope: dict) -> AsyncIterator[str]:
+    """
+    Yield one NDJSON line per item as it finishes ({"index", ...quick analysis}),
+    then a summary line; analyses are written to storage in batches. Each item is
+    admitted under its quick:<type> limiter.
+    """
+    analyzer = get_quick_analyzer()
+    started = time.monotonic()
+    items = [{"content": item.content, "content_type": item.content_type} for item in request.items]
+    pending: List[tuple] = []
+    failed = 0
+    
+    def lookup_all():
+        verdict_cache = get_verdict_cache()
+        keys = [verdict_cache.key(item["content"], item["content_type"]) for item in items]
+        return keys, [verdict_cache.get(key) for key in keys]
+    
+    try:
+        # Repeated content is answered from the verdict cache and neither analyzed nor stored again
+        keys, hits = [None] * len(items), [None] * len(items)
+        if settings.VERDICT_CACHE_ENABLED:
+            keys, hits = await asyncio.to_thread(lookup_all)
+        for index, cached in enumerate(hits):
+            if cached is not None:
+                yield json.dumps({"index": index, **QuickAnalysisResponse(
+                    **{**cached["result"], "analysis_id": cached["analysis_id"], "cached": True}
+                ).model_dump()}) + "\n"
+        
+        async def admit(content_type: str, seconds: float) -> Ticket:
+            return await get_admission_controller().admit("quick", content_type, seconds)
+        
+        misses = [index for index, cached in enumerate(hits) if cached is None]
+        async for position, result in analyzer.analyze_batch(
+            [items[index] for index in misses], remain_seconds(scope, _quick_deadline(request.deadline_ms)), admit
+        ):
+            index = misses[position]
+            if "error" in result:
+                failed += 1
+                yield json.dumps({"index": index, "error": result["error"]}) + "\n"
+                continue
             
-        else:
+            pending.append((
+                _analysis_record(items[index]["content_type"], result, request.items[index].metadata,
+                                 items[index]["content"]),
+                keys[index], result
+            ))
+            if len(pending) >= settings.QUICK_BATCH_STORAGE_FLUSH:
+                batch, pending = pending, []
+                await asyncio.to_thread(_store_quick_results, batch)
+            yield json.dumps({"index": index, **QuickAnalysisResponse(**result).model_dump()}) + "\n"
+        
+        yield json.dumps({
+            "done": True,
+            "count": len(items),
+            "cached": len(items) - len(misses),
+            "failed": failed,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+        }) + "\n"
+    finally:
+        if pending:
+            await asyncio.to_thread(_store_quick_results, pending)
+
+async def _receive_upload(request: Request, content_type: Optional[str]) -> StoredUpload:
+    """
+    Accept either a multipart form (fields: file, content_type) or a raw request body
+    (content type given as a query parameter) and spool it to a temp file.
+    """
+    # Reject oversized uploads before reading anything when the client declares a length
+    declared = request.headers.get("content-length")
+    limit = max_upload_bytes(content_type) if content_type else max(
+        max_upload_bytes(t) for t in DEEP_AGENTS
+    )
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds limit of {limit} bytes")
+    
+    header = request.headers.get("content-type", "")
+    if header.startswith("multipart/form-data"):
+        # Starlette spools multipart files to disk as they stream in; the limit is
+        # enforced on the raw body as it arrives, so chunked uploads are cut off too
+        limited = Request(request.scope, limit_receive(request.receive, limit))
+        try:
+            form = await limited.form(max_files=1)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        file = form.get("file")
+        if file is None or isinstance(file, str):
+            raise HTTPException(status_code=400, detail="Multipart upload requires a 'file' field")
+        content_type = form.get("content_type") or content_type or type_from_mime(file.content_type)
+        if content_type not in DEEP_AGENTS:
             raise HTTPException(status_code=400, detail="Unsupported content type")
-            
+        size = file.size if file.size is not None else file.file.seek(0, 2)
+        file.file.seek(0)
+        if size > max_upload_bytes(content_type):
+            raise HTTPException(status_code=413, detail=f"Upload exceeds limit of {max_upload_bytes(content_type)} bytes")
+        return StoredUpload(file.file, size, content_type, file.content_type, file.filename)
+    
+    content_type = content_type or type_from_mime(header)
+    if content_type not in DEEP_AGENTS:
+        raise HTTPException(status_code=400, detail="Raw uploads require a valid 'content_type' query parameter or Content-Type header")
+    try:
+        return await spool_stream(request.stream(), content_type, mime_type=header or None)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@router.post("/analyze", response_model=AnalysisResponse)
+async def analyze_content(request: AnalysisRequest, http_request: Request):
+    """
+    Standard deep analysis endpoint - uses full agent reasoning
+    """
+    try:
+        content_type = await _resolve_content_type(request.content, request.content_type)
+        budget = remain_seconds(http_request.scope, settings.ADMISSION_DEEP_DEADLINE_SECONDS)
+        async with await get_admission_controller().admit("deep", content_type, budget):
+            return await _run_deep_analysis(request.content, content_type)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/quick-analyze", response_model=QuickAnalysisResponse)
-async def quick_analyze(request: QuickAnalysisRequest):
+@router.post("/analyze/stream")
+async def analyze_content_stream(request: AnalysisRequest, http_request: Request):
     """
-    Fast analysis endpoint - uses similarity search and forensics (2-5s response)
+    Deep analysis streamed as Server-Sent Events (route, tool results, LLM tokens, done)
     """
+    content_type = await _resolve_content_type(request.content, request.content_type)
+    if content_type not in DEEP_AGENTS:
+        raise HTTPException(status_code=400, detail="Unsupported content type")
+    ticket = await get_admission_controller().admit(
+        "deep", content_type, remain_seconds(http_request.scope, settings.ADMISSION_DEEP_DEADLINE_SECONDS)
+    )
+    return StreamingResponse(
+        _release_after(_stream_deep_analysis(request.content, content_type), ticket),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ticket.release)  # In case the stream never starts
+    )
+
+@router.post("/analyze/multimodal", response_model=MultimodalResponse)
+async def analyze_multimodal(request: MultimodalRequest, http_request: Request):
+    """
+    Deep analysis of a multi-part post - every part's specialist runs concurrently,
+    verdicts are merged into one report
+    """
+    if not request.parts:
+        raise HTTPException(status_code=400, detail="At least one part is required")
+    if len(request.parts) > settings.MULTIMODAL_MAX_PARTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MULTIMODAL_MAX_PARTS} parts are allowed")
+    
+    started = time.monotonic()
     try:
-        analyzer = get_quick_analyzer()
-        storage = get_storage()
-        
-        # Route based on content type
-        if request.content_type == "text":
-            result = analyzer.analyze_text(request.content)
-        elif request.content_type == "image":
-            result = analyzer.analyze_image(request.content)
-        else:
-            raise HTTPException(status_code=422, detail=f"Content type '{request.content_type}' not yet supported for quick analysis")
-        
-        # Save to storage
-        analysis_id = storage.save_analysis({
-            "content_type": request.content_type,
-            "verdict": result["verdict"],
-            "confidence": result["confidence"],
-            "metadata": request.metadata
-        })
+        content_types = await asyncio.gather(*(
+            _resolve_content_type(part.content, part.content_type) for part in request.parts
+        ))
+        if any(content_type not in DEEP_AGENTS for content_type in content_types):
+            raise HTTPException(status_code=400, detail="Unsupported content type")
         
-        return QuickAnalysisResponse(**result)
+        async def admitted_branch(content: str, content_type: str) -> Dict:
+            # Each part holds a slot of its type's limiter, so one post cannot bypass deep:video
+            budget = remain_seconds(http_request.scope, settings.ADMISSION_DEEP_DEADLINE_SECONDS)
+            async with await get_admission_controller().admit("deep", content_type, budget):
+                return await _run_multimodal_branch(content, content_type)
         
+        branches = await fan_out(
+            [{"content": part.content, "content_type": content_type}
+             for part, content_type in zip(request.parts, content_types)],
+            admitted_branch
+        )
+        merged = merge_verdicts(branches)
+        return MultimodalResponse(
+            **merged,
+            result=merged_report(merged, branches),
+            branches=[MultimodalBranch(**branch) for branch in branches],
+            elapsed_ms=round((time.monotonic() - started) * 1000, 1)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/analyze/upload", response_model=AnalysisResponse)
+async def analyze_upload(request: Request, content_type: Optional[str] = None):
+    """
+    Deep analysis of a multipart or raw-body upload (no base64 encoding)
+    """
+    upload = await _receive_upload(request, content_type)
+    registry = get_upload_registry()
+    reference = None
+    try:
+        if upload.content_type == "text":
+            content = upload.text()
+        else:
+            # Agents pass the short reference to their tools instead of the payload
+            reference = registry.register(upload)
+            content = reference
+        budget = remain_seconds(request.scope, settings.ADMISSION_DEEP_DEADLINE_SECONDS)
+        async with await get_admission_controller().admit("deep", upload.content_type, budget):
+            return await _run_deep_analysis(content, upload.content_type)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if reference:
+            registry.release(reference)
+        else:
+            upload.close()
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobSubmitRequest):
+    """
+    Queue a deep analysis and return immediately; poll /jobs/{job_id} or pass a webhook_url
+    """
+    if not settings.JOBS_ENABLED:
+        raise HTTPException(status_code=503, detail="Job queue is disabled")
+    content_type = await _resolve_content_type(request.content, request.content_type)
+    if content_type not in DEEP_AGENTS:
+        raise HTTPException(status_code=400, detail="Unsupported content type")
+    if content_type not in settings.JOB_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"No job workers configured for '{content_type}'")
+    
+    if request.webhook_url:
+        try:
+            await check_webhook_url(str(request.webhook_url))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    queue = get_job_queue()
+    job_id = await asyncio.to_thread(
+        queue.submit, content_type, {"content": request.content}, request.priority,
+        str(request.webhook_url) if request.webhook_url else None
+    )
+    workers = get_job_workers()
+    if workers is not None:
+        workers.notify(content_type)
+    return await get_job(job_id)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Status of a queued analysis, with the result once it has succeeded
+    """
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return JobResponse(job_id=job.pop("id"), **job)
+
+@router.post("/quick-analyze", response_model=QuickAnalysisResponse)
+async def quick_analyze(request: QuickAnalysisRequest, http_request: Request):
+    """
+    Fast analysis endpoint - uses similarity search and forensics (2-5s response)
+    """
+    # One deadline from arrival: time queued for admission is taken out of the analysis budget
+    deadline = _quick_deadline(request.deadline_ms)
+    try:
+        async with await get_admission_controller().admit("quick", request.content_type,
+                                                          remain_seconds(http_request.scope, deadline)):
+            return await _run_quick_analysis(request.content, request.content_type, request.metadata,
+                                             remain_seconds(http_request.scope, deadline))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/quick-analyze/batch")
+async def quick_analyze_batch(request: QuickBatchRequest, http_request: Request):
+    """
+    Fast analysis of many items at once, streamed back as NDJSON in completion order
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+    if len(request.items) > settings.QUICK_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.QUICK_BATCH_MAX_ITEMS} items are allowed per batch")
+    return StreamingResponse(
+        _stream_quick_batch(request, http_request.scope),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/quick-analyze/upload", response_model=QuickAnalysisResponse)
+async def quick_analyze_upload(request: Request, content_type: Optional[str] = None, deadline_ms: Optional[int] = None):
+    """
+    Fast analysis of a multipart or raw-body upload (no base64 encoding)
+    """
+    upload = await _receive_upload(request, content_type)
+    content = None
+    try:
+        # Images go to forensics as a zero-copy memoryview of the spooled file
+        content = upload.text() if upload.content_type == "text" else upload.buffer()
+        deadline = _quick_deadline(deadline_ms)
+        async with await get_admission_controller().admit("quick", upload.content_type,
+                                                          remain_seconds(request.scope, deadline)):
+            return await _run_quick_analysis(content, upload.content_type, {
+                "filename": upload.filename,
+                "mime_type": upload.mime_type,
+                "size": upload.size
+            }, remain_seconds(request.scope, deadline))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Let go of the view first: a live export keeps the mmap from closing
+        if isinstance(content, memoryview):
+            try:
+                content.release()
+            except BufferError:
+                pass  # Still exported by a consumer; close() reports the leak
+        content = None
+        upload.close()
+
+def _submitter(request: Request) -> Optional[str]:
+    """
+    Pseudonymous submitter id: feedback learning counts one vote per submitter
+
+    The identity is FEEDBACK_SUBMITTER_HEADER when configured (for X-Forwarded-For, the
+    address appended by the proxy), else the client address. It is keyed with SECRET_KEY,
+    so stored ids cannot be reversed by hashing candidate addresses.
+    """
+    if settings.FEEDBACK_SUBMITTER_HEADER:
+        identity = request.headers.get(settings.FEEDBACK_SUBMITTER_HEADER, "").split(",")[-1].strip()
+    else:
+        identity = request.client.host if request.client else ""
+    if not identity:
+        return None
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), identity.encode("utf-8"), hashlib.sha256).hexdigest()[:16]
 
 @router.post("/feedback")
-async def submit_feedback(feedback: FeedbackRequest):
+async def submit_feedback(feedback: FeedbackRequest, request: Request):
     """
     Submit user feedback on analysis results
     """
@@ -114,7 +692,10 @@ async def submit_feedback(feedback: FeedbackRequest):
         
         feedback_data = {
             "analysis_id": feedback.analysis_id,
-            "original_content": feedback.original_content[:200],  # Truncate for storage
+            "original_content": feedback.original_content[:settings.FEEDBACK_MAX_CONTENT_CHARS],  # Truncate for storage
+            # Digest of the full claim, matched against the analysis it refers to
+            "content_digest": VerdictCache.digest(feedback.original_content, "text"),
+            "submitter": _submitter(request),
             "predicted_verdict": feedback.predicted_verdict,
             "user_verdict": feedback.user_verdict,
             "user_confidence": feedback.user_confidence,
@@ -140,12 +721,33 @@ async def get_stats():
     try:
         storage = get_storage()
         from app.core.embeddings import get_embeddings_manager
+        from app.core.forensics import get_forensics
+        from app.core.payloads import get_payload_metrics
+        from app.core.video_fingerprint import get_video_fingerprint_index
+        from app.core.audio_fingerprint import get_audio_fingerprint_index
+        from app.core.huggingface import hf_client
+        from app.core.summary_cache import get_summary_cache
+        from app.core.cascade import get_cascade_metrics
+        from app.agents.supervisor import get_routing_stats
+        from app.core.feedback_learning import get_feedback_consolidator
         
         embeddings = get_embeddings_manager()
         
         return {
             "storage": storage.get_stats(),
-            "embeddings": embeddings.get_stats()
+            "embeddings": embeddings.get_stats(),
+            "forensics": get_forensics().get_stats(),
+            "payloads": get_payload_metrics().get_stats(),
+            "video_fingerprints": get_video_fingerprint_index().get_stats(),
+            "audio_fingerprints": get_audio_fingerprint_index().get_stats(),
+            "huggingface": hf_client.get_stats(),
+            "summary_cache": get_summary_cache().get_stats(),
+            "cascade": get_cascade_metrics().get_stats(),
+            "routing": get_routing_stats(),
+            "jobs": get_job_workers().get_stats() if get_job_workers() else None,
+            "admission": get_admission_controller().get_stats(),
+            "verdict_cache": get_verdict_cache().get_stats(),
+            "feedback_learning": get_feedback_consolidator().get_stats()
         }
         
     except Exception as e:
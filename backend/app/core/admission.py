@@ -0,0 +1,262 @@
+"""
+Admission Control - Concurrency limits and load shedding
+Each limiter admits a fixed number of concurrent requests and queues a bounded
+number more. A request is turned away up front when the queue is full (429)
+or when its expected queue time plus run time would overrun its deadline
+(503), both with Retry-After. Limits apply per route (ASGI middleware) and per
+analysis kind and content type (inside the endpoints), so a burst of heavy
+video analyses cannot starve cheap text checks.
+
+A request's deadline runs from its arrival: the middleware stamps the arrival
+time into the ASGI scope, and every later limiter and the analysis itself only
+get what remain_seconds() says is left.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from urllib.parse import parse_qs
+import logging
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the service-time moving average
+SERVICE_EWMA_ALPHA = 0.2
+
+# ASGI scope key holding the request's arrival time (time.monotonic())
+ARRIVED_AT = "admission.arrived_at"
+
+
+class AdmissionRejected(HTTPException):
+    """429 (queue full) or 503 (deadline cannot be met), with a Retry-After hint"""
+
+    def __init__(self, limiter: str, status_code: int, retry_after: float, reason: str):
+        self.limiter = limiter
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=status_code,
+            detail=f"Server busy ({limiter}): {reason}; retry in {self.retry_after}s",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded FIFO wait queue (one event loop)"""
+
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time: Optional[float] = None  # Moving average of time holding a slot
+        self._wait_total = 0.0
+        self._stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_deadline": 0,
+                       "timed_out": 0, "max_waiting": 0}
+
+    def estimated_wait(self) -> float:
+        """Expected queue time for a request arriving now"""
+        if self._in_flight < self.limit and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) / self.limit * (self._service_time or 0.0)
+
+    async def acquire(self, deadline: float):
+        """
+        Take a slot, waiting in line if needed
+
+        Args:
+            deadline: Seconds the request may spend in total (queue + run)
+
+        Raises:
+            AdmissionRejected: Queue full, or the deadline cannot be met
+        """
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            self._stats["admitted"] += 1
+            return
+
+        service = self._service_time or 0.0
+        estimate = self.estimated_wait()
+        if len(self._waiters) >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise AdmissionRejected(self.name, 429, estimate or service, "queue full")
+        if estimate + service > deadline:
+            self._stats["rejected_deadline"] += 1
+            raise AdmissionRejected(self.name, 503, estimate, f"expected wait {estimate:.1f}s exceeds the deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        self._stats["max_waiting"] = max(self._stats["max_waiting"], len(self._waiters))
+        started = time.monotonic()
+        try:
+            # Leave the request enough time to run once it gets its slot
+            await asyncio.wait_for(waiter, max(deadline - service, 0.01))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                self._hand_over()
+            self._stats["timed_out"] += 1
+            raise AdmissionRejected(self.name, 503, self.estimated_wait(), "queue wait exceeded the deadline")
+        except asyncio.CancelledError:
+            # A slot handed over just as the client went away must be passed on
+            if waiter.done() and not waiter.cancelled():
+                self._hand_over()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._wait_total += time.monotonic() - started
+        self._stats["admitted"] += 1
+
+    def release(self, held_seconds: Optional[float] = None):
+        """Free a slot (passed straight to the next waiter); held_seconds feeds the wait estimate"""
+        if held_seconds is not None:
+            self._service_time = held_seconds if self._service_time is None else (
+                SERVICE_EWMA_ALPHA * held_seconds + (1 - SERVICE_EWMA_ALPHA) * self._service_time
+            )
+        self._hand_over()
+
+    def _hand_over(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def get_stats(self) -> Dict:
+        queued = self._stats["queued"]
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            **self._stats,
+            "avg_wait_ms": round(self._wait_total / queued * 1000, 1) if queued else 0.0,
+            "avg_service_ms": round((self._service_time or 0.0) * 1000, 1)
+        }
+
+
+class Ticket:
+    """An admitted request's slot; release exactly once"""
+
+    def __init__(self, limiter: Optional[AdmissionLimiter]):
+        self.limiter = limiter
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self.limiter is not None and not self._released:
+            self._released = True
+            self.limiter.release(time.monotonic() - self.started)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    """Named limiters, created on first use from the configured limits"""
+
+    def __init__(self):
+        self._limiters: Dict[str, AdmissionLimiter] = {}
+
+    def _limiter(self, name: str, limits: Dict[str, int]) -> Optional[AdmissionLimiter]:
+        limiter = self._limiters.get(name)
+        if limiter is None and settings.ADMISSION_ENABLED and name in limits:
+            limiter = AdmissionLimiter(name, limits[name], settings.ADMISSION_MAX_QUEUE)
+            self._limiters[name] = limiter
+        return limiter
+
+    async def admit(self, kind: str, content_type: str, deadline: float) -> Ticket:
+        """
+        Admit one analysis of a kind ("deep" / "quick") and content type
+
+        Usage:
+            async with await admission.admit("quick", "image", 4.0):
+                ...
+        """
+        limiter = self._limiter(f"{kind}:{content_type}", settings.ADMISSION_TYPE_LIMITS)
+        if limiter is not None:
+            await limiter.acquire(deadline)
+        return Ticket(limiter)
+
+    async def admit_route(self, route: str, deadline: float) -> Ticket:
+        limiter = self._limiter(route, settings.ADMISSION_ROUTE_LIMITS)
+        if limiter is not None:
+            await limiter.acquire(deadline)
+        return Ticket(limiter)
+
+    def get_stats(self) -> Dict:
+        return {name: limiter.get_stats() for name, limiter in sorted(self._limiters.items())}
+
+
+def remain_seconds(scope: Dict, deadline: float) -> float:
+    """What is left of a deadline counted from the request's arrival (the full deadline if unstamped)"""
+    arrived_at = scope.get(ARRIVED_AT)
+    if arrived_at is None:
+        return deadline
+    return max(deadline - (time.monotonic() - arrived_at), 0.0)
+
+
+def route_deadline(route: str, query_string: bytes = b"") -> float:
+    """
+    Time budget of a route's requests: the quick deadline for quick checks, else the deep one
+
+    A deadline_ms query parameter (/quick-analyze/upload) is honoured. The body is
+    never read here, so a deadline_ms in a JSON body (/quick-analyze) only applies
+    from the endpoint's per-type limiter on; the route limiter uses QUICK_DEADLINE_SECONDS.
+    """
+    if route in ("/quick-analyze", "/quick-analyze/upload"):
+        deadline_ms = parse_qs(query_string.decode("latin-1")).get("deadline_ms", [""])[-1]
+        if deadline_ms.isdigit() and int(deadline_ms) > 0:
+            return int(deadline_ms) / 1000.0
+        return settings.QUICK_DEADLINE_SECONDS
+    return settings.ADMISSION_DEEP_DEADLINE_SECONDS
+
+
+class AdmissionMiddleware:
+    """
+    Per-route admission for the API routes listed in ADMISSION_ROUTE_LIMITS
+
+    Pure ASGI so the body is never read here and streaming responses keep
+    their slot until the last chunk is sent.
+    """
+
+    def __init__(self, app, prefix: str = ""):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault(ARRIVED_AT, time.monotonic())
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        route = scope["path"][len(self.prefix):]
+        try:
+            ticket = await _controller.admit_route(route, route_deadline(route, scope.get("query_string", b"")))
+        except AdmissionRejected as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ticket.release()
+
+
+_controller = AdmissionController()
+
+def get_admission_controller():
+    """Get global admission controller instance"""
+    return _controller
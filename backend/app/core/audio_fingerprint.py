@@ -0,0 +1,297 @@
+"""
+Audio Fingerprinting - Spectral-landmark index for known audio clips
+Peaks of a log spectrogram are paired into (f1, f2, dt) landmark hashes;
+matching clips share many hashes at one consistent time offset, which
+survives trimming, resampling and re-quantization. Entries carry a "verified"
+flag: only verified verdicts may stand in for a fresh analysis.
+"""
+import cv2
+import numpy as np
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from app.core.audio_stream import iter_audio_blocks
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+N_FFT = 1024
+HOP = 256
+CHUNK_FRAMES = 1024         # Spectrogram frames processed per chunk (~33s at 8 kHz)
+PEAK_NEIGHBORHOOD = (15, 21)  # (time frames, frequency bins) for local-maximum detection
+PEAKS_PER_SECOND = 30
+FAN_OUT = 10                # Pairs formed per anchor peak
+MAX_DT = 63                 # Maximum anchor-target distance in frames (6 bits)
+MAX_BUCKET = 5000           # Ignore hashes shared by more entries than this
+FREQ_BINS = N_FFT // 2      # Bins 0..511 fit the 9-bit frequency fields; the Nyquist bin is dropped
+PEAK_BACKGROUND_GUARD = 2   # Offsets this close to the best one are not counted as background
+
+
+def _spectral_peaks(samples: np.ndarray, rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(frame index, frequency bin) of prominent spectrogram peaks"""
+    if samples.size < N_FFT:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, N_FFT)[::HOP]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=1))[:, :FREQ_BINS]
+    log_spec = np.log1p(spectrum).astype(np.float32)
+
+    # Local maxima via grey dilation; cv2 works on float32 images directly
+    kernel = np.ones(PEAK_NEIGHBORHOOD, dtype=np.uint8)
+    is_peak = (log_spec == cv2.dilate(log_spec, kernel)) & (log_spec > log_spec.mean() + log_spec.std())
+    times, freqs = np.nonzero(is_peak)
+
+    # Keep the strongest peaks up to a fixed density
+    budget = max(int(PEAKS_PER_SECOND * samples.size / rate), 1)
+    if times.size > budget:
+        strongest = np.argsort(log_spec[times, freqs])[::-1][:budget]
+        times, freqs = times[strongest], freqs[strongest]
+    order = np.lexsort((freqs, times))
+    return times[order], freqs[order]
+
+
+def _landmarks(times: np.ndarray, freqs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pair each peak with the next FAN_OUT peaks; return (hashes, anchor times)"""
+    hashes, anchors = [], []
+    for k in range(1, FAN_OUT + 1):
+        if times.size <= k:
+            break
+        dt = times[k:] - times[:-k]
+        valid = (dt > 0) & (dt <= MAX_DT)
+        f1 = freqs[:-k][valid]
+        f2 = freqs[k:][valid]
+        hashes.append(((f1 << 15) | (f2 << 6) | dt[valid]).astype(np.uint32))
+        anchors.append(times[:-k][valid].astype(np.uint32))
+    if not hashes:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint32)
+    return np.concatenate(hashes), np.concatenate(anchors)
+
+
+def compute_fingerprint(path: str, mime_type: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Landmark hashes and their times (in spectrogram frames) for an audio file
+
+    The spectrogram is computed chunk by chunk, so memory is bounded by
+    CHUNK_FRAMES regardless of clip length.
+    """
+    rate = settings.AUDIO_FINGERPRINT_RATE
+    chunk_samples = CHUNK_FRAMES * HOP + N_FFT - HOP
+    buffer = np.zeros(0, dtype=np.float32)
+    frame_offset = 0
+    all_times, all_freqs = [], []
+
+    def flush(samples: np.ndarray, offset: int):
+        times, freqs = _spectral_peaks(samples, rate)
+        all_times.append(times + offset)
+        all_freqs.append(freqs)
+
+    for block in iter_audio_blocks(path, mime_type, rate=rate, max_seconds=settings.AUDIO_FINGERPRINT_MAX_SECONDS):
+        buffer = np.concatenate([buffer, block])
+        while buffer.size >= chunk_samples:
+            flush(buffer[:chunk_samples], frame_offset)
+            buffer = buffer[CHUNK_FRAMES * HOP:]
+            frame_offset += CHUNK_FRAMES
+    flush(buffer, frame_offset)
+
+    times = np.concatenate(all_times)
+    freqs = np.concatenate(all_freqs)
+    order = np.lexsort((freqs, times))
+    return _landmarks(times[order], freqs[order])
+
+
+class AudioFingerprintIndex:
+    """Hashed inverted index of landmark hashes, kept sorted for binary-search lookup"""
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+
+        # Arrays and metadata share one file so a crash can never leave them out of step
+        self.index_path = self.data_dir / "audio_fingerprints.npz"
+        self.legacy_metadata_path = self.data_dir / "audio_fingerprints.json"
+
+        # Parallel arrays sorted by hash
+        self.hashes = np.zeros(0, dtype=np.uint32)
+        self.clip_ids = np.zeros(0, dtype=np.uint32)
+        self.times = np.zeros(0, dtype=np.uint32)
+        self.clips: List[Dict] = []
+        self.verified = 0  # Entries that may stand in for a fresh analysis
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load_index()
+
+    def _load_index(self):
+        """Load the index from disk if present"""
+        if not self.index_path.exists():
+            return
+        try:
+            arrays = np.load(self.index_path)
+            if "clips" in arrays.files:
+                clips = json.loads(str(arrays["clips"]))
+            else:
+                # Written before metadata moved into the npz
+                with open(self.legacy_metadata_path, 'r', encoding='utf-8') as f:
+                    clips = json.load(f)
+            # Landmarks of clips whose metadata never reached disk are dropped
+            keep = arrays["clip_ids"] < len(clips)
+            self.hashes = arrays["hashes"][keep]
+            self.clip_ids = arrays["clip_ids"][keep]
+            self.times = arrays["times"][keep]
+            self.clips = clips
+            self.verified = sum(1 for clip in clips if clip.get("verified"))
+            logger.info(f"Loaded {len(self.clips)} audio fingerprints ({len(self.hashes)} landmarks)")
+        except Exception as e:
+            logger.error(f"Error loading audio fingerprint index: {e}")
+
+    def _save_index(self):
+        """Persist arrays and metadata in one atomically replaced file"""
+        with self._lock:
+            hashes, clip_ids, times = self.hashes, self.clip_ids, self.times
+            clips = list(self.clips)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        with self._save_lock:
+            tmp = self.index_path.with_suffix(".tmp")
+            try:
+                with open(tmp, 'wb') as f:
+                    np.savez(f, hashes=hashes, clip_ids=clip_ids, times=times, clips=np.array(json.dumps(clips)))
+                os.replace(tmp, self.index_path)
+            except Exception as e:
+                logger.error(f"Error saving audio fingerprint index: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def flush(self):
+        """Write pending additions to disk (called on shutdown)"""
+        if self._dirty:
+            self._save_index()
+
+    def add(self, fingerprint: Tuple[np.ndarray, np.ndarray], metadata: Dict, verified: bool = False) -> int:
+        """
+        Add a clip's landmarks with its metadata (verdict, score, source...)
+
+        Blocking (array merge, periodic persistence): call from a worker thread.
+
+        Args:
+            verified: True only for confirmed verdicts; unverified entries never
+                replace a fresh analysis
+        """
+        hashes, times = fingerprint
+        if hashes.size == 0:
+            raise ValueError("Empty fingerprint")
+        order = np.argsort(hashes, kind="stable")
+        hashes, times = hashes[order].astype(np.uint32), times[order].astype(np.uint32)
+        with self._lock:
+            clip_id = len(self.clips)
+            # Linear merge into the sorted arrays instead of re-sorting the whole index
+            at = np.searchsorted(self.hashes, hashes, side="right")
+            self.hashes = np.insert(self.hashes, at, hashes)
+            self.clip_ids = np.insert(self.clip_ids, at, np.full(hashes.size, clip_id, dtype=np.uint32))
+            self.times = np.insert(self.times, at, times)
+            self.clips = self.clips + [{
+                "id": clip_id,
+                "landmarks": int(hashes.size),
+                "added_at": time.time(),
+                **metadata,
+                "verified": verified
+            }]
+            self.verified += int(verified)
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= settings.FINGERPRINT_SAVE_INTERVAL_SECONDS
+        if due:
+            self._save_index()
+        logger.info(f"Indexed audio fingerprint {clip_id} ({hashes.size} landmarks)")
+        return clip_id
+
+    def lookup(self, fingerprint: Tuple[np.ndarray, np.ndarray]) -> Optional[Dict]:
+        """
+        Find an indexed clip sharing enough landmarks at one consistent time offset
+
+        Returns:
+            Clip metadata (including "verified") plus match statistics, or None
+        """
+        query_hashes, query_times = fingerprint
+        with self._lock:
+            hashes, clip_ids, times, clips = self.hashes, self.clip_ids, self.times, self.clips
+        if query_hashes.size == 0 or hashes.size == 0:
+            return None
+
+        lo = np.searchsorted(hashes, query_hashes, side="left")
+        hi = np.searchsorted(hashes, query_hashes, side="right")
+        counts = hi - lo
+        counts[counts > MAX_BUCKET] = 0
+        total = int(counts.sum())
+        if total == 0:
+            return None
+
+        # Expand the [lo, hi) ranges without a Python loop
+        starts = np.repeat(lo, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        matched = starts + offsets
+        query_matched = np.repeat(np.arange(query_hashes.size), counts)
+
+        # Vote on (clip, time offset)
+        deltas = times[matched].astype(np.int64) - query_times[query_matched].astype(np.int64)
+        keys, votes = np.unique(np.stack([clip_ids[matched].astype(np.int64), deltas], axis=1), axis=0, return_counts=True)
+
+        # Peaks jitter by a frame between copies; pool votes of adjacent offsets.
+        # keys are sorted by (clip, delta), so neighbours are adjacent rows
+        pooled = votes.copy()
+        same_clip = keys[1:, 0] == keys[:-1, 0]
+        adjacent = same_clip & (keys[1:, 1] - keys[:-1, 1] == 1)
+        pooled[:-1] += np.where(adjacent, votes[1:], 0)
+        pooled[1:] += np.where(adjacent, votes[:-1], 0)
+
+        best = int(pooled.argmax())
+        clip_id, delta = keys[best].tolist()
+        score = int(pooled[best])
+
+        # Long clips collect chance votes; a real copy also needs a fair share of its
+        # landmarks aligned, and an offset peak that stands out of that clip's histogram
+        ratio = score / min(query_hashes.size, clips[clip_id]["landmarks"])
+        background = (keys[:, 0] == clip_id) & (np.abs(keys[:, 1] - delta) > PEAK_BACKGROUND_GUARD)
+        runner_up = int(pooled[background].max()) if background.any() else 0
+        if (score < settings.AUDIO_FINGERPRINT_MIN_MATCHES
+                or ratio < settings.AUDIO_FINGERPRINT_MIN_RATIO
+                or score < settings.AUDIO_FINGERPRINT_PEAK_FACTOR * max(runner_up, 1)):
+            return None
+
+        frame_seconds = HOP / settings.AUDIO_FINGERPRINT_RATE
+        return {
+            **clips[clip_id],
+            "matched_landmarks": score,
+            "match_ratio": round(ratio, 3),
+            "peak_factor": round(score / max(runner_up, 1), 1),
+            "offset_seconds": round(delta * frame_seconds, 2)
+        }
+
+    def get_stats(self) -> Dict:
+        """Get statistics about the index"""
+        return {
+            "clips": len(self.clips),
+            "verified_clips": self.verified,
+            "landmarks": int(self.hashes.size),
+            "index_bytes": int(self.hashes.nbytes + self.clip_ids.nbytes + self.times.nbytes)
+        }
+
+# Global instance
+_audio_fingerprint_index = None
+
+def get_audio_fingerprint_index():
+    """Get or create global audio fingerprint index instance"""
+    global _audio_fingerprint_index
+    if _audio_fingerprint_index is None:
+        _audio_fingerprint_index = AudioFingerprintIndex()
+    return _audio_fingerprint_index
+
+def flush_audio_fingerprints():
+    """Persist pending fingerprint additions, if the index was used"""
+    if _audio_fingerprint_index is not None:
+        _audio_fingerprint_index.flush()
@@ -0,0 +1,232 @@
+"""
+Audio Streaming - Windowed, silence-skipping audio decoding
+Decodes WAV / raw PCM block by block into NumPy, drops silence with an
+energy-based voice activity detector and cuts speech into fixed windows
+"""
+import io
+import math
+import os
+import wave
+import numpy as np
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AudioFormatError(Exception):
+    """Raised when the audio cannot be decoded locally (e.g. compressed formats)"""
+
+
+class SpeechWindow(NamedTuple):
+    start: float          # Seconds from the start of the clip
+    end: float
+    samples: np.ndarray   # Mono float32 at AUDIO_SAMPLE_RATE
+
+
+def _pcm_params(mime_type: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(sample rate, channels) for raw 16-bit PCM MIME types such as 'audio/L16;rate=16000'"""
+    if not mime_type:
+        return None
+    base, *params = [p.strip().lower() for p in mime_type.split(";")]
+    if base not in ("audio/l16", "audio/pcm", "audio/x-pcm", "audio/raw"):
+        return None
+    options = dict(p.split("=", 1) for p in params if "=" in p)
+    return int(options.get("rate", settings.AUDIO_SAMPLE_RATE)), int(options.get("channels", 1))
+
+
+def _to_float(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Interleaved PCM bytes -> mono float32 in [-1, 1]"""
+    if sample_width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise AudioFormatError(f"Unsupported sample width: {sample_width}")
+    if channels > 1:
+        data = data[: len(data) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return data
+
+
+def _resample(block: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Linear-interpolation resampling (adequate for classifier input)"""
+    if source_rate == target_rate or block.size == 0:
+        return block
+    target_len = int(round(block.size * target_rate / source_rate))
+    positions = np.linspace(0, block.size - 1, target_len, dtype=np.float32)
+    return np.interp(positions, np.arange(block.size, dtype=np.float32), block).astype(np.float32)
+
+
+def _iter_blocks(path: str, mime_type: Optional[str]) -> Tuple[int, float, Iterator[np.ndarray]]:
+    """Open the file and return (source rate, duration, iterator of ~1s float blocks)"""
+    with open(path, "rb") as f:
+        header = f.read(12)
+
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        try:
+            # Non-PCM WAVs (IEEE float, A-law...) are refused by the wave module
+            reader = wave.open(path, "rb")
+        except (wave.Error, EOFError) as e:
+            raise AudioFormatError(f"Not a PCM WAV file: {e}")
+        rate, channels, width = reader.getframerate(), reader.getnchannels(), reader.getsampwidth()
+        duration = reader.getnframes() / float(rate)
+
+        def blocks():
+            try:
+                while True:
+                    raw = reader.readframes(rate)
+                    if not raw:
+                        break
+                    yield _to_float(raw, width, channels)
+            except (wave.Error, EOFError) as e:
+                raise AudioFormatError(f"Not a PCM WAV file: {e}")
+            finally:
+                reader.close()
+        return rate, duration, blocks()
+
+    pcm = _pcm_params(mime_type)
+    if pcm is None:
+        raise AudioFormatError("Only WAV and raw 16-bit PCM can be decoded locally")
+    rate, channels = pcm
+    block_bytes = rate * channels * 2
+    duration = os.path.getsize(path) / float(block_bytes)
+
+    def blocks():
+        with open(path, "rb") as f:
+            while True:
+                raw = f.read(block_bytes)
+                if not raw:
+                    break
+                yield _to_float(raw[: len(raw) // 2 * 2], 2, channels)
+    return rate, duration, blocks()
+
+
+def iter_audio_blocks(path: str, mime_type: Optional[str] = None, rate: Optional[int] = None,
+                      max_seconds: Optional[float] = None) -> Iterator[np.ndarray]:
+    """Stream ~1s mono float32 blocks resampled to rate (default AUDIO_SAMPLE_RATE)"""
+    rate = rate or settings.AUDIO_SAMPLE_RATE
+    source_rate, _, blocks = _iter_blocks(path, mime_type)
+    remaining = int(max_seconds * rate) if max_seconds else None
+    for block in blocks:
+        block = _resample(block, source_rate, rate)
+        if remaining is not None:
+            block = block[:remaining]
+            remaining -= block.size
+        if block.size:
+            yield block
+        if remaining is not None and remaining <= 0:
+            break
+
+
+def iter_speech_windows(path: str, mime_type: Optional[str] = None, stats: Optional[Dict] = None) -> Iterator[SpeechWindow]:
+    """
+    Stream fixed-length speech windows out of an audio file
+
+    Only one block and one window of samples are held at a time. For clips with
+    more speech than AUDIO_MAX_WINDOWS windows, windows are taken at an even
+    stride across the clip instead of only from its start.
+
+    Args:
+        path: Audio file path
+        mime_type: Used to recognise raw PCM uploads
+        stats: Optional dict filled with duration / speech statistics
+    """
+    source_rate, duration, blocks = _iter_blocks(path, mime_type)
+    rate = settings.AUDIO_SAMPLE_RATE
+    frame_len = int(rate * settings.AUDIO_VAD_FRAME_MS / 1000)
+    window_len = int(rate * settings.AUDIO_WINDOW_SECONDS)
+    min_len = int(rate * settings.AUDIO_MIN_WINDOW_SECONDS)
+    hangover_frames = int(settings.AUDIO_VAD_HANGOVER_MS / settings.AUDIO_VAD_FRAME_MS)
+
+    expected_windows = duration / settings.AUDIO_WINDOW_SECONDS
+    stride = max(int(math.ceil(expected_windows / settings.AUDIO_MAX_WINDOWS)), 1)
+
+    stats = stats if stats is not None else {}
+    stats.update({"duration": round(duration, 2), "speech_seconds": 0.0, "window_stride": stride})
+
+    noise_floor_db = None
+    hangover = 0
+    window = []
+    window_size = 0
+    window_start = None
+    window_count = 0
+    emitted = 0
+    carry = np.zeros(0, dtype=np.float32)
+    position = 0  # samples consumed at the target rate
+
+    for block in blocks:
+        block = np.concatenate([carry, _resample(block, source_rate, rate)])
+        n_frames = block.size // frame_len
+        carry = block[n_frames * frame_len:]
+        if n_frames == 0:
+            continue
+
+        frames = block[: n_frames * frame_len].reshape(n_frames, frame_len)
+        energy_db = 10.0 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+        # Adaptive threshold: a margin above the quietest recent frames, never below the absolute floor
+        block_floor = float(np.percentile(energy_db, 10))
+        noise_floor_db = block_floor if noise_floor_db is None else 0.9 * noise_floor_db + 0.1 * block_floor
+        threshold = max(settings.AUDIO_VAD_THRESHOLD_DB, noise_floor_db + settings.AUDIO_VAD_MARGIN_DB)
+        is_speech = energy_db > threshold
+
+        for i in range(n_frames):
+            if is_speech[i]:
+                hangover = hangover_frames
+            elif hangover > 0:
+                hangover -= 1
+            else:
+                continue
+
+            if window_start is None:
+                window_start = (position + i * frame_len) / rate
+            window.append(frames[i])
+            window_size += frame_len
+            stats["speech_seconds"] += frame_len / rate
+
+            if window_size >= window_len:
+                if window_count % stride == 0:
+                    emitted += 1
+                    yield SpeechWindow(window_start, (position + (i + 1) * frame_len) / rate, np.concatenate(window))
+                window_count += 1
+                window, window_size, window_start = [], 0, None
+                if emitted >= settings.AUDIO_MAX_WINDOWS:
+                    stats["speech_seconds"] = round(stats["speech_seconds"], 2)
+                    return
+
+        position += n_frames * frame_len
+
+    if window_size >= min_len and window_count % stride == 0:
+        yield SpeechWindow(window_start, position / rate, np.concatenate(window))
+    stats["speech_seconds"] = round(stats["speech_seconds"], 2)
+
+
+def decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """Decode in-memory WAV bytes into (mono float32 samples, sample rate)"""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as reader:
+            raw = reader.readframes(reader.getnframes())
+            return _to_float(raw, reader.getsampwidth(), reader.getnchannels()), reader.getframerate()
+    except (wave.Error, EOFError) as e:
+        raise AudioFormatError(f"Not a PCM WAV file: {e}")
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    """Encode mono float samples as 16-bit PCM WAV"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+    return out.getvalue()
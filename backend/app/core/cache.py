@@ -0,0 +1,184 @@
+"""
+Tiered Cache - Content-addressed result caching
+In-memory LRU tier in front of an optional on-disk JSON tier, with optional TTL,
+eviction and hit-rate metrics
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TieredCache:
+    """
+    Two-tier (memory LRU + disk) cache for JSON-serializable values
+
+    With cache_dir=None only the memory tier is used. With ttl_seconds set,
+    entries expire that long after being written; disk entries are then stored
+    as {"expires_at": ..., "value": ...} envelopes.
+    """
+
+    def __init__(self, cache_dir: Optional[str], memory_entries: int = 1024, disk_entries: int = 20000,
+                 ttl_seconds: Optional[float] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (expires_at or None, value)
+        self._memory: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "expired": 0
+        }
+
+        # Count existing disk entries once; kept up to date incrementally afterwards
+        self._disk_count = sum(1 for _ in self.cache_dir.glob("*/*.json")) if self.cache_dir else 0
+
+    def _path_for(self, key: str) -> Path:
+        """Shard entries into sub-directories by key prefix"""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Look up a key in memory, then on disk (promoting disk hits)"""
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                expires_at, value = self._memory[key]
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._stats["expired"] += 1
+            if self.cache_dir is None:
+                self._stats["misses"] += 1
+                return None
+
+        path = self._path_for(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            expires_at = None
+            if self.ttl_seconds is not None:
+                expires_at, value = value["expires_at"], value["value"]
+                if expires_at <= now:
+                    self._remove_disk(path)
+                    with self._lock:
+                        self._stats["expired"] += 1
+                        self._stats["misses"] += 1
+                    return None
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Corrupt cache entry {key[:12]}: {e}")
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        # Refresh mtime so disk eviction stays approximately LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._put_memory(key, value, expires_at)
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value in both tiers"""
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            self._put_memory(key, value, expires_at)
+        if self.cache_dir is None:
+            return
+
+        if expires_at is not None:
+            value = {"expires_at": expires_at, "value": value}
+        path = self._path_for(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            is_new = not path.exists()
+            # Write to a temp file and rename so readers never see partial JSON
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing cache entry {key[:12]}: {e}")
+            return
+
+        if is_new:
+            with self._lock:
+                self._disk_count += 1
+                over_limit = self._disk_count > self.disk_entries
+            if over_limit:
+                self._evict_disk()
+
+    def _remove_disk(self, path: Path):
+        """Delete an expired disk entry"""
+        try:
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._disk_count = max(self._disk_count - 1, 0)
+
+    def _put_memory(self, key: str, value: Any, expires_at: Optional[float] = None):
+        """Insert into the LRU tier (caller holds the lock)"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        """Drop the least recently used ~10% of disk entries"""
+        try:
+            entries = sorted(self.cache_dir.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        except OSError as e:
+            logger.error(f"Error scanning cache directory: {e}")
+            return
+
+        target = max(int(self.disk_entries * 0.9), 0)
+        removed = 0
+        for path in entries[:max(len(entries) - target, 0)]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+
+        with self._lock:
+            self._disk_count = len(entries) - removed
+            self._stats["disk_evictions"] += removed
+        logger.info(f"Evicted {removed} entries from {self.cache_dir}")
+
+    def get_stats(self) -> Dict:
+        """Get hit-rate and size statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+            stats["disk_size"] = self._disk_count
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
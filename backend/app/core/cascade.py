@@ -0,0 +1,108 @@
+"""
+Analysis Cascade - Confidence-gated early exit between analysis stages
+Stages run from cheapest to most expensive; a request leaves the cascade at
+the first stage whose confidence reaches that stage's threshold. Per-stage
+entry and exit counts are kept so exit rates can be monitored and tuned.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stage order, cheapest first (not every cascade uses every stage)
+STAGES = ("exact_match", "similarity", "fingerprint", "forensics", "classifier", "llm")
+
+
+def stage_threshold(stage: str) -> float:
+    """Confidence (0-1) at which a stage's answer is final; stages without one never exit early"""
+    return settings.CASCADE_THRESHOLDS.get(stage, float("inf"))
+
+
+class CascadeMetrics:
+    """Process-wide entry / exit counters per cascade and stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entered: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._exited: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._runs: Dict[str, int] = defaultdict(int)
+
+    def record(self, cascade: str, entered: List[str], exited: Optional[str]):
+        with self._lock:
+            self._runs[cascade] += 1
+            for stage in entered:
+                self._entered[cascade][stage] += 1
+            if exited:
+                self._exited[cascade][exited] += 1
+
+    def get_stats(self) -> Dict:
+        """Per cascade: runs, and per stage entered / exited / exit rate (of runs entering the stage)"""
+        with self._lock:
+            stats = {}
+            for cascade, runs in self._runs.items():
+                stages = {}
+                for stage in sorted(self._entered[cascade], key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+                    entered = self._entered[cascade][stage]
+                    exited = self._exited[cascade].get(stage, 0)
+                    stages[stage] = {
+                        "entered": entered,
+                        "exited": exited,
+                        "exit_rate": round(exited / entered, 3) if entered else 0.0
+                    }
+                stats[cascade] = {"runs": runs, "stages": stages}
+            return stats
+
+
+class CascadeRun:
+    """
+    One request's pass through a cascade
+
+    Usage:
+        run = CascadeRun("quick_text")
+        if run.check("similarity", top_similarity):
+            ...  # confident enough, skip the remaining stages
+        run.finish("llm")
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.entered: List[str] = []
+        self.exit_stage: Optional[str] = None
+        self.trace: List[Dict] = []
+
+    def check(self, stage: str, confidence: Optional[float]) -> bool:
+        """Record a stage's confidence; True when it meets the threshold (the run then ends)"""
+        self.entered.append(stage)
+        threshold = stage_threshold(stage)
+        confident = confidence is not None and confidence >= threshold
+        self.trace.append({
+            "stage": stage,
+            "confidence": None if confidence is None else round(float(confidence), 3),
+            "threshold": None if threshold == float("inf") else threshold,
+            "exit": confident
+        })
+        if confident:
+            self._end(stage)
+        return confident
+
+    def finish(self, stage: str):
+        """Final stage, which always produces the answer"""
+        self.entered.append(stage)
+        self.trace.append({"stage": stage, "confidence": None, "threshold": None, "exit": True})
+        self._end(stage)
+
+    def _end(self, stage: str):
+        if self.exit_stage is None:
+            self.exit_stage = stage
+            _metrics.record(self.name, self.entered, stage)
+
+
+_metrics = CascadeMetrics()
+
+def get_cascade_metrics():
+    """Get global cascade metrics instance"""
+    return _metrics
@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import Dict, List, Union
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl, validator
 
@@ -22,6 +22,203 @@ class Settings(BaseSettings):
     HUGGINGFACE_API_TOKEN: str | None = None
     TAVILY_API_KEY: str | None = None
 
+    # Gemini models (clients are cached per model and temperature)
+    LLM_MODEL: str = "gemini-2.0-flash-001"
+    VISION_LLM_MODEL: str = "gemini-2.0-flash-001"
+    AGENT_WARMUP: bool = True  # Build agent graphs at startup instead of on first request
+
+    # HuggingFace Inference API client (pooled, keep-alive)
+    HF_HTTP2: bool = False  # Requires the optional 'h2' package
+    HF_MAX_CONNECTIONS: int = 20
+    HF_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HF_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HF_TIMEOUT_SECONDS: float = 30.0
+    HF_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HF_MODEL_TIMEOUTS: Dict[str, float] = {}  # Task name or model id -> seconds
+
+    # HuggingFace retries, circuit breaker and hedging
+    HF_MAX_RETRIES: int = 3
+    HF_BACKOFF_BASE_SECONDS: float = 0.5
+    HF_BACKOFF_MAX_SECONDS: float = 8.0
+    HF_MAX_LOADING_WAIT_SECONDS: float = 20.0  # Cap on a single wait for a cold model's estimated_time
+    HF_RETRY_BUDGET_SECONDS: float = 45.0  # Total time spent waiting between attempts
+    HF_BREAKER_FAILURES: int = 5
+    HF_BREAKER_COOLDOWN_SECONDS: float = 30.0
+    HF_HEDGE_REQUESTS: bool = False
+    HF_HEDGE_QUANTILE: float = 0.95  # Hedge after this latency quantile of recent calls
+    HF_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+
+    # HuggingFace response cache (keyed by model id + payload digest)
+    HF_CACHE_ENABLED: bool = True
+    HF_CACHE_TTL_SECONDS: float = 6 * 3600
+    HF_CACHE_MEMORY_ENTRIES: int = 2048
+    HF_CACHE_DIR: str = "data/inference_cache"  # Empty string disables the disk tier
+    HF_CACHE_DISK_ENTRIES: int = 50000
+
+    # Inference backend per task name or model id: "remote" (Inference API) or "local" (CPU, needs transformers)
+    INFERENCE_BACKENDS: Dict[str, str] = {}
+    LOCAL_INFERENCE_WORKERS: int = 2
+    LOCAL_INFERENCE_MAX_BATCH: int = 8
+    LOCAL_INFERENCE_BATCH_WAIT_MS: float = 10.0
+    LOCAL_INFERENCE_TORCH_THREADS: int = 0  # 0 keeps the torch default
+    LOCAL_INFERENCE_TRUST_REMOTE_CODE: bool = False  # Some checkpoints ship custom model code
+    LOCAL_INFERENCE_PRELOAD: bool = False  # Load local models at startup instead of on first use
+
+    # Forensics cache
+    FORENSICS_CACHE_DIR: str = "data/forensics_cache"
+    FORENSICS_CACHE_MEMORY_ENTRIES: int = 1024
+    FORENSICS_CACHE_DISK_ENTRIES: int = 20000
+
+    # Pixel forensics (ELA / noise residual / copy-move)
+    FORENSICS_WORKING_SIZE: int = 512
+    FORENSICS_TIME_BUDGET_SECONDS: float = 1.0
+    FORENSICS_MANIPULATION_THRESHOLD: float = 0.6
+    FORENSICS_KNOWN_HASHES_PATH: str = "data/known_hashes.json"  # Known manipulated images
+    FORENSICS_PROCESS_WORKERS: int = 2  # Worker processes for batch pixel forensics (0 = in-thread)
+
+    # Quick-analysis deadline and per-stage budgets (seconds)
+    QUICK_DEADLINE_SECONDS: float = 4.0
+    QUICK_DEADLINE_RESERVE_SECONDS: float = 0.2  # Kept for storage and serialization
+    QUICK_BUDGET_SEARCH_SECONDS: float = 1.0
+    QUICK_BUDGET_FORENSICS_SECONDS: float = 3.0
+    QUICK_BUDGET_SUMMARY_SECONDS: float = 2.5
+
+    # Admission control: concurrency limits with bounded wait queues (429 when full, 503 past the deadline)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_ROUTE_LIMITS: Dict[str, int] = {
+        "/analyze": 16,
+        "/analyze/stream": 16,
+        "/analyze/upload": 8,
+        "/analyze/multimodal": 4,
+        "/quick-analyze": 64,
+        "/quick-analyze/upload": 32,
+        "/quick-analyze/batch": 2
+    }
+    ADMISSION_TYPE_LIMITS: Dict[str, int] = {  # "<deep|quick>:<content type>"
+        "deep:text": 8,
+        "deep:image": 4,
+        "deep:audio": 2,
+        "deep:video": 2,
+        "quick:text": 32,
+        "quick:image": 8
+    }
+    ADMISSION_MAX_QUEUE: int = 32  # Waiting requests per limiter
+    ADMISSION_DEEP_DEADLINE_SECONDS: float = 60.0  # Queue + run time allowed for deep analysis
+
+    # Durable job queue for asynchronous deep analysis (/jobs)
+    JOBS_ENABLED: bool = True
+    JOB_DB_PATH: str = "data/jobs.sqlite3"
+    JOB_CONCURRENCY: Dict[str, int] = {"text": 4, "image": 2, "audio": 1, "video": 1}  # Workers per content type
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BASE_SECONDS: float = 5.0
+    JOB_RETRY_MAX_SECONDS: float = 300.0
+    JOB_TIMEOUT_SECONDS: float = 600.0
+    JOB_RESULT_TTL_SECONDS: float = 24 * 3600  # Finished jobs (results and errors) are kept this long
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_PURGE_INTERVAL_SECONDS: float = 300.0
+    JOB_LEASE_SECONDS: float = 30.0  # Running jobs are renewed by their process; expired leases are recovered
+    JOB_WEBHOOK_ATTEMPTS: int = 3
+    JOB_WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    JOB_WEBHOOK_ALLOWED_HOSTS: List[str] = []  # If set, webhooks may only target these hosts
+    JOB_WEBHOOK_ALLOW_PRIVATE: bool = False  # Allow loopback / private / link-local webhook addresses
+
+    # Batch quick analysis (/quick-analyze/batch)
+    QUICK_BATCH_MAX_ITEMS: int = 1000
+    QUICK_BATCH_CONCURRENCY: int = 16  # Items finishing (verdict + summary) at once
+    QUICK_BATCH_ENCODE_SIZE: int = 64  # sentence-transformers batch size
+    QUICK_BATCH_STORAGE_FLUSH: int = 100  # Analyses written to storage per write
+
+    # Confidence-gated cascade: stage -> confidence (0-1) at which its answer is final
+    CASCADE_ENABLED: bool = True
+    CASCADE_THRESHOLDS: Dict[str, float] = {
+        "exact_match": 1.0,
+        "similarity": 0.92,
+        "forensics": 0.9,
+        "classifier": 0.97
+    }
+
+    # End-to-end verdict cache for quick analysis (normalized content digest -> stored analysis)
+    VERDICT_CACHE_ENABLED: bool = True
+    VERDICT_CACHE_VERSION: str = "1"  # Bump to invalidate every cached verdict
+    VERDICT_CACHE_TTL_SECONDS: float = 6 * 3600
+    VERDICT_CACHE_MEMORY_ENTRIES: int = 4096
+    VERDICT_CACHE_DIR: str = "data/verdict_cache"  # Empty string disables the disk tier
+    VERDICT_CACHE_DISK_ENTRIES: int = 100000
+
+    # Semantic cache for quick-analysis LLM summaries
+    SUMMARY_CACHE_ENABLED: bool = True
+    SUMMARY_CACHE_SIMILARITY: float = 0.95  # Cosine similarity for a near-duplicate claim
+    SUMMARY_CACHE_TTL_SECONDS: float = 24 * 3600
+    SUMMARY_CACHE_MAX_ENTRIES: int = 5000
+    SUMMARY_CACHE_SAVE_INTERVAL_SECONDS: float = 30.0
+
+    # Multimodal fan-out (/analyze/multimodal)
+    MULTIMODAL_CONCURRENCY: int = 4  # Specialist branches running at once, process-wide
+    MULTIMODAL_MAX_PARTS: int = 8
+    MULTIMODAL_FAKE_THRESHOLD: float = 0.7  # Fake probability of the worst part
+    MULTIMODAL_SUSPECT_THRESHOLD: float = 0.4
+
+    # Background consolidation of user feedback into the hoax index / known image hashes
+    FEEDBACK_LEARNING_ENABLED: bool = True
+    FEEDBACK_LEARNING_INTERVAL_SECONDS: float = 300.0
+    FEEDBACK_MIN_VOTES: int = 3
+    FEEDBACK_MIN_AGREEMENT: float = 0.8  # Confidence-weighted share of votes for the winning verdict
+    FEEDBACK_MIN_CONFIDENCE: float = 3.5  # Mean user confidence (1-5) of the agreeing votes
+    FEEDBACK_MAX_CONTENT_CHARS: int = 1000  # Claim text kept with each feedback entry
+    FEEDBACK_AUTO_APPLY_VERDICTS: List[str] = ["FAKE"]  # Other confirmed verdicts wait for manual review
+    FEEDBACK_REVIEW_PATH: str = "data/feedback_review.json"  # Confirmed claims awaiting review
+    FEEDBACK_SUBMITTER_HEADER: str = ""  # Trusted header identifying the voter (e.g. X-Forwarded-For behind a proxy, or an auth id); empty = client address
+
+    # Uploads (multipart / raw-body endpoints)
+    UPLOAD_SPOOL_BYTES: int = 1024 * 1024  # Kept in memory below this, spooled to disk above
+    UPLOAD_TEMP_DIR: str | None = None
+    UPLOAD_REFERENCE_TTL_SECONDS: float = 600.0
+    UPLOAD_MAX_BYTES_TEXT: int = 1024 * 1024
+    UPLOAD_MAX_BYTES_IMAGE: int = 20 * 1024 * 1024
+    UPLOAD_MAX_BYTES_AUDIO: int = 50 * 1024 * 1024
+    UPLOAD_MAX_BYTES_VIDEO: int = 200 * 1024 * 1024
+
+    # Payload preprocessing before remote model / vision LLM calls
+    PAYLOAD_JPEG_QUALITY: int = 85
+    PAYLOAD_UPLINK_BYTES_PER_SEC: float = 1_250_000  # ~10 Mbit/s, used to estimate latency saved
+    VISION_LLM_INPUT_SIZE: int = 768
+
+    # Video keyframe sampling and per-frame scoring
+    VIDEO_SAMPLING_MODE: str = "scene"  # "scene" or "fixed"
+    VIDEO_SAMPLE_FPS: float = 1.0
+    VIDEO_SCENE_CHECK_FPS: float = 4.0
+    VIDEO_SCENE_THRESHOLD: float = 0.3  # Bhattacharyya histogram distance
+    VIDEO_MAX_KEYFRAME_GAP_SECONDS: float = 5.0
+    VIDEO_MAX_KEYFRAMES: int = 32
+    VIDEO_FRAME_CONCURRENCY: int = 4
+
+    # Video fingerprint index (re-upload detection)
+    VIDEO_FINGERPRINT_FPS: float = 2.0
+    VIDEO_FINGERPRINT_MAX_FRAMES: int = 600
+    VIDEO_FINGERPRINT_MAX_HAMMING: int = 10
+    VIDEO_FINGERPRINT_MIN_MATCHES: int = 3
+    VIDEO_FINGERPRINT_MIN_COVERAGE: float = 0.5
+    FINGERPRINT_SAVE_INTERVAL_SECONDS: float = 30.0  # Debounce for persisting video / audio fingerprint indexes
+    KNOWN_MEDIA_MANIFEST_PATH: str = "data/known_media.json"  # Confirmed clips indexed as verified at startup
+
+    # Audio windowing and voice activity detection
+    AUDIO_SAMPLE_RATE: int = 16000
+    AUDIO_WINDOW_SECONDS: float = 4.0
+    AUDIO_MIN_WINDOW_SECONDS: float = 1.0
+    AUDIO_MAX_WINDOWS: int = 48
+    AUDIO_WINDOW_CONCURRENCY: int = 4
+    AUDIO_VAD_FRAME_MS: int = 30
+    AUDIO_VAD_HANGOVER_MS: int = 210
+    AUDIO_VAD_THRESHOLD_DB: float = -50.0  # Absolute floor (dBFS)
+    AUDIO_VAD_MARGIN_DB: float = 6.0  # Above the adaptive noise floor
+
+    # Audio fingerprint index (known cloned-voice clips)
+    AUDIO_FINGERPRINT_RATE: int = 8000
+    AUDIO_FINGERPRINT_MAX_SECONDS: float = 600.0
+    AUDIO_FINGERPRINT_MIN_MATCHES: int = 15
+    AUDIO_FINGERPRINT_MIN_RATIO: float = 0.01  # Aligned share of the shorter clip's landmarks (resampling loses most)
+    AUDIO_FINGERPRINT_PEAK_FACTOR: float = 3.0  # Best offset vs. the clip's next-best offset
+
     # Security
     SECRET_KEY: str = "CHANGE_THIS_TO_A_SECURE_RANDOM_STRING"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
@@ -0,0 +1,83 @@
+"""
+Deadlines - Per-request time budgets for multi-stage pipelines
+A Deadline is created once per request and passed through every stage; each
+stage asks for its budget (capped by the time left) and records whether it
+ran, timed out or was skipped.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StageSkipped(Exception):
+    """Raised by Deadline.run when a stage cannot finish within its budget"""
+
+    def __init__(self, stage: str, reason: str):
+        self.stage = stage
+        self.reason = reason
+        super().__init__(f"Stage '{stage}' skipped: {reason}")
+
+
+class Deadline:
+    """Wall-clock deadline with per-stage budgets and a timing report"""
+
+    def __init__(self, seconds: float, reserve: float = 0.0):
+        """
+        Args:
+            seconds: Total time allowed for the request
+            reserve: Time kept back for work after the last stage (serialization, storage)
+        """
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds
+        self.reserve = reserve
+        self.timings: Dict[str, float] = {}
+        self.skipped: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left for stages (excluding the reserve)"""
+        return max(self.expires_at - self.reserve - time.monotonic(), 0.0)
+
+    def budget(self, stage_budget: Optional[float] = None) -> float:
+        """Time a stage may use: its own budget capped by what is left"""
+        remaining = self.remaining()
+        return remaining if stage_budget is None else min(stage_budget, remaining)
+
+    def skip(self, stage: str, reason: str = "deadline"):
+        """Record a stage that did not run or did not finish"""
+        self.skipped.append(stage)
+        logger.info(f"Stage '{stage}' skipped ({reason}), {self.remaining():.2f}s left")
+
+    async def run(self, stage: str, awaitable: Awaitable[Any], stage_budget: Optional[float] = None,
+                  min_budget: float = 0.05) -> Any:
+        """
+        Await a stage within its budget
+
+        Raises:
+            StageSkipped: If too little time is left to start, or the stage times out
+        """
+        budget = self.budget(stage_budget)
+        if budget < min_budget:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            self.skip(stage, "no time left")
+            raise StageSkipped(stage, "no time left")
+
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(awaitable, timeout=budget)
+        except asyncio.TimeoutError:
+            self.skip(stage, f"exceeded {budget:.2f}s budget")
+            raise StageSkipped(stage, "timeout")
+        finally:
+            self.timings[stage] = round((time.monotonic() - started) * 1000, 1)
+
+    def report(self) -> Dict:
+        """Stage timings (ms), skipped stages and total elapsed time"""
+        return {
+            "elapsed_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "stage_timings_ms": dict(self.timings),
+            "skipped_stages": list(self.skipped)
+        }
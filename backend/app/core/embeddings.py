@@ -6,7 +6,11 @@ from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 import json
+import re
+import threading
+import unicodedata
 from pathlib import Path
+from typing import Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +24,8 @@ class EmbeddingsManager:
         
         # Use lightweight model for fast embeddings
         logger.info("Loading sentence-transformers model...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model_name = 'all-MiniLM-L6-v2'
+        self.model = SentenceTransformer(self.model_name)
         self.embedding_dim = 384  # Dimension for all-MiniLM-L6-v2
         
         self.index_path = self.data_dir / "faiss_index.bin"
@@ -28,8 +33,12 @@ class EmbeddingsManager:
         
         self.index = None
         self.metadata = []
+        self._exact: Dict[str, int] = {}  # Normalized text -> metadata position, kept in step with the metadata
+        self._write_lock = threading.Lock()  # Serializes index updates; searches never wait on it
         
         self._load_or_create_index()
+        # Built before the manager is shared, so lookups never race a lazy build
+        self._exact = {self.normalize_text(m["text"]): i for i, m in enumerate(self.metadata)}
     
     def _load_or_create_index(self):
         """Load existing FAISS index or create new one"""
@@ -96,6 +105,27 @@ class EmbeddingsManager:
         
         logger.info(f"Seeded {len(sample_hoaxes)} sample hoaxes")
     
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Case-, punctuation-, whitespace- and Unicode-form-insensitive text used for exact matching"""
+        text = unicodedata.normalize("NFKC", text)
+        return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+    
+    def find_exact(self, text: str):
+        """Metadata of an indexed entry whose normalized text equals this one, or None"""
+        position = self._exact.get(self.normalize_text(text))
+        return self.metadata[position] if position is not None else None
+    
+    def encode(self, text: str) -> np.ndarray:
+        """Embed a single text (float32 vector of embedding_dim)"""
+        return np.asarray(self.model.encode([text])[0], dtype=np.float32)
+    
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed many texts in one model call (float32 matrix, one row per text)"""
+        if not texts:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype=np.float32)
+    
     def add_to_index(self, text: str, metadata: dict):
         """Add new entry to FAISS index"""
         try:
@@ -111,12 +141,43 @@ class EmbeddingsManager:
                 "text": text,
                 **metadata
             })
+            self._exact[self.normalize_text(text)] = len(self.metadata) - 1
             
             logger.debug(f"Added entry to index: {text[:50]}...")
         except Exception as e:
             logger.error(f"Error adding to index: {e}")
     
-    def search_similar(self, text: str, k: int = 5, threshold: float = 0.8):
+    def add_batch(self, texts: List[str], metadatas: List[Dict], save: bool = True) -> int:
+        """
+        Add many entries with one encode call, without blocking searches
+        
+        The new entries go into a copy of the index that then replaces the
+        live one, so concurrent searches see either the old or the new index,
+        never one being modified.
+        
+        Returns:
+            Number of entries added
+        """
+        if not texts:
+            return 0
+        embeddings = self.encode_batch(texts)
+        with self._write_lock:
+            index = faiss.clone_index(self.index)
+            index.add(embeddings)
+            metadata = self.metadata + [{"text": text, **meta} for text, meta in zip(texts, metadatas)]
+            # Metadata first: a search on the old index only uses positions both lists have
+            self.metadata = metadata
+            self.index = index
+            exact = dict(self._exact)
+            for position in range(len(metadata) - len(texts), len(metadata)):
+                exact[self.normalize_text(metadata[position]["text"])] = position
+            self._exact = exact
+            if save:
+                self._save_index()
+        logger.info(f"Added {len(texts)} entries to index ({len(metadata)} total)")
+        return len(texts)
+    
+    def search_similar(self, text: str, k: int = 5, threshold: float = 0.8, embedding: np.ndarray = None):
         """
         Search for similar entries in FAISS index
         
@@ -124,37 +185,53 @@ class EmbeddingsManager:
             text: Query text to search
             k: Number of results to return
             threshold: Similarity threshold (0-1, higher = more similar)
+            embedding: Precomputed embedding of text (skips re-encoding)
         
         Returns:
             List of matches with scores and metadata
         """
         try:
             # Generate query embedding
-            query_embedding = self.model.encode([text])[0]
-            query_embedding = np.array([query_embedding], dtype=np.float32)
-            
-            # Search FAISS index
-            distances, indices = self.index.search(query_embedding, k)
-            
-            # Convert distances to similarity scores (L2 distance -> similarity)
-            # Lower L2 distance = higher similarity
-            max_distance = 2.0  # Typical max L2 distance for normalized embeddings
-            similarities = 1 - (distances[0] / max_distance)
-            
-            # Filter by threshold and return results
+            if embedding is None:
+                embedding = self.encode(text)
+            return self.search_similar_batch(np.array([embedding], dtype=np.float32), k, threshold)[0]
+        except Exception as e:
+            logger.error(f"Error searching index: {e}")
+            return []
+    
+    def search_similar_batch(self, embeddings: np.ndarray, k: int = 5, threshold: float = 0.8) -> List[List[Dict]]:
+        """
+        Search the index for many query embeddings in a single FAISS call
+        
+        Returns:
+            One match list per query row (same format as search_similar)
+        """
+        if len(embeddings) == 0:
+            return []
+        
+        # Search FAISS index (read the index before the metadata: add_batch swaps them in the other order)
+        index = self.index
+        distances, indices = index.search(np.ascontiguousarray(embeddings, dtype=np.float32), k)
+        metadata = self.metadata
+        
+        # Convert distances to similarity scores (L2 distance -> similarity)
+        # Lower L2 distance = higher similarity
+        max_distance = 2.0  # Typical max L2 distance for normalized embeddings
+        similarities = 1 - (distances / max_distance)
+        
+        # Filter by threshold and return results
+        batch = []
+        for row_similarities, row_indices in zip(similarities, indices):
             results = []
-            for idx, (similarity, index) in enumerate(zip(similarities, indices[0])):
-                if index < len(self.metadata) and similarity >= threshold:
+            for idx, (similarity, position) in enumerate(zip(row_similarities, row_indices)):
+                if 0 <= position < len(metadata) and similarity >= threshold:
                     results.append({
                         "similarity": float(similarity),
-                        "match": self.metadata[index],
+                        "match": metadata[position],
                         "rank": idx + 1
                     })
-            
-            return results
-        except Exception as e:
-            logger.error(f"Error searching index: {e}")
-            return []
+            batch.append(results)
+        return batch
     
     def _save_index(self):
         """Save FAISS index and metadata to disk"""
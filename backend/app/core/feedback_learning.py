@@ -0,0 +1,233 @@
+"""
+Feedback Learning - Background consolidation of user feedback
+Periodically groups stored feedback by claim (normalized text, or the image's
+perceptual hash), keeps the claims whose votes agree strongly enough, and adds
+them incrementally: FAKE claims to the hoax index, FAKE images to the
+known-image store. Both are swapped in live, with no downtime or reindex.
+
+Only feedback on a stored analysis of the same content counts, and each
+submitter has one vote per claim (their latest). Confirmed verdicts outside
+FEEDBACK_AUTO_APPLY_VERDICTS (by default VERIFIED, which would whitelist a
+claim) are written to FEEDBACK_REVIEW_PATH for a person to check instead.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from app.core.config import settings
+from app.core.embeddings import EmbeddingsManager, get_embeddings_manager
+from app.core.forensics import get_forensics
+from app.core.sniffing import sniff
+from app.core.storage import get_storage
+from app.core.verdict_cache import VerdictCache
+
+logger = logging.getLogger(__name__)
+
+# Verdicts that can be learned; SUSPECT / MIXED feedback is counted but never confirmed
+LEARNABLE_VERDICTS = ("FAKE", "VERIFIED")
+
+
+def decide(votes: Dict[str, List[int]]) -> Optional[str]:
+    """
+    Confirmed verdict for one claim, or None
+
+    Args:
+        votes: verdict -> user confidences (1-5) of the feedback choosing it
+    """
+    count = sum(len(confidences) for confidences in votes.values())
+    if count < settings.FEEDBACK_MIN_VOTES:
+        return None
+
+    weights = {verdict: sum(confidences) for verdict, confidences in votes.items()}
+    verdict = max(weights, key=weights.get)
+    if verdict not in LEARNABLE_VERDICTS:
+        return None
+    if weights[verdict] / sum(weights.values()) < settings.FEEDBACK_MIN_AGREEMENT:
+        return None
+    agreeing = votes[verdict]
+    if sum(agreeing) / len(agreeing) < settings.FEEDBACK_MIN_CONFIDENCE:
+        return None
+    return verdict
+
+
+class FeedbackConsolidator:
+    """Turns agreeing user feedback into index entries, on a timer"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "runs": 0, "feedback_seen": 0, "claims": 0, "confirmed": 0,
+            "claims_added": 0, "image_hashes_added": 0, "conflicts": 0, "pending_review": 0,
+            "unverified_feedback": 0, "last_run": None
+        }
+
+    def _group(self, feedback: List[Dict]) -> Dict[tuple, Dict]:
+        """
+        Group feedback by claim: ("text", normalized text) or ("image", perceptual hash)
+
+        Feedback counts only when it names a stored analysis of the same content
+        (text digest, or the analyzed image's hashes). Each submitter's latest
+        feedback on a claim is their one vote.
+        """
+        analyses = get_storage().get_analyses_by_ids({f["analysis_id"] for f in feedback if f.get("analysis_id")})
+        groups: Dict[tuple, Dict] = {}
+        unverified = 0
+        for entry in feedback:
+            verdict = str(entry.get("user_verdict") or "").upper()
+            try:
+                confidence = min(max(int(entry.get("user_confidence") or 0), 1), 5)
+            except (TypeError, ValueError):
+                continue
+
+            analysis = analyses.get(entry.get("analysis_id") or "")
+            if analysis is None:
+                unverified += 1
+                continue
+            hashes = analysis.get("image_hashes")
+            content = entry.get("original_content") or ""
+            if hashes and hashes.get("perceptual_hash"):
+                # The hashes come from the analyzed image itself
+                key = ("image", hashes["perceptual_hash"])
+                group = groups.setdefault(key, {"hashes": hashes, "voters": {}})
+            elif analysis.get("content_type") == "text" and content and sniff(content)[0] == "text":
+                digest = entry.get("content_digest") or VerdictCache.digest(content, "text")
+                if not analysis.get("content_digest") or digest != analysis["content_digest"]:
+                    # Not the claim that was analyzed under this id
+                    unverified += 1
+                    continue
+                key = ("text", EmbeddingsManager.normalize_text(content))
+                if not key[1]:
+                    continue
+                group = groups.setdefault(key, {"text": content.strip(), "voters": {}})
+            else:
+                # Media feedback without stored hashes cannot be matched to an image
+                continue
+            # Later feedback from the same submitter replaces their earlier vote
+            group["voters"][entry.get("submitter")] = (verdict, confidence)
+
+        for group in groups.values():
+            votes = defaultdict(list)
+            for verdict, confidence in group.pop("voters").values():
+                votes[verdict].append(confidence)
+            group["votes"] = votes
+        self._stats["unverified_feedback"] = unverified
+        return groups
+
+    def consolidate(self) -> Dict:
+        """
+        One pass over all feedback (blocking: run in a thread)
+
+        Re-aggregating everything keeps votes cumulative; claims already in the
+        index or hash store are skipped, so only new confirmations are added.
+        """
+        started = time.monotonic()
+        feedback = get_storage().get_all_feedback()
+        groups = self._group(feedback)
+        embeddings = get_embeddings_manager()
+        forensics = get_forensics()
+
+        texts, metadatas, images, review = [], [], [], []
+        confirmed = conflicts = 0
+        for (kind, _), group in groups.items():
+            verdict = decide(group["votes"])
+            if verdict is None:
+                continue
+            confirmed += 1
+            votes = sum(len(v) for v in group["votes"].values())
+            source = f"Confirmed by user feedback ({len(group['votes'][verdict])} of {votes} votes)"
+
+            if kind == "text":
+                existing = embeddings.find_exact(group["text"])
+                if existing is not None:
+                    if existing.get("verdict") != verdict:
+                        # Users disagree with a curated entry: leave it for manual review
+                        conflicts += 1
+                    continue
+                if verdict not in settings.FEEDBACK_AUTO_APPLY_VERDICTS:
+                    review.append({"text": group["text"], "verdict": verdict, "source": source,
+                                   "votes": {v: len(c) for v, c in group["votes"].items()}})
+                    continue
+                texts.append(group["text"])
+                metadatas.append({"verdict": verdict, "source": source, "category": "user_feedback"})
+            elif verdict == "FAKE" and not forensics.lookup_known_hashes(group["hashes"]):
+                # The known-image store only holds manipulated images
+                images.append((group["hashes"], {"description": "Reported manipulated image", "source": source}))
+
+        added = embeddings.add_batch(texts, metadatas) if texts else 0
+        hashes_added = forensics.add_known_hashes(images) if images else 0
+        self._write_review(review)
+
+        self._stats["runs"] += 1
+        self._stats["feedback_seen"] = len(feedback)
+        self._stats["claims"] = len(groups)
+        self._stats["confirmed"] = confirmed
+        self._stats["conflicts"] = conflicts
+        self._stats["pending_review"] = len(review)
+        self._stats["claims_added"] += added
+        self._stats["image_hashes_added"] += hashes_added
+        self._stats["last_run"] = time.time()
+        if added or hashes_added:
+            logger.info(f"Feedback consolidation added {added} claims and {hashes_added} image hashes "
+                        f"in {time.monotonic() - started:.2f}s")
+        return {"claims_added": added, "image_hashes_added": hashes_added, "conflicts": conflicts,
+                "pending_review": len(review)}
+
+    @staticmethod
+    def _write_review(review: List[Dict]):
+        """Replace the review file with this run's candidates (votes are re-aggregated every run)"""
+        path = Path(settings.FEEDBACK_REVIEW_PATH)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(review, f, indent=2)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error(f"Error saving feedback review queue: {e}")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.FEEDBACK_LEARNING_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(self.consolidate)
+            except Exception as e:
+                logger.error(f"Feedback consolidation failed: {e}")
+
+    def start(self):
+        """Start the periodic consolidation task (needs a running event loop)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return dict(self._stats)
+
+
+# Global instance
+_consolidator = None
+
+def get_feedback_consolidator():
+    """Get or create global feedback consolidator instance"""
+    global _consolidator
+    if _consolidator is None:
+        _consolidator = FeedbackConsolidator()
+    return _consolidator
+
+def start_feedback_learning():
+    """Start periodic consolidation on the running event loop"""
+    get_feedback_consolidator().start()
+
+async def stop_feedback_learning():
+    """Stop periodic consolidation, if running"""
+    if _consolidator is not None:
+        await _consolidator.stop()
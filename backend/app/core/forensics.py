@@ -6,57 +6,111 @@ import imagehash
 from PIL import Image
 import exifread
 import io
-import base64
+import hashlib
+import json
+import os
 import logging
-from typing import Dict, Optional
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.core.cache import TieredCache
+from app.core.config import settings
+from app.core.pixel_forensics import analyze_pixels
+from app.core.uploads import ContentLike, content_bytes
 
 logger = logging.getLogger(__name__)
 
+def _incomplete_pixels(error: str) -> Dict:
+    """Pixel result for an infrastructure failure (crash, timeout); incomplete, so it is never cached as final"""
+    return {"error": error, "score": 0.0, "complete": False, "skipped": ["ela", "noise", "copy_move"], "failed": []}
+
 class ImageForensics:
     """Advanced image forensics analysis"""
     
     def __init__(self):
         self.known_hashes = {}  # Store of known manipulated image hashes
         self._load_known_hashes()
+        
+        # Content-addressed cache of per-image results (keyed by SHA-256 of bytes)
+        self.cache = TieredCache(
+            settings.FORENSICS_CACHE_DIR,
+            memory_entries=settings.FORENSICS_CACHE_MEMORY_ENTRIES,
+            disk_entries=settings.FORENSICS_CACHE_DISK_ENTRIES
+        )
+        
+        # Started on the first batch; single images are analyzed in the calling thread
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
     
     def _load_known_hashes(self):
-        """Load database of known manipulated images (placeholder for now)"""
-        # In production, load from database
-        self.known_hashes = {
-            # Example: "hash_value": {"description": "Known deepfake", "source": "..."}
-        }
+        """Load the store of known manipulated images (perceptual / average hash -> entry)"""
+        # Example entry: "hash_value": {"description": "Known deepfake", "source": "..."}
+        self.known_hashes = {}
+        path = Path(settings.FORENSICS_KNOWN_HASHES_PATH)
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.known_hashes = json.load(f)
+                logger.info(f"Loaded {len(self.known_hashes)} known image hashes")
+            except Exception as e:
+                logger.error(f"Error loading known image hashes: {e}")
     
-    def analyze_image(self, image_data: str) -> Dict:
+    def add_known_hashes(self, entries: List[Tuple[Dict, Dict]]) -> int:
+        """
+        Add known manipulated images and persist the store
+        
+        Args:
+            entries: (hash_info as produced by _compute_hashes, description entry) pairs
+        
+        Returns:
+            Number of hashes added
+        """
+        known = dict(self.known_hashes)
+        added = 0
+        for hash_info, entry in entries:
+            for hash_type in ["perceptual_hash", "average_hash"]:
+                img_hash = hash_info.get(hash_type)
+                if img_hash and img_hash not in known:
+                    known[img_hash] = entry
+                    added += 1
+        if not added:
+            return 0
+        
+        # Swapped in whole so lookups never see a half-updated store
+        self.known_hashes = known
+        path = Path(settings.FORENSICS_KNOWN_HASHES_PATH)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(known, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error(f"Error saving known image hashes: {e}")
+        return added
+    
+    def analyze_image(self, image_data: ContentLike, time_budget: Optional[float] = None) -> Dict:
         """
         Comprehensive image analysis
         
         Args:
-            image_data: Base64 data URL or raw base64 string
+            image_data: Base64 data URL, raw base64 string, upload reference or raw bytes
+            time_budget: Seconds allowed for pixel forensics (defaults to config)
         
         Returns:
             Dictionary with forensics results
         """
         try:
-            # Clean base64 data
-            if "," in image_data:
-                image_data = image_data.split(",")[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            
-            # Run all forensics checks
-            exif_data = self._extract_exif(image_bytes)
-            hash_info = self._compute_hashes(image_bytes)
-            manipulation_check = self._check_manipulation(hash_info)
-            metadata_analysis = self._analyze_metadata(exif_data)
-            
-            return {
-                "exif": exif_data,
-                "hashes": hash_info,
-                "manipulation_detected": manipulation_check["detected"],
-                "manipulation_score": manipulation_check["score"],
-                "metadata_flags": metadata_analysis,
-                "verdict": self._determine_verdict(exif_data, manipulation_check)
-            }
+            state = self._load(image_data)
+            # Pixel forensics may have been cut short by an earlier request's budget
+            # (stages that failed outright are cached as they are: a rerun would fail again)
+            if state["pixel"] is None or not state["pixel"].get("complete"):
+                state["pixel"] = self._analyze_pixels(state["bytes"], time_budget)
+                self._store(state)
+            return self._assemble(state)
         except Exception as e:
             logger.error(f"Error in image forensics: {e}")
             return {
@@ -64,6 +118,122 @@ class ImageForensics:
                 "verdict": "UNKNOWN"
             }
     
+    def iter_images(self, images: List[ContentLike], time_budget: Optional[float] = None,
+                    timeout: Optional[float] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        Analyze several images, yielding (index, result) as each one finishes;
+        pixel forensics (the CPU-heavy part) runs in parallel across worker
+        processes instead of one image after another
+        
+        Args:
+            time_budget: Pixel forensics budget per image
+            timeout: Wall-clock limit on waiting for the worker processes; images
+                still pending then get an incomplete pixel result
+        
+        Yields:
+            (index, result) with results shaped like analyze_image's, in completion order
+        """
+        pool = self._process_pool() if len(images) > 1 else None
+        budget = settings.FORENSICS_TIME_BUDGET_SECONDS if time_budget is None else time_budget
+        states: Dict[int, Dict] = {}
+        futures: Dict[Future, int] = {}
+        try:
+            for i, image_data in enumerate(images):
+                try:
+                    state = self._load(image_data)
+                except Exception as e:
+                    logger.error(f"Error in image forensics: {e}")
+                    yield i, {"error": str(e), "verdict": "UNKNOWN"}
+                    continue
+                if state["pixel"] is not None and state["pixel"].get("complete"):
+                    yield i, self._assemble(state)
+                elif pool is not None:
+                    # Submitted while the remaining images are still being decoded
+                    states[i] = state
+                    futures[pool.submit(analyze_pixels, bytes(state["bytes"]), settings.FORENSICS_WORKING_SIZE, budget)] = i
+                else:
+                    state["pixel"] = self._analyze_pixels(state["bytes"], time_budget)
+                    self._store(state)
+                    yield i, self._assemble(state)
+            
+            try:
+                for future in as_completed(list(futures), timeout=timeout):
+                    i = futures.pop(future)
+                    try:
+                        states[i]["pixel"] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error in pixel forensics: {e}")
+                        # A crashed worker is not the image's fault: leave it incomplete so it is retried
+                        states[i]["pixel"] = _incomplete_pixels(str(e))
+                    self._store(states[i])
+                    yield i, self._assemble(states[i])
+            except FuturesTimeout:
+                logger.warning(f"Pixel forensics for {len(futures)} images did not finish within {timeout:.1f}s")
+                for future, i in list(futures.items()):
+                    future.cancel()
+                    states[i]["pixel"] = _incomplete_pixels("timeout")
+                    yield i, self._assemble(states[i])
+                futures.clear()
+        finally:
+            # Consumer gone (or timed out): queued images are not worth computing any more
+            for future in futures:
+                future.cancel()
+    
+    def _load(self, image_data: ContentLike) -> Dict:
+        """Decode the image and fetch (or compute) its content-derived metadata"""
+        image_bytes = content_bytes(image_data)
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+        
+        # Only content-derived results are cached; known-hash matching is
+        # re-evaluated every time since the known hash store can change
+        cached = self.cache.get(content_hash)
+        if cached is not None:
+            return {"bytes": image_bytes, "sha256": content_hash, "cached": True,
+                    "exif": cached["exif"], "hashes": cached["hashes"], "pixel": cached.get("pixel")}
+        return {"bytes": image_bytes, "sha256": content_hash, "cached": False,
+                "exif": self._extract_exif(image_bytes), "hashes": self._compute_hashes(image_bytes), "pixel": None}
+    
+    def _store(self, state: Dict):
+        """Cache content-derived results after a (re)computed pixel pass"""
+        if "error" not in state["exif"] and state["hashes"]:
+            self.cache.set(state["sha256"], {"exif": state["exif"], "hashes": state["hashes"], "pixel": state["pixel"]})
+    
+    def _assemble(self, state: Dict) -> Dict:
+        """Final result: manipulation checks and verdict on top of the content-derived data"""
+        manipulation_check = self._check_manipulation(state["hashes"], state["pixel"])
+        metadata_analysis = self._analyze_metadata(state["exif"])
+        
+        return {
+            "sha256": state["sha256"],
+            "cached": state["cached"],
+            "exif": state["exif"],
+            "hashes": state["hashes"],
+            "manipulation_detected": manipulation_check["detected"],
+            "manipulation_score": manipulation_check["score"],
+            "pixel_forensics": state["pixel"],
+            "metadata_flags": metadata_analysis,
+            "verdict": self._determine_verdict(state["exif"], manipulation_check)
+        }
+    
+    def _process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Worker processes for batch pixel forensics (None when disabled)"""
+        if settings.FORENSICS_PROCESS_WORKERS <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned, not forked: a fork would copy the server's threads, locks and loaded models
+                self._pool = ProcessPoolExecutor(max_workers=settings.FORENSICS_PROCESS_WORKERS,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"Started forensics process pool ({settings.FORENSICS_PROCESS_WORKERS} workers)")
+            return self._pool
+    
+    def close(self):
+        """Shut down the worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+    
     def _extract_exif(self, image_bytes: bytes) -> Dict:
         """Extract EXIF metadata from image"""
         try:
@@ -111,23 +281,31 @@ class ImageForensics:
             logger.error(f"Error computing hashes: {e}")
             return {}
     
-    def _check_manipulation(self, hash_info: Dict) -> Dict:
-        """Check if image matches known manipulated images"""
-        # Placeholder - in production, compare against database
-        # For now, return basic analysis
-        
+    def _analyze_pixels(self, image_bytes: bytes, time_budget: Optional[float]) -> Dict:
+        """Run pixel-level forensics (ELA on an original-resolution crop, the rest downscaled)"""
+        if time_budget is None:
+            time_budget = settings.FORENSICS_TIME_BUDGET_SECONDS
+        try:
+            return analyze_pixels(image_bytes, settings.FORENSICS_WORKING_SIZE, time_budget)
+        except Exception as e:
+            logger.error(f"Error in pixel forensics: {e}")
+            return _incomplete_pixels(str(e))
+    
+    def _check_manipulation(self, hash_info: Dict, pixel_info: Optional[Dict] = None) -> Dict:
+        """Check known manipulated images and pixel-level manipulation evidence"""
         score = 0.0
         detected = False
-        matches = []
+        
+        # Pixel-level evidence (ELA, noise residual, copy-move)
+        if pixel_info:
+            score = pixel_info.get("score", 0.0)
+            detected = score >= settings.FORENSICS_MANIPULATION_THRESHOLD
         
         # Check against known manipulated hashes
-        for hash_type in ["perceptual_hash", "average_hash"]:
-            if hash_type in hash_info:
-                img_hash = hash_info[hash_type]
-                if img_hash in self.known_hashes:
-                    detected = True
-                    score = 0.95
-                    matches.append(self.known_hashes[img_hash])
+        matches = self.lookup_known_hashes(hash_info)
+        if matches:
+            detected = True
+            score = max(score, 0.95)
         
         return {
             "detected": detected,
@@ -135,6 +313,15 @@ class ImageForensics:
             "matches": matches
         }
     
+    def lookup_known_hashes(self, hash_info: Dict) -> List[Dict]:
+        """Return known-manipulated entries matching any of the given hashes"""
+        matches = []
+        for hash_type in ["perceptual_hash", "average_hash"]:
+            img_hash = hash_info.get(hash_type)
+            if img_hash and img_hash in self.known_hashes:
+                matches.append(self.known_hashes[img_hash])
+        return matches
+    
     def _analyze_metadata(self, exif_data: Dict) -> Dict:
         """Analyze metadata for suspicious patterns"""
         flags = {
@@ -144,7 +331,7 @@ class ImageForensics:
         }
         
         # Check for editing software
-        software = exif_data.get("software", "").lower()
+        software = (exif_data.get("software") or "").lower()
         editing_tools = ["photoshop", "gimp", "paint.net", "pixlr"]
         if any(tool in software for tool in editing_tools):
             flags["edited_software"] = True
@@ -159,6 +346,13 @@ class ImageForensics:
             return "AUTHENTIC"
         else:
             return "SUSPECT"  # Missing EXIF but no clear manipulation
+    
+    def get_stats(self) -> Dict:
+        """Get statistics about the forensics cache and known hash store"""
+        return {
+            "known_hashes": len(self.known_hashes),
+            "cache": self.cache.get_stats()
+        }
 
 # Global instance
 _forensics = None
@@ -169,3 +363,8 @@ def get_forensics():
     if _forensics is None:
         _forensics = ImageForensics()
     return _forensics
+
+def close_forensics():
+    """Stop the forensics worker processes, if any were started"""
+    if _forensics is not None:
+        _forensics.close()
@@ -1,34 +1,350 @@
+import asyncio
+import hashlib
 import httpx
+import json
+import logging
+import time
+from app.core.cache import TieredCache
 from app.core.config import settings
-from typing import Dict, Any, Optional
+from app.core.local_inference import LocalInferenceBackend
+from app.core.resilience import CircuitBreaker, LatencyTracker, backoff_delay, hedged
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Payloads larger than this (base64 media) are hashed in a worker thread, off the event loop
+CACHE_KEY_INLINE_BYTES = 256 * 1024
 
 class HuggingFaceClient:
     def __init__(self):
-        if not settings.HUGGINGFACE_API_TOKEN:
+        # The token is only needed when at least one model is served remotely
+        if not settings.HUGGINGFACE_API_TOKEN and set(settings.INFERENCE_BACKENDS.values()) != {"local"}:
             raise ValueError("HUGGINGFACE_API_TOKEN is not set")
         
         self.api_url = "https://api-inference.huggingface.co/models"
         self.headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_TOKEN}"}
+        
+        # One pooled client for the whole process (opened/closed by the app lifespan)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._http2 = False
+        self._stats = {
+            "requests": 0, "new_connections": 0, "tls_handshakes": 0,
+            "retries": 0, "loading_waits": 0, "hedges": 0, "hedges_won": 0, "short_circuited": 0,
+            "coalesced": 0
+        }
+        
+        # Per-model failure isolation and latency history (for hedging)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        
+        # Response cache and in-flight requests, both keyed by (model id, payload digest)
+        self.cache = TieredCache(
+            settings.HF_CACHE_DIR or None,
+            memory_entries=settings.HF_CACHE_MEMORY_ENTRIES,
+            disk_entries=settings.HF_CACHE_DISK_ENTRIES,
+            ttl_seconds=settings.HF_CACHE_TTL_SECONDS
+        ) if settings.HF_CACHE_ENABLED else None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        
+        # In-process CPU backend for models configured as "local"
+        self.local = LocalInferenceBackend()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        """Create the shared keep-alive client"""
+        http2 = settings.HF_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HF_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+                http2 = False
+        self._http2 = http2
+        
+        return httpx.AsyncClient(
+            headers=self.headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.HF_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HF_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HF_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(settings.HF_TIMEOUT_SECONDS, connect=settings.HF_CONNECT_TIMEOUT_SECONDS)
+        )
+
+    async def start(self):
+        """Open the pooled client (called from the FastAPI lifespan)"""
+        if self._client is None:
+            self._client = self._build_client()
+        if settings.LOCAL_INFERENCE_PRELOAD:
+            local_models = {task: mid for task, mid in MODELS.items() if self._backend_for(mid) == "local"}
+            if local_models:
+                await self.local.preload(local_models)
+
+    async def close(self):
+        """Close the pooled client and its connections, and stop local workers"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        await self.local.close()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use outside the app lifespan"""
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    @staticmethod
+    def _task_for(model_id: str) -> Optional[str]:
+        return next((task for task, mid in MODELS.items() if mid == model_id), None)
+
+    def _backend_for(self, model_id: str) -> str:
+        """Configured backend for a model (keyed by model id or task name)"""
+        task = self._task_for(model_id)
+        backend = settings.INFERENCE_BACKENDS.get(model_id) or settings.INFERENCE_BACKENDS.get(task) or "remote"
+        # Only the known detection tasks have a local pipeline mapping
+        return "local" if backend == "local" and task is not None else "remote"
+
+    def _timeout_for(self, model_id: str) -> httpx.Timeout:
+        """Per-model timeout (keyed by task name or model id), falling back to the default"""
+        task = self._task_for(model_id)
+        seconds = (
+            settings.HF_MODEL_TIMEOUTS.get(model_id)
+            or settings.HF_MODEL_TIMEOUTS.get(task)
+            or MODEL_TIMEOUTS.get(task)
+            or settings.HF_TIMEOUT_SECONDS
+        )
+        return httpx.Timeout(seconds, connect=settings.HF_CONNECT_TIMEOUT_SECONDS)
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        """httpcore trace hook: count connection setups to measure keep-alive reuse"""
+        if event_name == "connection.connect_tcp.complete":
+            self._stats["new_connections"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self._stats["tls_handshakes"] += 1
+
+    def _breaker(self, model_id: str) -> CircuitBreaker:
+        if model_id not in self._breakers:
+            self._breakers[model_id] = CircuitBreaker(
+                model_id, settings.HF_BREAKER_FAILURES, settings.HF_BREAKER_COOLDOWN_SECONDS
+            )
+        return self._breakers[model_id]
+
+    async def _post(self, model_id: str, payload: Dict[str, Any]) -> httpx.Response:
+        """Single HTTP attempt; successful latencies feed the hedging delay"""
+        self._stats["requests"] += 1
+        started = time.monotonic()
+        response = await self.client.post(
+            f"{self.api_url}/{model_id}",
+            json=payload,
+            timeout=self._timeout_for(model_id),
+            extensions={"trace": self._trace}
+        )
+        if response.status_code == 200:
+            self._latencies.setdefault(model_id, LatencyTracker()).record(time.monotonic() - started)
+        return response
+
+    async def _send(self, model_id: str, payload: Dict[str, Any], hedge: bool) -> httpx.Response:
+        """Send one attempt, optionally hedged with a duplicate after the tail-latency delay"""
+        if not hedge:
+            return await self._post(model_id, payload)
+        
+        tracker = self._latencies.setdefault(model_id, LatencyTracker())
+        delay = max(
+            tracker.percentile(settings.HF_HEDGE_QUANTILE, default=self._timeout_for(model_id).read / 2),
+            settings.HF_HEDGE_MIN_DELAY_SECONDS
+        )
+        response, hedge_won = await hedged(lambda: self._post(model_id, payload), delay)
+        if hedge_won is not None:
+            self._stats["hedges"] += 1
+            self._stats["hedges_won"] += int(hedge_won)
+        return response
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> Tuple[Any, bool]:
+        """Decode the body once; returns (body, is_json). Error bodies are often plain text/HTML."""
+        try:
+            return response.json(), True
+        except ValueError:
+            return response.text, False
+
+    @staticmethod
+    def _cache_key(model_id: str, payload: Dict[str, Any]) -> str:
+        """Digest of the model id and canonical JSON payload"""
+        digest = hashlib.sha256(model_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _payload_size(payload: Dict[str, Any]) -> int:
+        """Rough payload size: the length of its top-level string / bytes values"""
+        return sum(len(value) for value in payload.values() if isinstance(value, (str, bytes)))
+
+    async def _cache_get(self, key: str) -> Optional[Any]:
+        """Cache lookup; the disk tier is read in a worker thread"""
+        if self.cache is None:
+            return None
+        if self.cache.cache_dir is None:
+            return self.cache.get(key)
+        return await asyncio.to_thread(self.cache.get, key)
 
-    async def query(self, model_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def query(self, model_id: str, payload: Dict[str, Any], hedge: Optional[bool] = None) -> Dict[str, Any]:
         """
-        Make a request to the HuggingFace Inference API.
+        Make a request to the HuggingFace Inference API, or to the local CPU
+        backend for models configured as "local" in INFERENCE_BACKENDS.
+        
+        Successful responses are cached for HF_CACHE_TTL_SECONDS, and concurrent
+        identical queries share a single upstream call (single flight). The call
+        runs in its own task, so one caller being cancelled does not fail the
+        others; it is only cancelled once every caller has gone.
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.api_url}/{model_id}",
-                headers=self.headers,
-                json=payload,
-                timeout=30.0  # Increased timeout for larger models
-            )
-            
-            if response.status_code != 200:
-                # Handle model loading state
-                if "estimated_time" in response.json():
-                    return {"error": "Model is loading", "estimated_time": response.json()["estimated_time"]}
-                raise Exception(f"HuggingFace API Error: {response.text}")
+        if self._payload_size(payload) > CACHE_KEY_INLINE_BYTES:
+            key = await asyncio.to_thread(self._cache_key, model_id, payload)
+        else:
+            key = self._cache_key(model_id, payload)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, model_id, payload, hedge))
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._stats["coalesced"] += 1
+        
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: str, task: asyncio.Future):
+        """Drop a finished single-flight call, retrieving an outcome nobody awaited"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._waiters.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, key: str, model_id: str, payload: Dict[str, Any], hedge: Optional[bool]) -> Dict[str, Any]:
+        """The shared call behind query(); successful results are cached"""
+        if self._backend_for(model_id) == "local":
+            result = await self.local.query(model_id, self._task_for(model_id), payload)
+        else:
+            result = await self._query_upstream(model_id, payload, hedge)
+        if self.cache is not None and not (isinstance(result, dict) and "error" in result):
+            if self.cache.cache_dir is None:
+                self.cache.set(key, result)
+            else:
+                await asyncio.to_thread(self.cache.set, key, result)
+        return result
+
+    async def _query_upstream(self, model_id: str, payload: Dict[str, Any], hedge: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Call the API with retries.
+        
+        Cold models (503 with estimated_time) are waited for, overload and transient
+        errors are retried with jittered exponential backoff, and a per-model circuit
+        breaker fails fast while a model keeps failing. Other client errors raise.
+        
+        Returns:
+            Model output, or {"error": ..., "estimated_time": ...} when the model stays unavailable
+        """
+        breaker = self._breaker(model_id)
+        trial = breaker.state == "half_open"
+        if not breaker.allow():
+            self._stats["short_circuited"] += 1
+            return {"error": "Model unavailable", "estimated_time": round(breaker.retry_after(), 1)}
+        
+        # A half-open trial must always settle, or the breaker would refuse every later call
+        try:
+            return await self._attempts(model_id, payload, hedge, breaker)
+        except asyncio.CancelledError:
+            if trial:
+                breaker.release_trial()
+            raise
+        except Exception:
+            if trial and breaker.state == "half_open":
+                breaker.record_failure()
+            raise
+    
+    async def _attempts(self, model_id: str, payload: Dict[str, Any], hedge: Optional[bool],
+                        breaker: CircuitBreaker) -> Dict[str, Any]:
+        """The retry loop of _query_upstream; records the outcome on the breaker"""
+        hedge = settings.HF_HEDGE_REQUESTS if hedge is None else hedge
+        budget = settings.HF_RETRY_BUDGET_SECONDS
+        failure = "Model unavailable"
+        estimated_time = None
+        
+        for attempt in range(settings.HF_MAX_RETRIES + 1):
+            if attempt:
+                self._stats["retries"] += 1
+            try:
+                response = await self._send(model_id, payload, hedge)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                failure = f"HuggingFace request failed: {type(e).__name__}"
+                delay = backoff_delay(attempt, settings.HF_BACKOFF_BASE_SECONDS, settings.HF_BACKOFF_MAX_SECONDS)
+            else:
+                body, is_json = self._parse(response)
+                status = response.status_code
+                
+                if status == 200:
+                    breaker.record_success()
+                    if not is_json:
+                        raise Exception(f"HuggingFace API returned a non-JSON body: {body[:200]}")
+                    return body
                 
-            return response.json()
+                loading = is_json and isinstance(body, dict) and "estimated_time" in body
+                if loading:
+                    # Cold model: wait roughly as long as the API says loading takes
+                    failure = "Model is loading"
+                    estimated_time = float(body["estimated_time"])
+                    self._stats["loading_waits"] += 1
+                    delay = min(estimated_time, settings.HF_MAX_LOADING_WAIT_SECONDS)
+                elif status == 429 or status >= 500:
+                    failure = f"HuggingFace API Error ({status})"
+                    retry_after = response.headers.get("retry-after", "")
+                    delay = (
+                        float(retry_after) if retry_after.isdigit()
+                        else backoff_delay(attempt, settings.HF_BACKOFF_BASE_SECONDS, settings.HF_BACKOFF_MAX_SECONDS)
+                    )
+                else:
+                    # Bad request / auth / unknown model: retrying will not help and the model is not down
+                    breaker.record_success()
+                    raise Exception(f"HuggingFace API Error ({status}): {str(body)[:500]}")
+            
+            if attempt == settings.HF_MAX_RETRIES or delay > budget:
+                break
+            budget -= delay
+            logger.info(f"{model_id}: {failure}; retrying in {delay:.1f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+        
+        # Keep a loading model's breaker open until it should be warm
+        breaker.record_failure(cooldown=estimated_time)
+        return {"error": failure, "estimated_time": estimated_time}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Connection reuse, cache, retry and circuit breaker statistics"""
+        stats = dict(self._stats)
+        requests = stats["requests"]
+        stats["reused_connections"] = max(requests - stats["new_connections"], 0)
+        stats["reuse_rate"] = stats["reused_connections"] / requests if requests else 0.0
+        stats["http2"] = self._http2
+        stats["open"] = self._client is not None
+        stats["local"] = self.local.get_stats()
+        stats["cache"] = self.cache.get_stats() if self.cache is not None else None
+        stats["breakers"] = {model_id: breaker.get_stats() for model_id, breaker in self._breakers.items()}
+        return stats
 
 # Models Configuration
 MODELS = {
@@ -38,4 +354,26 @@ MODELS = {
     "video_detection": "Naman712/Deep-fake-detection"
 }
 
+# Default request timeouts (seconds) per task; large payloads / cold models need longer
+MODEL_TIMEOUTS = {
+    "text_detection": 15.0,
+    "image_detection": 30.0,
+    "audio_detection": 30.0,
+    "video_detection": 60.0
+}
+
+# Classifier labels that denote the "fake" class (others are treated as "real")
+FAKE_LABEL_KEYWORDS = ("fake", "spoof", "synthetic", "generated", "manipulated")
+
+def fake_probability(label: str, score: float) -> float:
+    """Convert a classifier label/score into a probability of being fake"""
+    is_fake = any(keyword in label.lower() for keyword in FAKE_LABEL_KEYWORDS)
+    return score if is_fake else 1.0 - score
+
+# Native input resolution (longest side, px) of the vision models; payloads are downscaled to this
+MODEL_INPUT_SIZES = {
+    "image_detection": 224,
+    "video_detection": 224
+}
+
 hf_client = HuggingFaceClient()
@@ -0,0 +1,479 @@
+"""
+Job Queue - Durable local queue for asynchronous deep analysis
+Jobs are persisted in SQLite (no broker needed) and survive restarts. A pool
+of asyncio workers, sized per content type, claims jobs by priority, retries
+failures with backoff and keeps results for a TTL; clients poll for the
+result or receive it by webhook.
+
+Several processes (e.g. uvicorn workers) may share one database: a claimed
+job is leased to its process, which keeps renewing the lease while it runs,
+and only jobs whose lease has expired are taken back by recover().
+"""
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+import logging
+
+import httpx
+
+from app.core.config import settings
+from app.core.resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    content_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL,
+    result TEXT,
+    error TEXT,
+    webhook_url TEXT,
+    webhook_status TEXT,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, content_type, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS jobs_expiry ON jobs (expires_at);
+"""
+
+# Columns returned to clients (the payload stays in the database)
+PUBLIC_COLUMNS = ("id", "content_type", "priority", "status", "attempts", "created_at", "started_at",
+                  "finished_at", "expires_at", "result", "error", "webhook_status")
+
+# Columns added after the first release, for databases created before them
+MIGRATIONS = {
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "lease_until": "ALTER TABLE jobs ADD COLUMN lease_until REAL"
+}
+
+JobHandler = Callable[[str, Dict], Awaitable[Dict]]
+
+
+async def check_webhook_url(url: str):
+    """
+    Refuse webhook targets that would let clients make the server call internal
+    services (SSRF): only http(s), only JOB_WEBHOOK_ALLOWED_HOSTS when set, and
+    only public addresses unless JOB_WEBHOOK_ALLOW_PRIVATE
+
+    Raises:
+        ValueError: If the URL may not be used
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("Webhook URL must be an http(s) URL with a host")
+    host = parts.hostname.lower()
+    allowed = {allowed_host.lower() for allowed_host in settings.JOB_WEBHOOK_ALLOWED_HOSTS}
+    if allowed and host not in allowed:
+        raise ValueError(f"Webhook host '{host}' is not allowed")
+    if settings.JOB_WEBHOOK_ALLOW_PRIVATE:
+        return
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(
+            host, parts.port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except socket.gaierror:
+        raise ValueError(f"Webhook host '{host}' does not resolve")
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0].split("%", 1)[0]).is_global:
+            raise ValueError(f"Webhook host '{host}' resolves to a non-public address")
+
+
+class JobQueue:
+    """SQLite-backed job table; every method is a short transaction, safe from any thread"""
+
+    def __init__(self, path: str, max_attempts: int = 3, result_ttl_seconds: float = 86400.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self._conn.execute(statement)
+
+        # Identifies this process's leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def submit(self, content_type: str, payload: Dict, priority: int = 0, webhook_url: Optional[str] = None) -> str:
+        """Queue a job; higher priority runs first"""
+        job_id = f"job_{uuid.uuid4().hex}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, content_type, payload, priority, status, max_attempts, run_after, created_at, webhook_url) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, content_type, json.dumps(payload), priority, self.max_attempts, now, now, webhook_url)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Public view of a job, or None if unknown or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(PUBLIC_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] < time.time()):
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self, content_type: str) -> Optional[Dict]:
+        """Atomically take the next runnable job of a content type (highest priority, oldest first)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, content_type, payload, attempts, webhook_url FROM jobs "
+                    "WHERE status = 'queued' AND content_type = ? AND run_after <= ? "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (content_type, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                        "owner = ?, lease_until = ? WHERE id = ?",
+                        (now, self.owner, now + settings.JOB_LEASE_SECONDS, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id: str, result: Dict) -> bool:
+        """
+        Store a job's result; it is kept for the result TTL
+
+        Returns:
+            False if this process no longer holds the job (its lease expired and it was taken back)
+        """
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, finished_at = ?, expires_at = ?, "
+                "owner = NULL WHERE id = ? AND status = 'running' AND owner = ?",
+                (json.dumps(result), now, now + self.result_ttl_seconds, job_id, self.owner)
+            ).rowcount > 0
+
+    def fail(self, job_id: str, error: str, attempts: int) -> Optional[bool]:
+        """
+        Record a failed attempt
+
+        Returns:
+            True if the job was re-queued (with backoff), False if it is now failed for good,
+            None if this process no longer holds the job
+        """
+        now = time.time()
+        with self._lock:
+            if attempts < self.max_attempts:
+                delay = backoff_delay(attempts, settings.JOB_RETRY_BASE_SECONDS, settings.JOB_RETRY_MAX_SECONDS)
+                updated = self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, run_after = ?, owner = NULL "
+                    "WHERE id = ? AND status = 'running' AND owner = ?",
+                    (error, now + delay, job_id, self.owner)
+                ).rowcount
+                return True if updated else None
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, expires_at = ?, owner = NULL "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (error, now, now + self.result_ttl_seconds, job_id, self.owner)
+            ).rowcount
+            return False if updated else None
+
+    def renew(self, job_ids: List[str]):
+        """Extend this process's leases on the given running jobs"""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running' "
+                f"AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time() + settings.JOB_LEASE_SECONDS, self.owner, *job_ids)
+            )
+
+    def set_webhook_status(self, job_id: str, status: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (status, job_id))
+
+    def recover(self) -> int:
+        """
+        Take back jobs whose process stopped renewing their lease (crash or restart)
+
+        Jobs still leased by a live process are left alone. An interrupted job
+        that has used up its attempts is failed instead of being run again.
+
+        Returns:
+            Number of jobs re-queued
+        """
+        now = time.time()
+        expired = "status = 'running' AND (lease_until IS NULL OR lease_until < ?)"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'Interrupted'), finished_at = ?, "
+                    f"expires_at = ?, owner = NULL WHERE {expired} AND attempts >= max_attempts",
+                    (now, now + self.result_ttl_seconds, now)
+                ).rowcount
+                count = self._conn.execute(
+                    f"UPDATE jobs SET status = 'queued', run_after = ?, owner = NULL WHERE {expired}",
+                    (now, now)
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if count:
+            logger.info(f"Re-queued {count} interrupted jobs")
+        if failed:
+            logger.warning(f"Failed {failed} interrupted jobs that had no attempts left")
+        return count
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs whose result TTL has passed"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            ).rowcount
+
+    def get_stats(self) -> Dict:
+        """Job counts per status, and queued jobs per content type"""
+        with self._lock:
+            by_status = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            queued = self._conn.execute(
+                "SELECT content_type, COUNT(*) FROM jobs WHERE status = 'queued' GROUP BY content_type"
+            ).fetchall()
+        return {
+            "by_status": {status: count for status, count in by_status},
+            "queued_by_type": {content_type: count for content_type, count in queued}
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobWorkers:
+    """asyncio workers that claim and run jobs, JOB_CONCURRENCY workers per content type"""
+
+    def __init__(self, queue: JobQueue, handler: JobHandler):
+        """
+        Args:
+            queue: Job store
+            handler: Coroutine (content_type, payload) -> JSON-serializable result
+        """
+        self.queue = queue
+        self.handler = handler
+        self._tasks: List[asyncio.Task] = []
+        self._deliveries: Set[asyncio.Task] = set()
+        self._running: Set[str] = set()
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats = {"succeeded": 0, "failed": 0, "retried": 0, "webhooks_delivered": 0, "webhooks_failed": 0}
+
+    async def start(self):
+        """Take back interrupted jobs and start the workers (called from the FastAPI lifespan)"""
+        await asyncio.to_thread(self.queue.recover)
+        self._client = httpx.AsyncClient(timeout=settings.JOB_WEBHOOK_TIMEOUT_SECONDS)
+        for content_type, workers in settings.JOB_CONCURRENCY.items():
+            self._wakeups[content_type] = asyncio.Event()
+            for _ in range(workers):
+                self._tasks.append(asyncio.create_task(self._worker(content_type)))
+        self._tasks.append(asyncio.create_task(self._janitor()))
+        self._tasks.append(asyncio.create_task(self._leases()))
+        logger.info(f"Started job workers: {settings.JOB_CONCURRENCY}")
+
+    async def stop(self):
+        """Stop the workers; jobs still running are re-queued once their lease expires"""
+        tasks = self._tasks + list(self._deliveries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def notify(self, content_type: str):
+        """Wake an idle worker for a newly submitted job instead of waiting for the next poll"""
+        wakeup = self._wakeups.get(content_type)
+        if wakeup is not None:
+            wakeup.set()
+
+    async def _worker(self, content_type: str):
+        wakeup = self._wakeups[content_type]
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim, content_type)
+            except Exception as e:
+                logger.error(f"Could not claim a {content_type} job: {e}")
+                job = None
+            if job is None:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict):
+        self._running.add(job["id"])
+        try:
+            result = await asyncio.wait_for(
+                self.handler(job["content_type"], job["payload"]), settings.JOB_TIMEOUT_SECONDS
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            retrying = await asyncio.to_thread(self.queue.fail, job["id"], error, job["attempts"])
+            if retrying is None:
+                logger.warning(f"Job {job['id']} lost its lease; another process has taken it over")
+            elif retrying:
+                self._stats["retried"] += 1
+                logger.warning(f"Job {job['id']} attempt {job['attempts']} failed, will retry: {error}")
+            else:
+                self._stats["failed"] += 1
+                logger.error(f"Job {job['id']} failed after {job['attempts']} attempts: {error}")
+                self._spawn_delivery(job, {"job_id": job["id"], "status": "failed", "error": error})
+            return
+        finally:
+            self._running.discard(job["id"])
+
+        if not await asyncio.to_thread(self.queue.complete, job["id"], result):
+            logger.warning(f"Job {job['id']} lost its lease; its result was discarded")
+            return
+        self._stats["succeeded"] += 1
+        self._spawn_delivery(job, {"job_id": job["id"], "status": "succeeded", "result": result})
+
+    def _spawn_delivery(self, job: Dict, body: Dict):
+        """Deliver the webhook in its own task, so the worker moves on to the next job"""
+        if not job.get("webhook_url") or self._client is None:
+            return
+        task = asyncio.create_task(self._deliver(job, body))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, job: Dict, body: Dict):
+        """POST the outcome to the job's webhook, retrying with backoff"""
+        url = job["webhook_url"]
+        try:
+            # Checked again at delivery: the host may resolve differently than at submission
+            await check_webhook_url(url)
+        except ValueError as e:
+            logger.warning(f"Webhook for {job['id']} refused: {e}")
+            self._stats["webhooks_failed"] += 1
+            await asyncio.to_thread(self.queue.set_webhook_status, job["id"], "refused")
+            return
+        for attempt in range(settings.JOB_WEBHOOK_ATTEMPTS):
+            try:
+                response = await self._client.post(url, json=body)
+                if response.status_code < 400:
+                    self._stats["webhooks_delivered"] += 1
+                    await asyncio.to_thread(self.queue.set_webhook_status, job["id"], "delivered")
+                    return
+                logger.warning(f"Webhook for {job['id']} returned {response.status_code}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Webhook for {job['id']} failed: {e}")
+            if attempt + 1 < settings.JOB_WEBHOOK_ATTEMPTS:
+                await asyncio.sleep(backoff_delay(attempt, 1.0, 30.0))
+        self._stats["webhooks_failed"] += 1
+        await asyncio.to_thread(self.queue.set_webhook_status, job["id"], "failed")
+
+    async def _leases(self):
+        """Keep this process's running jobs leased, and take back jobs whose process has gone"""
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(self.queue.renew, list(self._running))
+                if await asyncio.to_thread(self.queue.recover):
+                    for wakeup in self._wakeups.values():
+                        wakeup.set()
+            except Exception as e:
+                logger.error(f"Error renewing job leases: {e}")
+
+    async def _janitor(self):
+        """Periodically drop expired results"""
+        while True:
+            await asyncio.sleep(settings.JOB_PURGE_INTERVAL_SECONDS)
+            try:
+                purged = await asyncio.to_thread(self.queue.purge_expired)
+                if purged:
+                    logger.info(f"Purged {purged} expired jobs")
+            except Exception as e:
+                logger.error(f"Error purging expired jobs: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "workers": {content_type: workers for content_type, workers in settings.JOB_CONCURRENCY.items()},
+            "queue": self.queue.get_stats()
+        }
+
+
+# Global instances
+_job_queue = None
+_job_workers = None
+
+def get_job_queue():
+    """Get or create global job queue instance"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            settings.JOB_DB_PATH,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS
+        )
+    return _job_queue
+
+def get_job_workers() -> Optional[JobWorkers]:
+    """Running worker pool, or None if jobs are disabled / not started"""
+    return _job_workers
+
+async def start_job_workers(handler: JobHandler):
+    """Start the global worker pool with the given job handler"""
+    global _job_workers
+    if _job_workers is None:
+        _job_workers = JobWorkers(get_job_queue(), handler)
+        await _job_workers.start()
+
+async def stop_job_workers():
+    """Stop the global worker pool, if running"""
+    global _job_workers
+    if _job_workers is not None:
+        await _job_workers.stop()
+        _job_workers = None
@@ -0,0 +1,101 @@
+"""
+Keyframe Extraction - Streaming video frame sampling with OpenCV
+Samples frames at a fixed rate or on scene changes, one frame in memory at a time
+"""
+import cv2
+import numpy as np
+from typing import Iterator, NamedTuple, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Keyframe(NamedTuple):
+    index: int          # Frame number in the source video
+    timestamp: float    # Seconds from the start
+    frame: np.ndarray   # BGR image
+    scene_change: float # Histogram distance to the previous keyframe (0-1)
+
+
+def _signature(frame: np.ndarray) -> np.ndarray:
+    """Cheap normalized grayscale histogram used for scene-change detection"""
+    small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
+    return cv2.normalize(hist, hist).astype(np.float32)
+
+
+def iter_keyframes(path: str, mode: Optional[str] = None, sample_fps: Optional[float] = None,
+                   max_frames: Optional[int] = None) -> Iterator[Keyframe]:
+    """
+    Stream keyframes from a video file
+
+    Args:
+        path: Video file path
+        mode: "scene" (emit on scene changes, with a maximum gap) or "fixed" (constant rate)
+        sample_fps: Sampling rate for "fixed" mode / candidate rate for "scene" mode
+        max_frames: Stop after this many keyframes
+
+    Frames between candidates are only grabbed, never decoded, so cost and memory
+    do not depend on resolution of the skipped frames or on video length. When
+    the frame count is known, keyframes are kept at least 1/max_frames of the
+    video apart, so the budget covers the whole video rather than its start.
+    """
+    mode = mode or settings.VIDEO_SAMPLING_MODE
+    max_frames = max_frames or settings.VIDEO_MAX_KEYFRAMES
+    if sample_fps is None:
+        sample_fps = settings.VIDEO_SCENE_CHECK_FPS if mode == "scene" else settings.VIDEO_SAMPLE_FPS
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video stream")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(int(round(fps / sample_fps)), 1)
+        max_gap = int(settings.VIDEO_MAX_KEYFRAME_GAP_SECONDS * fps)
+
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        min_spacing = total // max_frames if total > 0 else 0
+        if mode == "scene":
+            # Prefer a scene change after min_spacing, force a keyframe by twice that
+            max_gap = max(max_gap, 2 * min_spacing)
+        else:
+            step = max(step, min_spacing)
+
+        emitted = 0
+        index = -1
+        last_signature = None
+        last_emitted = None
+
+        while emitted < max_frames:
+            if not cap.grab():
+                break
+            index += 1
+            if index % step or (last_emitted is not None and index - last_emitted < min_spacing):
+                continue
+
+            ok, frame = cap.retrieve()
+            if not ok:
+                continue
+
+            if mode == "scene":
+                signature = _signature(frame)
+                if last_signature is None:
+                    distance = 1.0
+                else:
+                    distance = float(cv2.compareHist(last_signature, signature, cv2.HISTCMP_BHATTACHARYYA))
+                gap_exceeded = last_emitted is not None and index - last_emitted >= max_gap
+                if last_signature is not None and distance < settings.VIDEO_SCENE_THRESHOLD and not gap_exceeded:
+                    continue
+                last_signature = signature
+            else:
+                distance = 0.0
+
+            last_emitted = index
+            emitted += 1
+            yield Keyframe(index, index / fps, frame, distance)
+    finally:
+        cap.release()
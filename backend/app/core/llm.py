@@ -1,32 +1,41 @@
+import threading
+from typing import Dict, Tuple
 from langchain_google_genai import ChatGoogleGenerativeAI
 from app.core.config import settings
 
+# Process-wide clients keyed by (model, temperature); the client is stateless
+# between calls, so one instance per configuration can serve every request
+_llm_cache: Dict[Tuple[str, float], ChatGoogleGenerativeAI] = {}
+_llm_lock = threading.Lock()
+
+def _get_cached_llm(model: str, temperature: float) -> ChatGoogleGenerativeAI:
+    """Return the shared client for a model/temperature pair, creating it once"""
+    key = (model, float(temperature))
+    llm = _llm_cache.get(key)
+    if llm is not None:
+        return llm
+
+    if not settings.GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY is not set in environment variables.")
+
+    with _llm_lock:
+        if key not in _llm_cache:
+            _llm_cache[key] = ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=settings.GOOGLE_API_KEY,
+                temperature=temperature,
+                convert_system_message_to_human=True
+            )
+        return _llm_cache[key]
+
 def get_llm(temperature: float = 0.0):
     """
     Get the Gemini LLM instance.
     """
-    if not settings.GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY is not set in environment variables.")
-        
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-001",  # Latest stable Gemini 2.0
-        google_api_key=settings.GOOGLE_API_KEY,
-        temperature=temperature,
-        convert_system_message_to_human=True
-    )
-    return llm
+    return _get_cached_llm(settings.LLM_MODEL, temperature)
 
 def get_vision_llm(temperature: float = 0.0):
     """
     Get the Gemini Vision LLM instance for image/video analysis.
     """
-    if not settings.GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY is not set in environment variables.")
-        
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-001",  # Latest stable Gemini 2.0 with vision support
-        google_api_key=settings.GOOGLE_API_KEY,
-        temperature=temperature,
-        convert_system_message_to_human=True
-    )
-    return llm
+    return _get_cached_llm(settings.VISION_LLM_MODEL, temperature)
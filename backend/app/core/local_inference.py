@@ -0,0 +1,228 @@
+"""
+Local Inference - CPU backend for the detection MODELS
+Runs the HuggingFace checkpoints in-process with transformers pipelines.
+Requests for the same model are micro-batched across callers and executed
+on a bounded worker pool; results match the Inference API's output format.
+
+Requires the optional 'transformers' and 'torch' packages.
+"""
+import asyncio
+import base64
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+import logging
+
+from app.core.audio_stream import AudioFormatError, decode_wav
+from app.core.config import settings
+from app.core.uploads import strip_data_url
+
+logger = logging.getLogger(__name__)
+
+# transformers pipeline task for each detection task in MODELS
+PIPELINE_TASKS = {
+    "text_detection": "text-classification",
+    "image_detection": "image-classification",
+    "audio_detection": "audio-classification",
+    "video_detection": "video-classification"
+}
+
+
+class _Request(NamedTuple):
+    inputs: Any
+    future: asyncio.Future
+
+
+class LocalInferenceBackend:
+    """In-process CPU inference with per-model micro-batching"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pipelines: Dict[str, Any] = {}
+        self._load_lock = threading.Lock()
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._batchers: Dict[str, asyncio.Task] = {}
+        self._stats = {"requests": 0, "batches": 0, "batched_items": 0, "failed": 0, "inference_seconds": 0.0}
+
+    def _ensure_pool(self):
+        """Create the worker pool on first use (inside the running event loop)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.LOCAL_INFERENCE_WORKERS, thread_name_prefix="local-inference"
+            )
+            self._slots = asyncio.Semaphore(settings.LOCAL_INFERENCE_WORKERS)
+
+    def _pipeline(self, model_id: str, task: str):
+        """Load (once) the transformers pipeline for a model"""
+        pipe = self._pipelines.get(model_id)
+        if pipe is not None:
+            return pipe
+        with self._load_lock:
+            if model_id not in self._pipelines:
+                try:
+                    import torch
+                    from transformers import pipeline
+                except ImportError:
+                    raise RuntimeError("Local inference requires the 'transformers' and 'torch' packages")
+
+                if settings.LOCAL_INFERENCE_TORCH_THREADS:
+                    torch.set_num_threads(settings.LOCAL_INFERENCE_TORCH_THREADS)
+                started = time.perf_counter()
+                self._pipelines[model_id] = pipeline(
+                    PIPELINE_TASKS[task],
+                    model=model_id,
+                    device=-1,
+                    trust_remote_code=settings.LOCAL_INFERENCE_TRUST_REMOTE_CODE
+                )
+                logger.info(f"Loaded local model {model_id} in {time.perf_counter() - started:.1f}s")
+            return self._pipelines[model_id]
+
+    @staticmethod
+    def _decode(task: str, inputs: Any) -> Any:
+        """Convert an API-style input (text or base64 media) into pipeline input"""
+        if task == "text_detection":
+            return inputs
+        data = base64.b64decode(strip_data_url(inputs))
+        if task == "image_detection":
+            from PIL import Image
+            return Image.open(io.BytesIO(data)).convert("RGB")
+        if task == "audio_detection":
+            try:
+                samples, rate = decode_wav(data)
+                return {"raw": samples, "sampling_rate": rate}
+            except AudioFormatError:
+                return data  # Compressed audio: the pipeline decodes it with ffmpeg
+        # Video pipelines read from a file path
+        fd, path = tempfile.mkstemp(suffix=".mp4", dir=settings.UPLOAD_TEMP_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return path
+
+    def _run_batch(self, model_id: str, task: str, batch: List[Any]) -> List[Any]:
+        """Run one batch in a worker thread; returns one output or exception per input"""
+        pipe = self._pipeline(model_id, task)
+        outputs: List[Any] = [None] * len(batch)
+        decoded, positions = [], []
+        for i, inputs in enumerate(batch):
+            try:
+                decoded.append(self._decode(task, inputs))
+                positions.append(i)
+            except Exception as e:
+                outputs[i] = ValueError(f"Invalid input for {task}: {e}")
+
+        try:
+            if decoded:
+                started = time.perf_counter()
+                kwargs = {"top_k": None} if task == "text_detection" else {}
+                results = pipe(decoded, batch_size=len(decoded), **kwargs)
+                self._stats["inference_seconds"] += time.perf_counter() - started
+                for i, result in zip(positions, results):
+                    outputs[i] = result
+        finally:
+            if task == "video_detection":
+                for path in decoded:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+        return outputs
+
+    async def _dispatch(self, model_id: str, task: str, batch: List[_Request]):
+        """Execute a collected batch on the worker pool and resolve its futures"""
+        loop = asyncio.get_running_loop()
+        slots = self._slots
+        try:
+            outputs = await loop.run_in_executor(
+                self._executor, self._run_batch, model_id, task, [r.inputs for r in batch]
+            )
+        except Exception as e:
+            outputs = [e] * len(batch)
+        finally:
+            slots.release()
+
+        self._stats["batches"] += 1
+        self._stats["batched_items"] += len(batch)
+        for request, output in zip(batch, outputs):
+            if request.future.done():
+                continue
+            if isinstance(output, Exception):
+                self._stats["failed"] += 1
+                request.future.set_exception(output)
+            else:
+                request.future.set_result(output)
+
+    async def _batch_loop(self, model_id: str, task: str, queue: asyncio.Queue):
+        """Collect requests into batches; a batch closes when full or after the wait window"""
+        loop = asyncio.get_running_loop()
+        wait = settings.LOCAL_INFERENCE_BATCH_WAIT_MS / 1000.0
+        while True:
+            batch = [await queue.get()]
+            # Waiting for a free worker lets more requests accumulate into this batch
+            await self._slots.acquire()
+            deadline = loop.time() + wait
+            while len(batch) < settings.LOCAL_INFERENCE_MAX_BATCH:
+                try:
+                    batch.append(queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [r for r in batch if not r.future.cancelled()]
+            if batch:
+                asyncio.ensure_future(self._dispatch(model_id, task, batch))
+            else:
+                self._slots.release()
+
+    async def query(self, model_id: str, task: str, payload: Dict[str, Any]) -> Any:
+        """Same contract as HuggingFaceClient.query, served locally"""
+        self._ensure_pool()
+        queue = self._queues.get(model_id)
+        if queue is None:
+            queue = self._queues[model_id] = asyncio.Queue()
+            self._batchers[model_id] = asyncio.ensure_future(self._batch_loop(model_id, task, queue))
+
+        self._stats["requests"] += 1
+        future = asyncio.get_running_loop().create_future()
+        await queue.put(_Request(payload["inputs"], future))
+        return await future
+
+    async def preload(self, models: Dict[str, str]):
+        """Load pipelines ahead of the first request; models maps task -> model id"""
+        self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        for task, model_id in models.items():
+            try:
+                await loop.run_in_executor(self._executor, self._pipeline, model_id, task)
+            except Exception as e:
+                logger.error(f"Could not preload local model {model_id}: {e}")
+
+    async def close(self):
+        """Stop batchers and the worker pool"""
+        for task in self._batchers.values():
+            task.cancel()
+        self._batchers.clear()
+        self._queues.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batching and throughput statistics"""
+        stats = dict(self._stats)
+        stats["avg_batch_size"] = stats["batched_items"] / stats["batches"] if stats["batches"] else 0.0
+        stats["inference_seconds"] = round(stats["inference_seconds"], 3)
+        stats["loaded_models"] = list(self._pipelines)
+        return stats
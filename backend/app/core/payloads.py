@@ -0,0 +1,106 @@
+"""
+Payload Preprocessing - Shrink media before it goes over the network
+Resizes images to a model's native input resolution, re-encodes compactly
+and records bytes / estimated latency saved per call
+"""
+import io
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple, Union
+import logging
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def downscale_image(image_bytes: Union[bytes, memoryview], max_side: int, quality: Optional[int] = None) -> bytes:
+    """
+    Resize so the longest side is at most max_side and re-encode as JPEG
+
+    Images already within the limit are still re-encoded; the original is
+    returned if re-encoding would not make it smaller.
+    """
+    quality = quality or settings.PAYLOAD_JPEG_QUALITY
+    img = Image.open(io.BytesIO(image_bytes))
+    # Decode JPEGs at reduced scale straight away
+    img.draft("RGB", (max_side, max_side))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    encoded = out.getvalue()
+    return encoded if len(encoded) < len(image_bytes) else bytes(image_bytes)
+
+
+class PayloadMetrics:
+    """Per-target record of bytes and estimated upload time saved by preprocessing"""
+
+    def __init__(self, history: int = 100):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict] = {}
+        self._recent = deque(maxlen=history)
+
+    def record(self, target: str, original_bytes: int, sent_bytes: int, prep_seconds: float) -> Dict:
+        """Record one preprocessed call and return its entry"""
+        saved = max(original_bytes - sent_bytes, 0)
+        # Upload time avoided at the configured uplink rate, minus the time spent preprocessing
+        latency_saved = saved / settings.PAYLOAD_UPLINK_BYTES_PER_SEC - prep_seconds
+        entry = {
+            "target": target,
+            "timestamp": time.time(),
+            "original_bytes": original_bytes,
+            "sent_bytes": sent_bytes,
+            "bytes_saved": saved,
+            "prep_ms": round(prep_seconds * 1000, 1),
+            "latency_saved_ms": round(latency_saved * 1000, 1)
+        }
+        with self._lock:
+            totals = self._totals.setdefault(target, {
+                "calls": 0, "original_bytes": 0, "sent_bytes": 0, "bytes_saved": 0, "latency_saved_ms": 0.0
+            })
+            totals["calls"] += 1
+            totals["original_bytes"] += original_bytes
+            totals["sent_bytes"] += sent_bytes
+            totals["bytes_saved"] += saved
+            totals["latency_saved_ms"] = round(totals["latency_saved_ms"] + entry["latency_saved_ms"], 1)
+            self._recent.append(entry)
+        logger.debug(f"Payload for {target}: {original_bytes} -> {sent_bytes} bytes ({entry['latency_saved_ms']}ms saved)")
+        return entry
+
+    def get_stats(self) -> Dict:
+        """Aggregate totals per target plus the most recent calls"""
+        with self._lock:
+            return {
+                "targets": {k: dict(v) for k, v in self._totals.items()},
+                "recent": list(self._recent)[-10:]
+            }
+
+
+def preprocess_image(image_bytes: Union[bytes, memoryview], max_side: int, target: str) -> Tuple[bytes, Dict]:
+    """Downscale an image for a target model and record the savings"""
+    start = time.perf_counter()
+    try:
+        processed = downscale_image(image_bytes, max_side)
+    except Exception as e:
+        logger.warning(f"Could not downscale payload for {target}: {e}")
+        processed = bytes(image_bytes)
+    entry = get_payload_metrics().record(target, len(image_bytes), len(processed), time.perf_counter() - start)
+    return processed, entry
+
+
+# Global instance
+_payload_metrics = None
+
+def get_payload_metrics():
+    """Get or create global payload metrics instance"""
+    global _payload_metrics
+    if _payload_metrics is None:
+        _payload_metrics = PayloadMetrics()
+    return _payload_metrics
@@ -0,0 +1,217 @@
+"""
+Pixel Forensics - Vectorized pixel-level manipulation detection
+Error level analysis, noise-residual inconsistency and block-based copy-move detection
+under a per-request time budget. ELA runs on an original-resolution crop (resampling
+destroys the 8x8 JPEG grid it measures); the other stages use a downscaled working copy
+"""
+import cv2
+import numpy as np
+from PIL import Image
+import io
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 16          # Tile edge for ELA / noise statistics (working-copy pixels)
+ELA_QUALITY = 90        # JPEG quality used for the re-compression pass
+ELA_CROP = 768          # Edge of the original-resolution crop ELA runs on
+JPEG_BLOCK = 8          # ELA crops start on the JPEG block grid
+OUTLIER_Z = 3.5         # Robust z-score above which a tile counts as inconsistent
+CM_BLOCK = 8            # Copy-move block edge
+CM_STRIDE = 2           # Copy-move block stride
+CM_MAX_SIDE = 256       # Copy-move runs on a smaller copy; it is the most expensive stage
+CM_MIN_SHIFT = 16       # Ignore matches closer than this (overlapping/self-similar texture)
+CM_MIN_PAIRS = 12       # Matching block pairs sharing one shift vector to count as a clone
+
+
+def load_images(image_bytes: bytes, max_side: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode once into (centered original-resolution ELA crop, downscaled working copy)
+
+    The crop starts on a multiple of JPEG_BLOCK so its block grid lines up with the original's.
+    """
+    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    w, h = img.size
+    cw, ch = min(w, ELA_CROP), min(h, ELA_CROP)
+    x0 = (w - cw) // 2 // JPEG_BLOCK * JPEG_BLOCK
+    y0 = (h - ch) // 2 // JPEG_BLOCK * JPEG_BLOCK
+    crop = np.asarray(img.crop((x0, y0, x0 + cw, y0 + ch)), dtype=np.uint8)
+
+    # reducing_gap lets PIL shrink by whole factors first, close to the speed of JPEG draft mode
+    img.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=2.0)
+    return crop, np.asarray(img, dtype=np.uint8)
+
+
+def _tile_view(arr: np.ndarray, tile: int) -> np.ndarray:
+    """Crop a 2D array to a multiple of tile and view it as (rows, cols, tile, tile)"""
+    h, w = arr.shape[0] // tile * tile, arr.shape[1] // tile * tile
+    cropped = arr[:h, :w]
+    return cropped.reshape(h // tile, tile, w // tile, tile).swapaxes(1, 2)
+
+
+def _outlier_fraction(values: np.ndarray) -> float:
+    """Fraction of tiles whose robust z-score exceeds OUTLIER_Z"""
+    flat = values.ravel()
+    if flat.size < 4:
+        return 0.0
+    median = np.median(flat)
+    mad = np.median(np.abs(flat - median)) * 1.4826 + 1e-6
+    return float(np.mean((flat - median) / mad > OUTLIER_Z))
+
+
+def error_level_analysis(rgb: np.ndarray) -> Dict:
+    """Re-compress as JPEG and look for tiles whose error level stands out"""
+    bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    ok, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, ELA_QUALITY])
+    if not ok:
+        raise ValueError("JPEG re-encoding failed")
+    recompressed = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+    diff = cv2.absdiff(bgr, recompressed).max(axis=2).astype(np.float32)
+    tile_means = _tile_view(diff, TILE_SIZE).mean(axis=(2, 3))
+
+    outliers = _outlier_fraction(tile_means)
+    # A spliced region typically covers a few percent of the frame
+    score = float(np.clip(outliers * 8.0, 0.0, 1.0))
+    return {
+        "score": round(score, 3),
+        "outlier_tiles": round(outliers, 4),
+        "mean_error": round(float(diff.mean()), 3)
+    }
+
+
+def noise_residual_analysis(rgb: np.ndarray) -> Dict:
+    """Compare local noise levels across tiles; pasted regions carry foreign noise"""
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    residual = gray.astype(np.float32) - cv2.medianBlur(gray, 3).astype(np.float32)
+
+    tiles = _tile_view(residual, TILE_SIZE)
+    tile_std = tiles.std(axis=(2, 3))
+    # Flat tiles (sky, walls) have no usable noise signal
+    texture = _tile_view(gray.astype(np.float32), TILE_SIZE).std(axis=(2, 3))
+    usable = tile_std[texture > 2.0]
+
+    if usable.size < 4:
+        return {"score": 0.0, "outlier_tiles": 0.0, "usable_tiles": int(usable.size)}
+
+    log_std = np.log(usable + 1e-3)
+    # Both unusually clean and unusually noisy tiles are suspicious
+    outliers = max(_outlier_fraction(log_std), _outlier_fraction(-log_std))
+    score = float(np.clip(outliers * 8.0, 0.0, 1.0))
+    return {
+        "score": round(score, 3),
+        "outlier_tiles": round(outliers, 4),
+        "usable_tiles": int(usable.size)
+    }
+
+
+def copy_move_detection(rgb: np.ndarray) -> Dict:
+    """Find duplicated blocks that share a common displacement vector"""
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    h, w = gray.shape
+    scale = CM_MAX_SIDE / max(h, w)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    windows = np.lib.stride_tricks.sliding_window_view(gray, (CM_BLOCK, CM_BLOCK))[::CM_STRIDE, ::CM_STRIDE]
+    rows, cols = windows.shape[:2]
+    if rows * cols < 2:
+        return {"score": 0.0, "matched_pairs": 0}
+
+    blocks = windows.reshape(rows * cols, CM_BLOCK * CM_BLOCK).astype(np.float32)
+    ys, xs = np.divmod(np.arange(rows * cols), cols)
+    positions = np.stack([ys, xs], axis=1) * CM_STRIDE
+
+    # Skip flat blocks; they match each other trivially
+    textured = blocks.std(axis=1) > 4.0
+    blocks, positions = blocks[textured], positions[textured]
+    if len(blocks) < 2:
+        return {"score": 0.0, "matched_pairs": 0}
+
+    # Robust block feature: 2x2-averaged block quantized to coarse levels
+    half = CM_BLOCK // 2
+    pooled = blocks.reshape(-1, half, 2, half, 2).mean(axis=(2, 4)).reshape(len(blocks), -1)
+    features = (pooled // 8).astype(np.uint8)
+
+    # Lexicographic sort brings identical features next to each other
+    order = np.lexsort(features.T[::-1])
+    features, positions = features[order], positions[order]
+    same = np.all(features[1:] == features[:-1], axis=1)
+
+    shifts = positions[1:][same] - positions[:-1][same]
+    # Canonical direction so (a->b) and (b->a) count as one displacement
+    flip = (shifts[:, 0] < 0) | ((shifts[:, 0] == 0) & (shifts[:, 1] < 0))
+    shifts[flip] *= -1
+    shifts = shifts[np.hypot(shifts[:, 0], shifts[:, 1]) >= CM_MIN_SHIFT]
+
+    if len(shifts) == 0:
+        return {"score": 0.0, "matched_pairs": 0}
+
+    vectors, counts = np.unique(shifts, axis=0, return_counts=True)
+    best = int(counts.argmax())
+    best_count = int(counts[best])
+    score = float(np.clip((best_count - CM_MIN_PAIRS) / (CM_MIN_PAIRS * 3), 0.0, 1.0))
+    return {
+        "score": round(score, 3),
+        "matched_pairs": best_count,
+        "shift": [int(v) for v in vectors[best]]
+    }
+
+
+def analyze_pixels(image_bytes: bytes, max_side: int = 512, time_budget: Optional[float] = None) -> Dict:
+    """
+    Run the pixel forensics stages in order of cost until the budget runs out
+
+    Args:
+        image_bytes: Raw encoded image bytes
+        max_side: Longest side of the downscaled working copy
+        time_budget: Seconds available for this stage (None = unlimited)
+
+    Returns:
+        Per-stage results, combined score, the stages skipped for lack of time
+        and the stages that failed. "complete" is False only when the budget
+        cut stages short: failures are deterministic, so a rerun would not help.
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget is not None else None
+
+    stages = [
+        ("ela", error_level_analysis),
+        ("noise", noise_residual_analysis),
+        ("copy_move", copy_move_detection)
+    ]
+
+    result = {"skipped": [], "failed": []}
+    try:
+        ela_crop, rgb = load_images(image_bytes, max_side)
+    except Exception as e:
+        logger.warning(f"Pixel forensics could not decode the image: {e}")
+        return {"error": str(e), "score": 0.0, "complete": True, "skipped": [],
+                "failed": [name for name, _ in stages]}
+    result["working_size"] = [int(rgb.shape[1]), int(rgb.shape[0])]
+
+    for name, stage in stages:
+        if deadline is not None and time.perf_counter() >= deadline:
+            result["skipped"].append(name)
+            continue
+        try:
+            result[name] = stage(ela_crop if name == "ela" else rgb)
+        except Exception as e:
+            logger.warning(f"Pixel forensics stage '{name}' failed: {e}")
+            result["failed"].append(name)
+
+    scores = {name: result[name]["score"] for name, _ in stages if name in result}
+    weights = {"ela": 0.4, "noise": 0.3, "copy_move": 0.3}
+    if scores:
+        weighted = sum(scores[n] * weights[n] for n in scores) / sum(weights[n] for n in scores)
+        # A clear clone is strong evidence on its own
+        combined = max(weighted, scores.get("copy_move", 0.0))
+    else:
+        combined = 0.0
+
+    result["score"] = round(float(combined), 3)
+    result["complete"] = not result["skipped"]
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
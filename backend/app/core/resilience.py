@@ -0,0 +1,154 @@
+"""
+Resilience Primitives - Backoff, circuit breaking and hedging for remote calls
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit for '{name}' is open; retry in {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker
+
+    closed    -> calls pass; consecutive failures are counted
+    open      -> calls fail fast until the cooldown expires
+    half_open -> a single trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_until = 0.0
+        self._trial_in_flight = False
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() >= self._opened_until:
+                self._state = "half_open"
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will allow a trial call"""
+        return max(self._opened_until - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now"""
+        state = self.state
+        with self._lock:
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._state = "closed"
+            self._trial_in_flight = False
+
+    def record_failure(self, cooldown: Optional[float] = None):
+        """Count a failure; cooldown overrides the default open period (e.g. model load time)"""
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._stats["opened"] += 1
+                    logger.warning(f"Circuit for '{self.name}' opened after {self._failures} failures")
+                self._state = "open"
+                self._opened_until = time.monotonic() + (cooldown or self.cooldown_seconds)
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """End a half-open trial that produced no outcome (cancelled); the next call may try again"""
+        with self._lock:
+            if self._state == "half_open":
+                self._trial_in_flight = False
+
+    def get_stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_after": round(self.retry_after(), 1) if state == "open" else 0.0,
+                **self._stats
+            }
+
+
+class LatencyTracker:
+    """Rolling latency samples, used to pick the hedging delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float, default: float) -> float:
+        if len(self._samples) < 10:
+            return default
+        ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], delay: float) -> Tuple[Any, Optional[bool]]:
+    """
+    Run call(); if it has not finished after delay seconds, start a second
+    identical call and return whichever finishes first (the other is cancelled).
+
+    Returns:
+        (result, None if no hedge was sent, else whether the hedge request won)
+    """
+    primary = asyncio.ensure_future(call())
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result(), None
+
+        backup = asyncio.ensure_future(call())
+        pending = {primary, backup}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), task is backup
+            # The finished one failed; wait for the other unless both failed
+            if not pending:
+                raise next(iter(done)).exception()
+    finally:
+        # Also reached when the caller is cancelled: no request is left running unowned
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,120 @@
+"""
+Content Sniffing - Deterministic content-type detection
+Classifies input as text, image, audio or video from upload metadata, the
+data-URL MIME type or the file's magic bytes. Only a few dozen bytes are
+decoded, so routing costs microseconds.
+"""
+import base64
+import binascii
+import re
+from typing import Optional, Tuple
+
+from app.core.uploads import UPLOAD_SCHEME, ContentLike, get_upload_registry
+
+# Enough base64 to cover every signature below (48 bytes)
+_SNIFF_CHARS = 64
+_BASE64_RE = re.compile(r"^[A-Za-z0-9+/]+$")
+
+# (offset, signature, content type)
+MAGIC_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image"),           # JPEG
+    (0, b"\x89PNG\r\n\x1a\n", "image"),
+    (0, b"GIF87a", "image"),
+    (0, b"GIF89a", "image"),
+    (0, b"BM", "image"),
+    (0, b"II*\x00", "image"),                # TIFF (little-endian)
+    (0, b"MM\x00*", "image"),                # TIFF (big-endian)
+    (0, b"ID3", "audio"),                    # MP3 with ID3 tag
+    (0, b"fLaC", "audio"),
+    (0, b"OggS", "audio"),
+    (0, b"#!AMR", "audio"),
+    (0, b"\x1aE\xdf\xa3", "video"),          # Matroska / WebM
+    (0, b"FLV", "video"),
+    (0, b"\x00\x00\x01\xba", "video"),       # MPEG program stream
+]
+
+# RIFF containers: the form type at offset 8 decides
+RIFF_TYPES = {b"WEBP": "image", b"WAVE": "audio", b"AVI ": "video"}
+
+# ISO base media (MP4 family): the major brand at offset 8 decides
+AUDIO_BRANDS = {b"M4A ", b"M4B ", b"M4P "}
+IMAGE_BRANDS = {b"heic", b"heix", b"mif1", b"msf1", b"avif"}
+
+MIME_PREFIXES = {"image/": "image", "audio/": "audio", "video/": "video", "text/": "text"}
+
+
+def type_from_mime(mime_type: Optional[str]) -> Optional[str]:
+    """Content type from a MIME type such as 'image/png'"""
+    if not mime_type:
+        return None
+    mime_type = mime_type.lower()
+    for prefix, content_type in MIME_PREFIXES.items():
+        if mime_type.startswith(prefix):
+            return content_type
+    if mime_type in ("application/json", "application/xml"):
+        return "text"
+    return None
+
+
+def type_from_magic(head: bytes) -> Optional[str]:
+    """Content type from the first bytes of a file"""
+    if head[:4] == b"RIFF" and len(head) >= 12:
+        return RIFF_TYPES.get(head[8:12])
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in AUDIO_BRANDS:
+            return "audio"
+        if brand in IMAGE_BRANDS:
+            return "image"
+        return "video"
+    # MPEG audio frame sync (MP3 / AAC ADTS without a tag)
+    if len(head) >= 2 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0:
+        return "audio"
+    for offset, signature, content_type in MAGIC_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    return None
+
+
+def sniff(content: ContentLike) -> Tuple[Optional[str], str]:
+    """
+    Detect the content type without any model call
+
+    Returns:
+        (content type or None when ambiguous, method used:
+         "upload" / "mime" / "magic" / "text" / "ambiguous")
+    """
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        detected = type_from_magic(bytes(content[:48]))
+        return (detected, "magic") if detected else (None, "ambiguous")
+
+    # Only the prefix is inspected, so multi-megabyte payloads are never copied
+    prefix = content[:512].lstrip()
+    if prefix.startswith(UPLOAD_SCHEME):
+        upload = get_upload_registry().resolve(content.strip())
+        if upload is not None and upload.content_type:
+            return upload.content_type, "upload"
+        return None, "ambiguous"
+
+    if prefix.startswith("data:"):
+        comma = prefix.find(",")
+        detected = type_from_mime(prefix[5:comma].split(";", 1)[0]) if comma > 0 else None
+        if detected:
+            return detected, "mime"
+        prefix = prefix[comma + 1:] if comma > 0 else ""
+
+    head = prefix[:_SNIFF_CHARS]
+    if len(head) < _SNIFF_CHARS or not _BASE64_RE.match(head):
+        # Short or not base64 at all: plain text
+        return "text", "text"
+
+    try:
+        decoded = base64.b64decode(head, validate=True)
+    except (binascii.Error, ValueError):
+        return "text", "text"
+
+    detected = type_from_magic(decoded)
+    if detected:
+        return detected, "magic"
+    # Long base64-looking string with an unknown signature (could be an unusual format or a token dump)
+    return None, "ambiguous"
@@ -3,6 +3,7 @@ Unified JSON Storage - Single file with different data classes
 All data stored in one JSON file with organized structure
 Cross-platform file locking (Windows compatible)
 """
+import functools
 import json
 from pathlib import Path
 from datetime import datetime
@@ -12,8 +13,17 @@ import threading
 
 logger = logging.getLogger(__name__)
 
-# Thread-safe file lock using threading.Lock instead of fcntl (cross-platform)
-_file_lock = threading.Lock()
+# Thread-safe file lock using threading.RLock instead of fcntl (cross-platform); reentrant
+# so that writers can hold it across their whole read-modify-write
+_file_lock = threading.RLock()
+
+def _exclusive(method):
+    """Hold the file lock for a whole read-modify-write, so concurrent writers cannot drop each other's records"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with _file_lock:
+            return method(*args, **kwargs)
+    return wrapper
 
 class UnifiedJSONStorage:
     """Single JSON file storage with organized data classes"""
@@ -63,6 +73,7 @@ class UnifiedJSONStorage:
                 logger.error(f"Error writing data file: {e}")
     
     # ========== ANALYSES ==========
+    @_exclusive
     def save_analysis(self, analysis: Dict) -> str:
         """Save analysis result"""
         data = self._read_data()
@@ -84,6 +95,34 @@ class UnifiedJSONStorage:
         logger.info(f"Saved analysis: {analysis_id}")
         return analysis_id
     
+    @_exclusive
+    def save_analyses(self, analyses: List[Dict]) -> List[str]:
+        """Save many analysis results with a single read/write of the data file"""
+        if not analyses:
+            return []
+        data = self._read_data()
+        
+        timestamp = datetime.utcnow().isoformat()
+        base_id = f"analysis_{timestamp.replace(':', '').replace('.', '_')}"
+        
+        # Same timestamp for the whole batch; the position keeps ids unique
+        ids = []
+        for position, analysis in enumerate(analyses):
+            analysis_id = f"{base_id}_{position}"
+            data["analyses"].append({
+                "id": analysis_id,
+                "timestamp": timestamp,
+                **analysis
+            })
+            ids.append(analysis_id)
+        
+        data["statistics"]["total_analyses"] = len(data["analyses"])
+        data["statistics"]["last_updated"] = timestamp
+        
+        self._write_data(data)
+        logger.info(f"Saved {len(ids)} analyses")
+        return ids
+    
     def get_recent_analyses(self, limit: int = 10) -> List[Dict]:
         """Get most recent analyses"""
         data = self._read_data()
@@ -102,7 +141,14 @@ class UnifiedJSONStorage:
                 return analysis
         return None
     
+    def get_analyses_by_ids(self, analysis_ids) -> Dict[str, Dict]:
+        """Get several analyses with a single read (id -> analysis; unknown ids are left out)"""
+        wanted = set(analysis_ids)
+        data = self._read_data()
+        return {a["id"]: a for a in data.get("analyses", []) if a.get("id") in wanted}
+    
     # ========== FEEDBACK ==========
+    @_exclusive
     def save_feedback(self, feedback: Dict) -> str:
         """Save user feedback"""
         data = self._read_data()
@@ -130,6 +176,7 @@ class UnifiedJSONStorage:
         return data.get("feedback", [])
     
     # ========== KNOWN HOAXES ==========
+    @_exclusive
     def add_known_hoax(self, hoax: Dict) -> str:
         """Add a known hoax to the database"""
         data = self._read_data()
@@ -156,6 +203,7 @@ class UnifiedJSONStorage:
         return data.get("known_hoaxes", [])
     
     # ========== USERS (for future use) ==========
+    @_exclusive
     def save_user(self, user: Dict) -> str:
         """Save user data"""
         data = self._read_data()
@@ -0,0 +1,98 @@
+"""
+Streaming - Bounded producer thread feeding concurrent async workers
+Decoders (video keyframes, audio windows) run in a worker thread and hand
+items to the event loop through a small queue, so memory stays flat. When
+the consumer stops early (deadline, client disconnect, cancelled cascade),
+the producer notices within PUT_POLL_SECONDS and closes its decoder instead
+of blocking on a queue nobody drains.
+"""
+import asyncio
+import threading
+from contextlib import closing
+from typing import Awaitable, Callable, Iterator, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# How often a producer blocked on a full queue checks whether the consumer is gone
+PUT_POLL_SECONDS = 0.25
+
+
+async def _offer(queue: asyncio.Queue, item, timeout: float) -> bool:
+    try:
+        await asyncio.wait_for(queue.put(item), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def stream_to_workers(iterate: Callable[[], Iterator[T]], handle: Callable[[T], Awaitable[None]],
+                            concurrency: int):
+    """
+    Run iterate() in a thread and handle each item it yields with `concurrency` workers
+
+    Args:
+        iterate: Blocking generator factory (decoding, CPU-side preparation)
+        handle: Coroutine run on the event loop for each item
+        concurrency: Concurrent handle() calls; the queue holds twice as many items
+
+    Raises:
+        Whatever iterate() raised, once the items yielded before the error are handled
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        """Blocking put (backpressure on decoding); False once the consumer has stopped"""
+        while not stop.is_set():
+            future = asyncio.run_coroutine_threadsafe(_offer(queue, item, PUT_POLL_SECONDS), loop)
+            try:
+                if future.result(timeout=PUT_POLL_SECONDS + 5.0):
+                    return True
+            except Exception:
+                # Event loop gone (shutdown) or the put was cancelled
+                return False
+        return False
+
+    def produce():
+        try:
+            with closing(iterate()) as items:
+                for item in items:
+                    if not put(item):
+                        return
+        finally:
+            put(None)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                # Pass the end-of-stream marker on to the next worker
+                await queue.put(None)
+                return
+            await handle(item)
+
+    producer = loop.run_in_executor(None, produce)
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        # Cancelled or a worker failed: release the producer and its decoder. The
+        # end-of-stream marker may never arrive now, so the other workers are cancelled
+        stop.set()
+        producer.add_done_callback(_discard_result)
+        for task in workers:
+            task.cancel()
+        await asyncio.wait(workers)
+        raise
+    stop.set()
+    await producer
+
+
+def _discard_result(future: asyncio.Future):
+    """Retrieve an abandoned producer's outcome so it is not reported as never retrieved"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.debug(f"Abandoned producer ended with: {future.exception()}")
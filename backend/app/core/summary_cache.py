@@ -0,0 +1,186 @@
+"""
+Semantic Summary Cache - Reuse LLM summaries for near-duplicate claims
+Summaries are keyed by the claim's sentence embedding plus the verdict; a
+lookup hits when a cached claim with the same verdict is within the cosine
+similarity threshold. Entries expire after a TTL and are evicted LRU.
+"""
+import json
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class SemanticSummaryCache:
+    """Embedding-keyed LRU cache of quick-analysis summaries, persisted to disk"""
+
+    def __init__(self, data_dir: str = "data", max_entries: int = 5000, ttl_seconds: float = 86400.0,
+                 threshold: float = 0.95):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+
+        self.vectors_path = self.data_dir / "summary_cache.npy"
+        self.entries_path = self.data_dir / "summary_cache.json"
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+
+        # Row i of vectors (unit-normalized embedding) belongs to entries[i]
+        self.vectors: Optional[np.ndarray] = None
+        self.entries: List[Dict] = []
+
+        self._lock = threading.Lock()
+        self._last_save = time.time()
+        self._dirty = False
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+        self._load()
+
+    def _load(self):
+        """Load persisted entries, dropping expired ones"""
+        if not (self.vectors_path.exists() and self.entries_path.exists()):
+            return
+        try:
+            vectors = np.load(self.vectors_path)
+            with open(self.entries_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            now = time.time()
+            keep = [i for i, e in enumerate(entries) if now - e["created_at"] < self.ttl_seconds]
+            self.vectors = vectors[keep] if keep else None
+            self.entries = [entries[i] for i in keep]
+            logger.info(f"Loaded {len(self.entries)} cached summaries")
+        except Exception as e:
+            logger.error(f"Error loading summary cache: {e}")
+
+    def _save(self):
+        """Persist vectors and entries (caller holds the lock)"""
+        try:
+            with open(self.vectors_path, 'wb') as f:
+                np.save(f, self.vectors if self.vectors is not None else np.zeros((0, 0), dtype=np.float32))
+            with open(self.entries_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            self._dirty = False
+            self._last_save = time.time()
+        except Exception as e:
+            logger.error(f"Error saving summary cache: {e}")
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _remove(self, rows: List[int]):
+        """Drop rows from both vectors and entries (caller holds the lock)"""
+        drop = set(rows)
+        keep = [i for i in range(len(self.entries)) if i not in drop]
+        self.entries = [self.entries[i] for i in keep]
+        self.vectors = self.vectors[keep] if keep else None
+        self._dirty = True
+
+    def lookup(self, embedding: np.ndarray, verdict: str) -> Optional[Dict]:
+        """
+        Find a cached summary for a near-duplicate claim with the same verdict
+
+        Returns:
+            {"summary": ..., "similarity": ..., "text": ...} or None
+        """
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            if self.vectors is None:
+                self._stats["misses"] += 1
+                return None
+
+            similarities = self.vectors @ query
+            order = np.argsort(similarities)[::-1]
+            expired = []
+            hit = None
+            for row in order.tolist():
+                if similarities[row] < self.threshold:
+                    break
+                entry = self.entries[row]
+                if now - entry["created_at"] >= self.ttl_seconds:
+                    expired.append(row)
+                    continue
+                if entry["verdict"] == verdict:
+                    entry["last_used"] = now
+                    hit = {"summary": entry["summary"], "similarity": float(similarities[row]), "text": entry["text"]}
+                    break
+
+            if expired:
+                self._stats["expired"] += len(expired)
+                self._remove(expired)
+            self._stats["hits" if hit else "misses"] += 1
+            return hit
+
+    def put(self, embedding: np.ndarray, text: str, verdict: str, summary: Dict):
+        """Cache a freshly generated summary"""
+        vector = self._normalize(embedding)[None, :]
+        now = time.time()
+        with self._lock:
+            self.entries.append({
+                "text": text[:200],
+                "verdict": verdict,
+                "summary": summary,
+                "created_at": now,
+                "last_used": now
+            })
+            self.vectors = vector if self.vectors is None else np.vstack([self.vectors, vector])
+
+            if len(self.entries) > self.max_entries:
+                # Expired entries go first, then the least recently used
+                expired = [i for i, e in enumerate(self.entries) if now - e["created_at"] >= self.ttl_seconds]
+                overflow = len(self.entries) - len(expired) - self.max_entries
+                if overflow > 0:
+                    live = sorted(
+                        (i for i, e in enumerate(self.entries) if now - e["created_at"] < self.ttl_seconds),
+                        key=lambda i: self.entries[i]["last_used"]
+                    )
+                    self._stats["evictions"] += overflow
+                    expired.extend(live[:overflow])
+                self._remove(expired)
+
+            self._dirty = True
+            if now - self._last_save >= settings.SUMMARY_CACHE_SAVE_INTERVAL_SECONDS:
+                self._save()
+
+    def flush(self):
+        """Persist pending changes"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def get_stats(self) -> Dict:
+        """Hit-rate and size statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self.entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+# Global instance
+_summary_cache = None
+
+def get_summary_cache():
+    """Get or create global semantic summary cache instance"""
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = SemanticSummaryCache(
+            max_entries=settings.SUMMARY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SUMMARY_CACHE_TTL_SECONDS,
+            threshold=settings.SUMMARY_CACHE_SIMILARITY
+        )
+    return _summary_cache
+
+def flush_summary_cache():
+    """Persist the cache if it has been created (called at shutdown)"""
+    if _summary_cache is not None:
+        _summary_cache.flush()
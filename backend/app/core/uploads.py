@@ -0,0 +1,281 @@
+"""
+Upload Handling - Streaming uploads spooled to temp files
+Replaces base64-in-JSON for binary content; downstream stages receive a
+memoryview or file path instead of re-decoding base64 strings
+"""
+import base64
+import io
+import mmap
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional, Union
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_SCHEME = "upload://"
+
+# Anything agents/tools may receive as "content"
+ContentLike = Union[str, bytes, bytearray, memoryview]
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the size limit for its content type"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"Upload exceeds limit of {limit} bytes")
+
+
+def max_upload_bytes(content_type: str) -> int:
+    """Size limit for a given content type"""
+    limits = {
+        "text": settings.UPLOAD_MAX_BYTES_TEXT,
+        "image": settings.UPLOAD_MAX_BYTES_IMAGE,
+        "audio": settings.UPLOAD_MAX_BYTES_AUDIO,
+        "video": settings.UPLOAD_MAX_BYTES_VIDEO
+    }
+    return limits.get(content_type, settings.UPLOAD_MAX_BYTES_IMAGE)
+
+
+def limit_receive(receive, limit: int):
+    """
+    Wrap an ASGI receive callable so the request body cannot exceed limit bytes
+
+    For parsers that read the whole body themselves (multipart forms), whether
+    or not the client declared a Content-Length.
+
+    Raises:
+        UploadTooLarge: From the wrapped receive, as soon as the limit is crossed
+    """
+    received = 0
+
+    async def limited():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise UploadTooLarge(limit)
+        return message
+
+    return limited
+
+
+class StoredUpload:
+    """A spooled upload: kept in memory while small, rolled to a temp file when large"""
+
+    def __init__(self, file, size: int, content_type: str, mime_type: Optional[str] = None, filename: Optional[str] = None):
+        self.file = file
+        self.size = size
+        self.content_type = content_type
+        self.mime_type = mime_type
+        self.filename = filename
+        self.created_at = time.time()
+        self._mmap = None
+        self._path = None
+
+    def buffer(self) -> memoryview:
+        """Zero-copy view of the upload contents"""
+        inner = getattr(self.file, "_file", self.file)
+        if hasattr(inner, "getbuffer"):
+            # Still in memory (BytesIO)
+            return inner.getbuffer()
+        if self.size == 0:
+            return memoryview(b"")
+        if self._mmap is None:
+            self.file.flush()
+            self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)
+
+    def path(self) -> str:
+        """Filesystem path of the contents (for decoders such as OpenCV that need one)"""
+        if self._path is None:
+            fd, self._path = tempfile.mkstemp(prefix="truthscan_", dir=settings.UPLOAD_TEMP_DIR)
+            with os.fdopen(fd, "wb") as f:
+                self.file.seek(0)
+                while True:
+                    chunk = self.file.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        return self._path
+
+    def text(self) -> str:
+        """Decode the upload as UTF-8 text"""
+        return bytes(self.buffer()).decode("utf-8", errors="replace")
+
+    def close(self):
+        """Release memory maps, temp files and the spool"""
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A memoryview is still alive (a consumer kept a slice); the map is freed with it
+                logger.warning(f"Upload {self.filename or ''} still has live buffer views; mmap not closed")
+            self._mmap = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+            self._path = None
+        try:
+            self.file.close()
+        except Exception:
+            pass
+
+
+async def spool_stream(chunks: AsyncIterator[bytes], content_type: str, mime_type: Optional[str] = None,
+                       filename: Optional[str] = None) -> StoredUpload:
+    """
+    Stream chunks into a spooled temp file, enforcing the size limit as bytes arrive
+
+    Raises:
+        UploadTooLarge: As soon as the limit is crossed (the rest is never read)
+    """
+    limit = max_upload_bytes(content_type)
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_BYTES, dir=settings.UPLOAD_TEMP_DIR)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > limit:
+                raise UploadTooLarge(limit)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return StoredUpload(spool, size, content_type, mime_type, filename)
+
+
+class UploadRegistry:
+    """Short-lived registry so agents can pass 'upload://<id>' references instead of payloads"""
+
+    def __init__(self, ttl_seconds: float = 600.0):
+        self.ttl_seconds = ttl_seconds
+        self._uploads: Dict[str, StoredUpload] = {}
+        self._lock = threading.Lock()
+
+    def register(self, upload: StoredUpload) -> str:
+        """Register an upload and return its reference string"""
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._purge_expired()
+            self._uploads[upload_id] = upload
+        return f"{UPLOAD_SCHEME}{upload_id}"
+
+    def register_bytes(self, data: Union[bytes, memoryview], content_type: str, mime_type: Optional[str] = None) -> str:
+        """Register in-memory content (e.g. decoded base64) and return its reference"""
+        return self.register(StoredUpload(io.BytesIO(data), len(data), content_type, mime_type))
+
+    def resolve(self, reference: str) -> Optional[StoredUpload]:
+        """Look up an upload by reference (or bare id)"""
+        upload_id = reference.strip()
+        if upload_id.startswith(UPLOAD_SCHEME):
+            upload_id = upload_id[len(UPLOAD_SCHEME):]
+        with self._lock:
+            return self._uploads.get(upload_id)
+
+    def release(self, reference: str):
+        """Drop an upload and free its resources"""
+        upload_id = reference[len(UPLOAD_SCHEME):] if reference.startswith(UPLOAD_SCHEME) else reference
+        with self._lock:
+            upload = self._uploads.pop(upload_id, None)
+        if upload is not None:
+            upload.close()
+
+    def _purge_expired(self):
+        """Close uploads whose request never released them (caller holds the lock)"""
+        now = time.time()
+        expired = [k for k, u in self._uploads.items() if now - u.created_at > self.ttl_seconds]
+        for upload_id in expired:
+            self._uploads.pop(upload_id).close()
+
+    def __len__(self):
+        return len(self._uploads)
+
+
+def strip_data_url(data: str) -> str:
+    """Remove a 'data:<mime>;base64,' header if present"""
+    if "," in data:
+        return data.split(",", 1)[1]
+    return data
+
+
+def content_bytes(data: ContentLike) -> Union[bytes, memoryview]:
+    """
+    Resolve any supported content form to raw bytes
+
+    Accepts data URLs / raw base64 strings, 'upload://' references or bytes-like objects.
+    Uploads are returned as a memoryview without copying.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    data = data.strip()
+    if data.startswith(UPLOAD_SCHEME):
+        upload = get_upload_registry().resolve(data)
+        if upload is None:
+            raise ValueError(f"Unknown or expired upload reference: {data[:64]}")
+        return upload.buffer()
+    return base64.b64decode(strip_data_url(data))
+
+
+def content_base64(data: ContentLike) -> str:
+    """Resolve content to a bare base64 string (for JSON model payloads)"""
+    if isinstance(data, str) and not data.strip().startswith(UPLOAD_SCHEME):
+        return strip_data_url(data)
+    return base64.b64encode(content_bytes(data)).decode("ascii")
+
+
+@contextmanager
+def content_file(data: ContentLike) -> Iterator[str]:
+    """Yield a filesystem path holding the content; temp files are removed afterwards"""
+    if isinstance(data, str) and data.strip().startswith(UPLOAD_SCHEME):
+        upload = get_upload_registry().resolve(data)
+        if upload is None:
+            raise ValueError(f"Unknown or expired upload reference: {data[:64]}")
+        # The upload owns its temp file and removes it when released
+        yield upload.path()
+        return
+
+    fd, path = tempfile.mkstemp(prefix="truthscan_", dir=settings.UPLOAD_TEMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content_bytes(data))
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def data_mime_type(data: ContentLike) -> Optional[str]:
+    """MIME type from a data URL header or registered upload, if known"""
+    if isinstance(data, str):
+        data = data.strip()
+        if data.startswith(UPLOAD_SCHEME):
+            upload = get_upload_registry().resolve(data)
+            return upload.mime_type if upload else None
+        if data.startswith("data:") and ";" in data:
+            return data[5:data.index(";")]
+    return None
+
+
+# Global instance
+_upload_registry = None
+
+def get_upload_registry():
+    """Get or create global upload registry instance"""
+    global _upload_registry
+    if _upload_registry is None:
+        _upload_registry = UploadRegistry(ttl_seconds=settings.UPLOAD_REFERENCE_TTL_SECONDS)
+    return _upload_registry
@@ -0,0 +1,72 @@
+"""
+Verdict Cache - End-to-end result cache for quick analysis
+Keyed by a digest of the normalized content (canonical text, or the decoded
+image bytes) plus a version covering everything the verdict depends on: the
+embedding model, the size of the hoax index, the known-hash store and the
+LLM. Growing the index or swapping a model changes the version, so stale
+verdicts are never served; old entries simply age out with the TTL.
+"""
+import hashlib
+from typing import Dict, Optional
+import logging
+
+from app.core.cache import TieredCache
+from app.core.config import settings
+from app.core.embeddings import EmbeddingsManager, get_embeddings_manager
+from app.core.forensics import get_forensics
+from app.core.uploads import ContentLike, content_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class VerdictCache:
+    """Content digest -> (stored analysis id, quick-analysis result)"""
+
+    def __init__(self):
+        self.cache = TieredCache(
+            settings.VERDICT_CACHE_DIR or None,
+            memory_entries=settings.VERDICT_CACHE_MEMORY_ENTRIES,
+            disk_entries=settings.VERDICT_CACHE_DISK_ENTRIES,
+            ttl_seconds=settings.VERDICT_CACHE_TTL_SECONDS
+        )
+
+    @staticmethod
+    def digest(content: ContentLike, content_type: str) -> str:
+        """SHA-256 of the canonical form: normalized text, or the raw image bytes (not their base64)"""
+        if content_type == "text":
+            return hashlib.sha256(EmbeddingsManager.normalize_text(str(content)).encode("utf-8")).hexdigest()
+        return hashlib.sha256(content_bytes(content)).hexdigest()
+
+    @staticmethod
+    def version(content_type: str) -> str:
+        """Generation of the models and indexes a verdict for this content type depends on"""
+        if content_type == "text":
+            embeddings = get_embeddings_manager()
+            return f"{settings.VERDICT_CACHE_VERSION}:{embeddings.model_name}:{len(embeddings.metadata)}:{settings.LLM_MODEL}"
+        return f"{settings.VERDICT_CACHE_VERSION}:{len(get_forensics().known_hashes)}:{settings.FORENSICS_WORKING_SIZE}"
+
+    def key(self, content: ContentLike, content_type: str) -> str:
+        """Cache key for a piece of content (hashes the full payload: call off the event loop for media)"""
+        scope = f"{content_type}:{self.version(content_type)}:{self.digest(content, content_type)}"
+        return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """{"analysis_id", "result"} or None"""
+        return self.cache.get(key)
+
+    def put(self, key: str, analysis_id: str, result: Dict):
+        self.cache.set(key, {"analysis_id": analysis_id, "result": result})
+
+    def get_stats(self) -> Dict:
+        return self.cache.get_stats()
+
+
+# Global instance
+_verdict_cache = None
+
+def get_verdict_cache():
+    """Get or create global verdict cache instance"""
+    global _verdict_cache
+    if _verdict_cache is None:
+        _verdict_cache = VerdictCache()
+    return _verdict_cache
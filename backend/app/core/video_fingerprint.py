@@ -0,0 +1,280 @@
+"""
+Video Fingerprinting - Temporal perceptual-hash index for re-upload detection
+Each video is a sequence of 64-bit DCT hashes of frames sampled at a fixed rate.
+Lookup tolerates trimming and re-encoding: banded hash matching finds candidate
+frames, then votes on a consistent time offset per indexed video. Entries carry a
+"verified" flag: only verified verdicts may stand in for a fresh analysis.
+"""
+import cv2
+import numpy as np
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from app.core.config import settings
+from app.core.keyframes import iter_keyframes
+
+logger = logging.getLogger(__name__)
+
+BANDS = 4                 # 64-bit hash split into 4 x 16-bit bands for candidate lookup
+MAX_BUCKET = 2000         # Ignore band values shared by more frames than this (black frames etc.)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def frame_hash(frame: np.ndarray) -> Optional[int]:
+    """64-bit perceptual (DCT) hash of a BGR frame, or None for featureless frames"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    if small.std() < 4.0:
+        return None
+    low = cv2.dct(small)[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def compute_fingerprint(path: str) -> np.ndarray:
+    """Hash sequence of frames sampled at VIDEO_FINGERPRINT_FPS (featureless frames skipped)"""
+    hashes = []
+    for keyframe in iter_keyframes(path, mode="fixed", sample_fps=settings.VIDEO_FINGERPRINT_FPS,
+                                   max_frames=settings.VIDEO_FINGERPRINT_MAX_FRAMES):
+        value = frame_hash(keyframe.frame)
+        if value is not None:
+            hashes.append(value)
+    return np.array(hashes, dtype=np.uint64)
+
+
+def _hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Element-wise Hamming distance between two uint64 arrays"""
+    return _POPCOUNT[(a ^ b).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class VideoFingerprintIndex:
+    """Compact on-disk index of video fingerprints (16 bytes per sampled frame)"""
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+
+        # Arrays and metadata share one file so a crash can never leave them out of step
+        self.index_path = self.data_dir / "video_fingerprints.npz"
+        self.legacy_metadata_path = self.data_dir / "video_fingerprints.json"
+
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.video_ids = np.zeros(0, dtype=np.uint32)
+        self.positions = np.zeros(0, dtype=np.uint32)
+        self.videos: List[Dict] = []
+        self.verified = 0  # Entries that may stand in for a fresh analysis
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._bands = []
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        self._load_index()
+
+    def _load_index(self):
+        """Load the index from disk if present"""
+        if not self.index_path.exists():
+            return
+        try:
+            arrays = np.load(self.index_path)
+            if "videos" in arrays.files:
+                videos = json.loads(str(arrays["videos"]))
+            else:
+                # Written before metadata moved into the npz
+                with open(self.legacy_metadata_path, 'r', encoding='utf-8') as f:
+                    videos = json.load(f)
+            # Frames of videos whose metadata never reached disk are dropped
+            keep = arrays["video_ids"] < len(videos)
+            self.hashes = arrays["hashes"][keep]
+            self.video_ids = arrays["video_ids"][keep]
+            self.positions = arrays["positions"][keep]
+            self.videos = videos
+            self.verified = sum(1 for video in videos if video.get("verified"))
+            self._build_bands()
+            logger.info(f"Loaded {len(self.videos)} video fingerprints ({len(self.hashes)} frames)")
+        except Exception as e:
+            logger.error(f"Error loading video fingerprint index: {e}")
+
+    def _save_index(self):
+        """Persist arrays and metadata in one atomically replaced file"""
+        with self._lock:
+            hashes, video_ids, positions = self.hashes, self.video_ids, self.positions
+            videos = list(self.videos)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        with self._save_lock:
+            tmp = self.index_path.with_suffix(".tmp")
+            try:
+                with open(tmp, 'wb') as f:
+                    np.savez(f, hashes=hashes, video_ids=video_ids, positions=positions,
+                             videos=np.array(json.dumps(videos)))
+                os.replace(tmp, self.index_path)
+            except Exception as e:
+                logger.error(f"Error saving video fingerprint index: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def flush(self):
+        """Write pending additions to disk (called on shutdown)"""
+        if self._dirty:
+            self._save_index()
+
+    def _build_bands(self):
+        """Sorted per-band views of the hashes; lookups are binary searches"""
+        bands = []
+        for b in range(BANDS):
+            values = ((self.hashes >> np.uint64(16 * b)) & np.uint64(0xFFFF)).astype(np.uint16)
+            order = np.argsort(values, kind="stable")
+            bands.append((values[order], order))
+        self._bands = bands
+
+    def _merged_bands(self, fingerprint: np.ndarray, first: int) -> List:
+        """Band views with the new frames merged in (linear inserts, no re-sort of the index)"""
+        bands = []
+        for b, (sorted_values, order) in enumerate(self._bands):
+            values = ((fingerprint >> np.uint64(16 * b)) & np.uint64(0xFFFF)).astype(np.uint16)
+            new_order = np.argsort(values, kind="stable")
+            values = values[new_order]
+            at = np.searchsorted(sorted_values, values, side="right")
+            bands.append((np.insert(sorted_values, at, values),
+                          np.insert(order, at, (new_order + first).astype(order.dtype))))
+        return bands
+
+    def add(self, fingerprint: np.ndarray, metadata: Dict, verified: bool = False) -> int:
+        """
+        Add a fingerprinted video with its metadata (verdict, score, source...)
+
+        Blocking (array merges, periodic persistence): call from a worker thread.
+
+        Args:
+            verified: True only for confirmed verdicts; unverified entries are
+                reported as previous analyses but never replace a fresh one
+        """
+        if fingerprint.size == 0:
+            raise ValueError("Empty fingerprint")
+        fingerprint = fingerprint.astype(np.uint64)
+        with self._lock:
+            video_id = len(self.videos)
+            first = int(self.hashes.size)
+            bands = self._merged_bands(fingerprint, first) if self._bands else None
+            self.hashes = np.concatenate([self.hashes, fingerprint])
+            self.video_ids = np.concatenate([self.video_ids, np.full(fingerprint.size, video_id, dtype=np.uint32)])
+            self.positions = np.concatenate([self.positions, np.arange(fingerprint.size, dtype=np.uint32)])
+            self.videos = self.videos + [{
+                "id": video_id,
+                "frames": int(fingerprint.size),
+                "added_at": time.time(),
+                **metadata,
+                "verified": verified
+            }]
+            if bands is None:
+                self._build_bands()
+            else:
+                self._bands = bands
+            self.verified += int(verified)
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= settings.FINGERPRINT_SAVE_INTERVAL_SECONDS
+        if due:
+            self._save_index()
+        logger.info(f"Indexed video fingerprint {video_id} ({fingerprint.size} frames)")
+        return video_id
+
+    def lookup(self, fingerprint: np.ndarray) -> Optional[Dict]:
+        """
+        Find an indexed video that this fingerprint is a (possibly trimmed or
+        re-encoded) copy of, or that is a trimmed copy of it
+
+        Returns:
+            Video metadata (including "verified") plus match statistics, or None
+        """
+        n = int(fingerprint.size)
+        with self._lock:
+            bands, hashes = self._bands, self.hashes
+            video_ids, positions, videos = self.video_ids, self.positions, self.videos
+        if n == 0 or hashes.size == 0:
+            return None
+
+        # Candidate (query frame, indexed frame) pairs sharing at least one 16-bit band
+        query_idx, index_idx = [], []
+        for b, (sorted_values, order) in enumerate(bands):
+            q_band = ((fingerprint >> np.uint64(16 * b)) & np.uint64(0xFFFF)).astype(np.uint16)
+            lo = np.searchsorted(sorted_values, q_band, side="left")
+            hi = np.searchsorted(sorted_values, q_band, side="right")
+            counts = hi - lo
+            counts[counts > MAX_BUCKET] = 0
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Expand the [lo, hi) ranges without a Python loop
+            starts = np.repeat(lo, counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            query_idx.append(np.repeat(np.arange(n), counts))
+            index_idx.append(order[starts + offsets])
+
+        if not query_idx:
+            return None
+        pairs = np.unique(np.stack([np.concatenate(query_idx), np.concatenate(index_idx)], axis=1), axis=0)
+
+        # Verify full-hash distance
+        close = _hamming(fingerprint[pairs[:, 0]], hashes[pairs[:, 1]]) <= settings.VIDEO_FINGERPRINT_MAX_HAMMING
+        pairs = pairs[close]
+        if len(pairs) == 0:
+            return None
+
+        # Vote for (video, time offset); each query frame votes at most once per alignment
+        vids = video_ids[pairs[:, 1]].astype(np.int64)
+        deltas = positions[pairs[:, 1]].astype(np.int64) - pairs[:, 0]
+        votes = np.unique(np.stack([vids, deltas, pairs[:, 0]], axis=1), axis=0)
+        keys, counts = np.unique(votes[:, :2], axis=0, return_counts=True)
+
+        # Sampling phase differs between copies, so alignments one frame apart are pooled;
+        # distinct query frames are counted for the strongest few alignments only
+        best_keys = keys[np.argsort(counts)[::-1][:5]]
+        vid, delta, matched = 0, 0, 0
+        for candidate_vid, candidate_delta in best_keys.tolist():
+            near = (votes[:, 0] == candidate_vid) & (np.abs(votes[:, 1] - candidate_delta) <= 1)
+            distinct = int(np.unique(votes[near, 2]).size)
+            if distinct > matched:
+                vid, delta, matched = candidate_vid, candidate_delta, distinct
+
+        video = videos[vid]
+        coverage = min(matched / min(n, video["frames"]), 1.0)
+        if matched < settings.VIDEO_FINGERPRINT_MIN_MATCHES or coverage < settings.VIDEO_FINGERPRINT_MIN_COVERAGE:
+            return None
+
+        return {
+            **video,
+            "matched_frames": int(matched),
+            "coverage": round(coverage, 3),
+            "offset_seconds": round(delta / settings.VIDEO_FINGERPRINT_FPS, 2)
+        }
+
+    def get_stats(self) -> Dict:
+        """Get statistics about the index"""
+        return {
+            "videos": len(self.videos),
+            "verified_videos": self.verified,
+            "frames": int(self.hashes.size),
+            "index_bytes": int(self.hashes.nbytes + self.video_ids.nbytes + self.positions.nbytes)
+        }
+
+# Global instance
+_video_fingerprint_index = None
+
+def get_video_fingerprint_index():
+    """Get or create global video fingerprint index instance"""
+    global _video_fingerprint_index
+    if _video_fingerprint_index is None:
+        _video_fingerprint_index = VideoFingerprintIndex()
+    return _video_fingerprint_index
+
+def flush_video_fingerprints():
+    """Persist pending fingerprint additions, if the index was used"""
+    if _video_fingerprint_index is not None:
+        _video_fingerprint_index.flush()
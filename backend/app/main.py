@@ -1,13 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.admission import AdmissionMiddleware
 from app.core.config import settings
-from app.api.endpoints import router as api_router
+from app.core.huggingface import hf_client
+from app.core.summary_cache import flush_summary_cache
+from app.core.forensics import close_forensics
+from app.core.video_fingerprint import flush_video_fingerprints
+from app.core.audio_fingerprint import flush_audio_fingerprints
+from app.core.known_media import load_known_media
+from app.core.jobs import start_job_workers, stop_job_workers
+from app.core.feedback_learning import start_feedback_learning, stop_feedback_learning
+from app.agents.registry import warm_up
+from app.api.endpoints import router as api_router, run_analysis_job
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared connection pools live for the lifetime of the app
+    await hf_client.start()
+    if settings.AGENT_WARMUP:
+        # Build LLM clients and agent graphs once, before the first request
+        await asyncio.to_thread(warm_up, ["text", "image", "audio", "video"])
+    # Confirmed clips from the manifest become verified fingerprint entries (new files only)
+    await asyncio.to_thread(load_known_media)
+    if settings.JOBS_ENABLED:
+        # Also re-queues jobs interrupted by the previous shutdown
+        await start_job_workers(run_analysis_job)
+    if settings.FEEDBACK_LEARNING_ENABLED:
+        # Folds agreeing user feedback into the hoax index while serving
+        start_feedback_learning()
+    yield
+    await stop_feedback_learning()
+    await stop_job_workers()
+    await hf_client.close()
+    flush_summary_cache()
+    flush_video_fingerprints()
+    flush_audio_fingerprints()
+    close_forensics()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
+# Concurrency limits per API route (added first so CORS headers still reach rejected requests)
+app.add_middleware(AdmissionMiddleware, prefix=settings.API_V1_STR)
+
 # Set all CORS enabled origins
 app.add_middleware(
     CORSMiddleware,
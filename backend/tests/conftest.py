@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# Run from backend/ without installing the app; the HF client refuses to start without a token
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("HUGGINGFACE_API_TOKEN", "test-token")
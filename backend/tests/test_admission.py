@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.admission import (
+    ARRIVED_AT, AdmissionLimiter, AdmissionMiddleware, AdmissionRejected, remain_seconds
+)
+from app.core.config import settings
+
+
+def test_free_slots_admit_immediately():
+    async def run():
+        limiter = AdmissionLimiter("t", limit=2, max_queue=0)
+        await limiter.acquire(1.0)
+        await limiter.acquire(1.0)
+        return limiter.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 2 and stats["admitted"] == 2
+
+
+def test_full_queue_is_rejected_with_429():
+    async def run():
+        limiter = AdmissionLimiter("t", limit=1, max_queue=0)
+        await limiter.acquire(1.0)
+        await limiter.acquire(1.0)
+
+    with pytest.raises(AdmissionRejected) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 429
+    assert "Retry-After" in error.value.headers
+
+
+def test_release_hands_the_slot_to_the_next_waiter():
+    async def run():
+        limiter = AdmissionLimiter("t", limit=1, max_queue=1)
+        await limiter.acquire(1.0)
+        waiter = asyncio.ensure_future(limiter.acquire(1.0))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        limiter.release(0.01)
+        await waiter
+        return limiter.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 1 and stats["waiting"] == 0
+
+
+def test_wait_beyond_the_deadline_is_rejected_with_503():
+    async def run():
+        limiter = AdmissionLimiter("t", limit=1, max_queue=1)
+        await limiter.acquire(1.0)
+        await limiter.acquire(0.05)
+
+    with pytest.raises(AdmissionRejected) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 503
+
+
+def test_remaining_budget_counts_from_arrival():
+    scope = {ARRIVED_AT: time.monotonic() - 1.5}
+    assert remain_seconds(scope, 4.0) == pytest.approx(2.5, abs=0.05)
+    assert remain_seconds(scope, 1.0) == 0.0
+    assert remain_seconds({}, 4.0) == 4.0
+
+
+def test_route_queue_time_is_taken_out_of_the_request_budget(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMISSION_ROUTE_LIMITS", {"/slow": 1})
+    budgets = []
+
+    async def app(scope, receive, send):
+        budgets.append(remain_seconds(scope, 2.0))
+        await asyncio.sleep(0.3)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = AdmissionMiddleware(app)
+
+    async def request():
+        scope = {"type": "http", "method": "POST", "path": "/slow", "headers": []}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        await middleware(scope, receive, send)
+
+    async def run():
+        await asyncio.gather(request(), request())
+
+    asyncio.run(run())
+    assert budgets[0] == pytest.approx(2.0, abs=0.05)
+    # The second request spent ~0.3s waiting for the route slot
+    assert budgets[1] == pytest.approx(1.7, abs=0.1)
+
+
+def test_route_deadline_honours_a_deadline_query_parameter():
+    from app.core.admission import route_deadline
+
+    assert route_deadline("/quick-analyze/upload", b"content_type=image&deadline_ms=1500") == 1.5
+    assert route_deadline("/quick-analyze/upload", b"deadline_ms=abc") == settings.QUICK_DEADLINE_SECONDS
+    assert route_deadline("/analyze", b"deadline_ms=1500") == settings.ADMISSION_DEEP_DEADLINE_SECONDS
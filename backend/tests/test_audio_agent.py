@@ -0,0 +1,50 @@
+import asyncio
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("cv2")
+
+from app.agents import audio_agent
+from app.core.audio_fingerprint import AudioFingerprintIndex
+
+
+def _fingerprint(seed: int):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 2 ** 24, 3000, dtype=np.uint32), np.sort(rng.integers(0, 5000, 3000)).astype(np.uint32)
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    index = AudioFingerprintIndex(str(tmp_path))
+    scored = []
+
+    @contextmanager
+    def content_file(data):
+        yield data
+
+    async def score_audio_windows(data):
+        scored.append(data)
+        return {"fake_probability": 0.2, "windows_scored": 3, "speech_seconds": 9.0}
+
+    monkeypatch.setattr(audio_agent, "get_audio_fingerprint_index", lambda: index)
+    monkeypatch.setattr(audio_agent, "content_file", content_file)
+    monkeypatch.setattr(audio_agent, "compute_fingerprint", lambda path, mime: _fingerprint(int(path[-1])))
+    monkeypatch.setattr(audio_agent, "score_audio_windows", score_audio_windows)
+    return index, scored
+
+
+def test_verified_clips_resolve_without_scoring(agent):
+    index, scored = agent
+    index.add(_fingerprint(1), {"fake_probability": 1.0, "verdict": "FAKE"}, verified=True)
+    assert asyncio.run(audio_agent.detect_deepfake_audio("upload://clip-1")) == "Fake|1.00"
+    assert scored == []
+
+
+def test_unverified_clips_are_scored_and_indexed(agent):
+    index, scored = agent
+    assert asyncio.run(audio_agent.detect_deepfake_audio("upload://clip-2")) == "Real|0.80"
+    assert scored == ["upload://clip-2"]
+    assert index.get_stats()["clips"] == 1 and index.verified == 0
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from app.core.audio_fingerprint import AudioFingerprintIndex, HOP, compute_fingerprint
+from app.core.audio_stream import encode_wav
+from app.core.config import settings
+
+
+def _audio_fingerprint(seed: int, landmarks: int = 3000):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 2 ** 24, landmarks, dtype=np.uint32), np.sort(rng.integers(0, 5000, landmarks)).astype(np.uint32)
+
+
+def test_audio_lookup_aligns_a_trimmed_copy(tmp_path):
+    index = AudioFingerprintIndex(str(tmp_path))
+    index.add(_audio_fingerprint(1), {"verdict": "FAKE"})
+    clip_id = index.add(_audio_fingerprint(2), {"verdict": "REAL"})
+
+    hashes, times = _audio_fingerprint(2)
+    keep = times >= 1000
+    match = index.lookup((hashes[keep], times[keep] - 1000))
+    assert match["id"] == clip_id and match["verified"] is False
+    assert match["offset_seconds"] == round(1000 * HOP / settings.AUDIO_FINGERPRINT_RATE, 2)
+    assert index.lookup(_audio_fingerprint(3)) is None
+
+
+def test_audio_fingerprint_matches_the_decoded_clip(tmp_path):
+    rate = settings.AUDIO_FINGERPRINT_RATE
+    rng = np.random.default_rng(0)
+    # Random tone bursts give distinct spectral peaks
+    samples = np.concatenate([
+        0.5 * np.sin(2 * np.pi * rng.uniform(200, 3500) * np.arange(rate // 5) / rate)
+        for _ in range(100)
+    ]).astype(np.float32)
+    full, trimmed = tmp_path / "full.wav", tmp_path / "trimmed.wav"
+    full.write_bytes(encode_wav(samples, rate))
+    trimmed.write_bytes(encode_wav(samples[rate * 5:], rate))
+
+    index = AudioFingerprintIndex(str(tmp_path))
+    clip_id = index.add(compute_fingerprint(str(full), "audio/wav"), {"verdict": "FAKE"}, verified=True)
+    match = index.lookup(compute_fingerprint(str(trimmed), "audio/wav"))
+    assert match is not None and match["id"] == clip_id
+    assert match["offset_seconds"] == pytest.approx(5.0, abs=0.1)
+
+
+def test_known_clips_are_seeded_verified(tmp_path, monkeypatch):
+    import json
+
+    from app.core import audio_fingerprint, known_media
+
+    rate = settings.AUDIO_FINGERPRINT_RATE
+    rng = np.random.default_rng(1)
+    samples = np.concatenate([
+        0.5 * np.sin(2 * np.pi * rng.uniform(200, 3500) * np.arange(rate // 5) / rate)
+        for _ in range(50)
+    ]).astype(np.float32)
+    (tmp_path / "cloned.wav").write_bytes(encode_wav(samples, rate))
+    (tmp_path / "known_media.json").write_text(json.dumps([
+        {"path": "cloned.wav", "type": "audio", "verdict": "FAKE"}
+    ]))
+    index = AudioFingerprintIndex(str(tmp_path / "index"))
+    monkeypatch.setattr(audio_fingerprint, "_audio_fingerprint_index", index)
+
+    assert known_media.load_known_media(str(tmp_path / "known_media.json"))["added"] == 1
+    assert known_media.load_known_media(str(tmp_path / "known_media.json"))["skipped"] == 1
+    match = index.lookup(compute_fingerprint(str(tmp_path / "cloned.wav"), "audio/wav"))
+    assert index.verified == 1 and match["verified"] and match["fake_probability"] == 1.0
@@ -0,0 +1,28 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app.core.audio_stream import AudioFormatError, encode_wav, iter_audio_blocks
+
+
+def _float_wav(samples: np.ndarray, rate: int) -> bytes:
+    """IEEE-float WAV (format tag 3), which the wave module cannot read"""
+    data = samples.astype("<f4").tobytes()
+    fmt = struct.pack("<HHIIHH", 3, 1, rate, rate * 4, 4, 32)
+    return (b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(data)) + b"WAVE"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data)
+
+
+def test_pcm_wav_is_decoded_and_resampled(tmp_path):
+    path = tmp_path / "clip.wav"
+    path.write_bytes(encode_wav(np.zeros(16000, dtype=np.float32), 16000))
+    blocks = list(iter_audio_blocks(str(path), "audio/wav", rate=8000))
+    assert sum(block.size for block in blocks) == 8000
+
+
+def test_non_pcm_wav_is_a_format_error(tmp_path):
+    path = tmp_path / "float.wav"
+    path.write_bytes(_float_wav(np.zeros(1600, dtype=np.float32), 16000))
+    with pytest.raises(AudioFormatError):
+        list(iter_audio_blocks(str(path), "audio/wav"))
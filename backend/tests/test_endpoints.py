@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("faiss")
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.endpoints import _receive_upload
+
+
+def _multipart_request(body: bytes, boundary: str = "xyz") -> Request:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/analyze/upload",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode()),
+                    (b"content-length", str(len(body)).encode())],
+        "query_string": b"",
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+def test_upload_without_a_file_field_is_a_client_error():
+    body = b"--xyz\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n--xyz--\r\n"
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_receive_upload(_multipart_request(body), None))
+    assert error.value.status_code == 400
+
+
+def test_multimodal_branch_runs_the_classifier_once(monkeypatch):
+    from app.agents import deep_cascade
+    from app.api import endpoints
+
+    calls = []
+
+    async def classifier(content):
+        calls.append(content)
+        await asyncio.sleep(0.01)
+        return "Fake|0.97"
+
+    monkeypatch.setitem(deep_cascade.CLASSIFIER_TOOLS, "audio", classifier)
+    assert endpoints.CLASSIFIER_TOOLS is deep_cascade.CLASSIFIER_TOOLS
+    branch = asyncio.run(endpoints._run_multimodal_branch("upload://clip", "audio"))
+    assert calls == ["upload://clip"]
+    assert branch["signal"]["fake_probability"] == 0.97
+    assert "cascade: classifier" in branch["agent_used"]
+
+
+def test_quick_analysis_gets_what_is_left_of_the_deadline(monkeypatch):
+    import time
+
+    from app.api import endpoints
+    from app.core.admission import ARRIVED_AT
+
+    budgets = []
+
+    async def run_quick_analysis(content, content_type, metadata, deadline_seconds=None):
+        budgets.append(deadline_seconds)
+        return {"ok": True}
+
+    monkeypatch.setattr(endpoints, "_run_quick_analysis", run_quick_analysis)
+    scope = {"type": "http", "method": "POST", "path": "/quick-analyze", "headers": [],
+             "query_string": b"", ARRIVED_AT: time.monotonic() - 1.0}
+    body = endpoints.QuickAnalysisRequest(content="claim", content_type="text", deadline_ms=3000)
+    asyncio.run(endpoints.quick_analyze(body, Request(scope)))
+    assert 1.9 < budgets[0] < 2.01
+
+
+def test_quick_upload_releases_its_buffer_before_closing(monkeypatch, caplog):
+    import tempfile
+
+    from app.api import endpoints
+    from app.core.uploads import StoredUpload
+
+    spooled = tempfile.TemporaryFile()
+    spooled.write(b"\xff\xd8" + b"\x00" * 4096)
+    upload = StoredUpload(spooled, 4098, "image", "image/jpeg", "photo.jpg")
+
+    async def receive_upload(request, content_type):
+        return upload
+
+    async def run_quick_analysis(content, content_type, metadata, deadline_seconds):
+        assert isinstance(content, memoryview)
+        return {"verdict": "REAL"}
+
+    monkeypatch.setattr(endpoints, "_receive_upload", receive_upload)
+    monkeypatch.setattr(endpoints, "_run_quick_analysis", run_quick_analysis)
+    request = _multipart_request(b"")
+    request.scope["path"] = "/quick-analyze/upload"
+    assert asyncio.run(endpoints.quick_analyze_upload(request)) == {"verdict": "REAL"}
+    assert spooled.closed
+    assert "live buffer views" not in caplog.text
+
+
+def test_multimodal_branches_hold_their_type_slot(monkeypatch):
+    from app.api import endpoints
+    from app.core.admission import AdmissionController
+    from app.core.config import settings
+
+    controller = AdmissionController()
+    monkeypatch.setattr(settings, "ADMISSION_TYPE_LIMITS", {"deep:video": 1})
+    monkeypatch.setattr(endpoints, "get_admission_controller", lambda: controller)
+    running, peak = [0], [0]
+
+    async def branch(content, content_type):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.02)
+        running[0] -= 1
+        return {"result": "ok", "agent_used": "video", "signal": None}
+
+    monkeypatch.setattr(endpoints, "_run_multimodal_branch", branch)
+    body = endpoints.MultimodalRequest(parts=[endpoints.MultimodalPart(content=f"v{i}", content_type="video")
+                                             for i in range(3)])
+    scope = {"type": "http", "method": "POST", "path": "/analyze/multimodal", "headers": [], "query_string": b""}
+    response = asyncio.run(endpoints.analyze_multimodal(body, Request(scope)))
+    assert peak[0] == 1
+    assert all(branch.error is None for branch in response.branches)
+    assert controller.get_stats()["deep:video"]["admitted"] == 3
+
+
+def _feedback_request(client: str, headers=()):
+    scope = {"type": "http", "method": "POST", "path": "/feedback", "query_string": b"",
+             "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+             "client": (client, 50000)}
+    return Request(scope)
+
+
+def test_submitters_are_keyed_and_not_plain_address_hashes(monkeypatch):
+    import hashlib
+
+    from app.api.endpoints import _submitter
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "SECRET_KEY", "test-secret")
+    monkeypatch.setattr(settings, "FEEDBACK_SUBMITTER_HEADER", "")
+    first = _submitter(_feedback_request("203.0.113.7"))
+    assert first == _submitter(_feedback_request("203.0.113.7"))
+    assert first != _submitter(_feedback_request("203.0.113.8"))
+    assert not hashlib.sha256(b"203.0.113.7").hexdigest().startswith(first)
+
+    monkeypatch.setattr(settings, "SECRET_KEY", "other-secret")
+    assert _submitter(_feedback_request("203.0.113.7")) != first
+
+
+def test_submitter_header_identifies_voters_behind_a_proxy(monkeypatch):
+    from app.api.endpoints import _submitter
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "FEEDBACK_SUBMITTER_HEADER", "X-Forwarded-For")
+    alice = _submitter(_feedback_request("10.0.0.1", [("X-Forwarded-For", "198.51.100.1")]))
+    bob = _submitter(_feedback_request("10.0.0.1", [("X-Forwarded-For", "spoofed, 198.51.100.2")]))
+    assert alice and bob and alice != bob
+    assert bob == _submitter(_feedback_request("10.0.0.1", [("X-Forwarded-For", "198.51.100.2")]))
+    assert _submitter(_feedback_request("10.0.0.1")) is None
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain")
+
+from app.core import feedback_learning
+from app.core.config import settings
+from app.core.feedback_learning import FeedbackConsolidator, decide
+from app.core.verdict_cache import VerdictCache
+
+CLAIM = "Drinking bleach cures the flu"
+
+
+class FakeStorage:
+    def __init__(self, analyses, feedback):
+        self.analyses = analyses
+        self.feedback = feedback
+
+    def get_analyses_by_ids(self, analysis_ids):
+        return {i: self.analyses[i] for i in analysis_ids if i in self.analyses}
+
+    def get_all_feedback(self):
+        return self.feedback
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.added = []
+
+    def find_exact(self, text):
+        return None
+
+    def add_batch(self, texts, metadatas):
+        self.added.extend(zip(texts, metadatas))
+        return len(texts)
+
+
+@pytest.fixture
+def consolidate(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "FEEDBACK_MIN_VOTES", 3)
+    monkeypatch.setattr(settings, "FEEDBACK_MIN_AGREEMENT", 0.8)
+    monkeypatch.setattr(settings, "FEEDBACK_MIN_CONFIDENCE", 3)
+    monkeypatch.setattr(settings, "FEEDBACK_REVIEW_PATH", str(tmp_path / "review.json"))
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(feedback_learning, "get_embeddings_manager", lambda: embeddings)
+    monkeypatch.setattr(feedback_learning, "get_forensics", lambda: None)
+
+    def run(feedback, analyses=None):
+        analyses = analyses if analyses is not None else {
+            "a1": {"content_type": "text", "content_digest": VerdictCache.digest(CLAIM, "text")}
+        }
+        monkeypatch.setattr(feedback_learning, "get_storage", lambda: FakeStorage(analyses, feedback))
+        stats = FeedbackConsolidator().consolidate()
+        review = json.loads((tmp_path / "review.json").read_text())
+        return stats, embeddings.added, review
+
+    return run
+
+
+def vote(submitter, verdict="FAKE", analysis_id="a1", content=CLAIM):
+    return {"analysis_id": analysis_id, "original_content": content, "user_verdict": verdict,
+            "user_confidence": 5, "submitter": submitter}
+
+
+def test_decide_needs_votes_agreement_and_confidence(monkeypatch):
+    monkeypatch.setattr(settings, "FEEDBACK_MIN_VOTES", 3)
+    monkeypatch.setattr(settings, "FEEDBACK_MIN_AGREEMENT", 0.8)
+    monkeypatch.setattr(settings, "FEEDBACK_MIN_CONFIDENCE", 3)
+    assert decide({"FAKE": [5, 5, 5]}) == "FAKE"
+    assert decide({"FAKE": [5, 5]}) is None
+    assert decide({"FAKE": [5, 5, 5], "VERIFIED": [5, 5]}) is None
+    assert decide({"FAKE": [1, 1, 2]}) is None
+
+
+def test_distinct_submitters_confirm_a_claim(consolidate):
+    stats, added, review = consolidate([vote("u1"), vote("u2"), vote("u3")])
+    assert stats["claims_added"] == 1
+    assert added[0][0] == CLAIM and added[0][1]["verdict"] == "FAKE"
+    assert review == []
+
+
+def test_one_vote_per_submitter(consolidate):
+    stats, added, _ = consolidate([vote("u1"), vote("u1"), vote("u1"), vote("u2")])
+    assert stats["claims_added"] == 0 and added == []
+
+
+def test_feedback_must_match_a_stored_analysis(consolidate):
+    other = "The moon landing was staged"
+    stats, added, _ = consolidate([
+        vote("u1", analysis_id="missing"),
+        vote("u2", analysis_id=None),
+        vote("u3", content=other),
+    ])
+    assert stats["claims_added"] == 0 and added == []
+
+
+def test_verified_claims_are_queued_for_review(consolidate):
+    stats, added, review = consolidate([vote(u, verdict="VERIFIED") for u in ("u1", "u2", "u3")])
+    assert added == []
+    assert stats["pending_review"] == 1
+    assert review[0]["text"] == CLAIM and review[0]["verdict"] == "VERIFIED"
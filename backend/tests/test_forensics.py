@@ -0,0 +1,36 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.core.forensics import ImageForensics
+
+
+def _png(shade: int) -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (48, 48), (shade, shade, shade)).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.fixture
+def forensics(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FORENSICS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "FORENSICS_KNOWN_HASHES_PATH", str(tmp_path / "known.json"))
+    forensics = ImageForensics()
+    yield forensics
+    forensics.close()
+
+
+def test_iter_images_yields_every_image_once(forensics, monkeypatch):
+    monkeypatch.setattr(settings, "FORENSICS_PROCESS_WORKERS", 0)
+    results = dict(forensics.iter_images([_png(10), "not an image", _png(200)]))
+    assert sorted(results) == [0, 1, 2]
+    assert "error" in results[1]
+    assert results[0]["pixel_forensics"] is not None
+
+
+def test_worker_processes_are_spawned(forensics, monkeypatch):
+    monkeypatch.setattr(settings, "FORENSICS_PROCESS_WORKERS", 1)
+    assert forensics._process_pool()._mp_context.get_start_method() == "spawn"
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.jobs import JobQueue, JobWorkers, check_webhook_url
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def _expire_leases(queue: JobQueue):
+    with queue._lock:
+        queue._conn.execute("UPDATE jobs SET lease_until = ?", (time.time() - 1,))
+
+
+def test_claim_takes_the_highest_priority_job_once(queue):
+    low = queue.submit("text", {"content": "a"}, priority=0)
+    high = queue.submit("text", {"content": "b"}, priority=5)
+    assert queue.claim("text")["id"] == high
+    assert queue.claim("text")["id"] == low
+    assert queue.claim("text") is None
+
+
+def test_failed_attempts_are_retried_then_failed(queue, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BASE_SECONDS", 0.0)
+    job_id = queue.submit("text", {"content": "a"})
+    job = queue.claim("text")
+    assert queue.fail(job_id, "boom", job["attempts"]) is True
+    job = queue.claim("text")
+    assert job["attempts"] == 2
+    assert queue.fail(job_id, "boom", job["attempts"]) is False
+    assert queue.get(job_id)["status"] == "failed"
+
+
+def test_recover_leaves_jobs_leased_by_a_live_process(queue):
+    queue.submit("text", {"content": "a"})
+    queue.claim("text")
+    assert queue.recover() == 0
+    assert queue.claim("text") is None
+
+
+def test_recover_requeues_expired_leases(queue, tmp_path):
+    job_id = queue.submit("text", {"content": "a"})
+    queue.claim("text")
+    _expire_leases(queue)
+    assert queue.recover() == 1
+
+    other = JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    try:
+        assert other.claim("text")["id"] == job_id
+        # The first process no longer holds the job, so its late result is discarded
+        assert not queue.complete(job_id, {"result": "late"})
+        assert other.complete(job_id, {"result": "ok"})
+    finally:
+        other.close()
+    assert queue.get(job_id)["result"] == {"result": "ok"}
+
+
+def test_recover_fails_jobs_without_attempts_left(queue):
+    job_id = queue.submit("text", {"content": "a"})
+    for _ in range(2):
+        queue.claim("text")
+        _expire_leases(queue)
+        queue.recover()
+    assert queue.get(job_id)["status"] == "failed"
+    assert queue.claim("text") is None
+
+
+def test_renew_extends_the_lease(queue):
+    job_id = queue.submit("text", {"content": "a"})
+    queue.claim("text")
+    _expire_leases(queue)
+    queue.renew([job_id])
+    assert queue.recover() == 0
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "http://127.0.0.1/hook",
+    "http://localhost:8000/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.1.2.3/hook",
+    "http://[::1]/hook",
+])
+def test_webhooks_to_internal_addresses_are_refused(url):
+    with pytest.raises(ValueError):
+        asyncio.run(check_webhook_url(url))
+
+
+def test_webhook_allowlist(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_ALLOWED_HOSTS", ["hooks.example.com"])
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_ALLOW_PRIVATE", True)
+    asyncio.run(check_webhook_url("https://hooks.example.com/cb"))
+    with pytest.raises(ValueError):
+        asyncio.run(check_webhook_url("https://other.example.com/cb"))
+
+
+def test_webhook_delivery_does_not_hold_the_worker(queue, monkeypatch):
+    async def handler(content_type, payload):
+        return {"ok": True}
+
+    workers = JobWorkers(queue, handler)
+
+    async def run():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_delivery(job, body):
+            started.set()
+            await release.wait()
+
+        monkeypatch.setattr(workers, "_deliver", slow_delivery)
+        workers._client = object()
+        queue.submit("text", {"content": "a"}, webhook_url="https://hooks.example.com/cb")
+        await workers._run(queue.claim("text"))
+        await started.wait()
+        pending = len(workers._deliveries)
+        release.set()
+        await asyncio.sleep(0)
+        return pending
+
+    assert asyncio.run(run()) == 1
+    assert workers.get_stats()["succeeded"] == 1
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("faiss")
+
+from app.agents.quick_agent import QuickAnalyzer
+from app.core.deadline import Deadline
+
+
+def _forensics(complete: bool):
+    return {
+        "verdict": "AUTHENTIC",
+        "manipulation_score": 0.1,
+        "exif": {"has_exif": True},
+        "pixel_forensics": {"complete": complete, "ela": {"score": 0.1}}
+    }
+
+
+def _analyze(forensics_result):
+    analyzer = QuickAnalyzer.__new__(QuickAnalyzer)
+    return asyncio.run(analyzer.analyze_image("", Deadline(5.0), forensics_result))
+
+
+def test_incomplete_pixel_pass_is_reported_as_skipped():
+    result = _analyze(_forensics(complete=False))
+    assert "pixel_forensics" in result["skipped_stages"]
+
+
+def test_complete_pixel_pass_skips_nothing():
+    result = _analyze(_forensics(complete=True))
+    assert result["skipped_stages"] == []
+
+
+class _Embeddings:
+    def find_exact(self, text):
+        return None
+
+    def encode_batch(self, texts, batch_size):
+        import numpy as np
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+    def search_similar_batch(self, embeddings, k, threshold):
+        return [[{"similarity": 0.99, "match": {"text": "known", "verdict": "FAKE"}}] for _ in embeddings]
+
+
+class _SlowForensics:
+    def iter_images(self, images, time_budget=None, timeout=None):
+        import time
+        for i, _ in enumerate(images):
+            time.sleep(0.2)
+            yield i, _forensics(complete=True)
+
+
+def test_batch_streams_text_results_before_slow_image_forensics():
+    analyzer = QuickAnalyzer.__new__(QuickAnalyzer)
+    analyzer.embeddings = _Embeddings()
+    analyzer.forensics = _SlowForensics()
+    analyzer.summary_cache = None
+    items = [{"content": "img", "content_type": "image"},
+             {"content": "claim", "content_type": "text"},
+             {"content": "img", "content_type": "image"}]
+
+    async def run():
+        return [index async for index, _ in analyzer.analyze_batch(items, deadline_seconds=5.0)]
+
+    assert asyncio.run(run()) == [1, 0, 2]
+
+
+def test_batch_items_are_admitted_per_type():
+    from app.core.admission import AdmissionRejected, Ticket
+
+    analyzer = QuickAnalyzer.__new__(QuickAnalyzer)
+    analyzer.embeddings = _Embeddings()
+    analyzer.forensics = _SlowForensics()
+    analyzer.summary_cache = None
+    items = [{"content": "img", "content_type": "image"},
+             {"content": "claim", "content_type": "text"}]
+    admitted = []
+
+    async def admit(content_type, seconds):
+        admitted.append((content_type, seconds <= 5.0))
+        if content_type == "image":
+            raise AdmissionRejected("quick:image", 429, 1.0, "queue full")
+        return Ticket(None)
+
+    async def run():
+        return {index: result async for index, result in analyzer.analyze_batch(items, 5.0, admit)}
+
+    results = asyncio.run(run())
+    assert sorted(admitted) == [("image", True), ("text", True)]
+    assert "quick:image" in results[0]["error"] and "error" not in results[1]
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import httpx
+
+from app.core.huggingface import HuggingFaceClient
+from app.core.resilience import CircuitBreaker, hedged
+
+
+def _half_open(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(cooldown=0.01)
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker("m", failure_threshold=2, cooldown_seconds=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker("m", failure_threshold=1)
+    _half_open(breaker)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_released_trial_lets_the_next_call_through():
+    breaker = CircuitBreaker("m", failure_threshold=1)
+    _half_open(breaker)
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+
+
+def test_cancelled_trial_call_does_not_wedge_the_breaker(monkeypatch):
+    client = HuggingFaceClient()
+    breaker = client._breaker("m")
+    _half_open(breaker)
+    started = asyncio.Event()
+
+    async def hang(model_id, payload, hedge):
+        started.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(client, "_send", hang)
+
+    async def run():
+        task = asyncio.ensure_future(client._query_upstream("m", {"inputs": "x"}, hedge=False))
+        await started.wait()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_unexpected_error_in_trial_reopens_the_breaker(monkeypatch):
+    client = HuggingFaceClient()
+    breaker = client._breaker("m")
+    _half_open(breaker)
+
+    async def broken(model_id, payload, hedge):
+        raise httpx.DecodingError("bad body")
+
+    monkeypatch.setattr(client, "_send", broken)
+    try:
+        asyncio.run(client._query_upstream("m", {"inputs": "x"}, hedge=False))
+    except httpx.DecodingError:
+        pass
+    assert breaker.state == "open"
+
+
+def test_cancelling_a_hedged_call_cancels_the_request():
+    cancelled = []
+
+    async def call():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        caller = asyncio.ensure_future(hedged(call, 10.0))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0)
+        # Checked before asyncio.run() cancels leftover tasks itself
+        return list(cancelled)
+
+    assert asyncio.run(run()) == [True]
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.core.huggingface import HuggingFaceClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = HuggingFaceClient()
+    client.cache = None
+    calls = []
+
+    async def upstream(model_id, payload, hedge=None):
+        calls.append(payload)
+        await asyncio.sleep(0.05)
+        return [{"label": "real", "score": 0.9}]
+
+    monkeypatch.setattr(client, "_query_upstream", upstream)
+    client.calls = calls
+    return client
+
+
+def test_concurrent_identical_queries_share_one_call(client):
+    async def run():
+        return await asyncio.gather(*(client.query("m", {"inputs": "x"}) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert len(client.calls) == 1
+    assert all(result == results[0] for result in results)
+    assert client.get_stats()["coalesced"] == 2
+    assert not client._inflight
+
+
+def test_cancelling_the_leader_does_not_fail_followers(client):
+    async def run():
+        leader = asyncio.ensure_future(client.query("m", {"inputs": "x"}))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(client.query("m", {"inputs": "x"}))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        return leader, result
+
+    leader, result = asyncio.run(run())
+    assert leader.cancelled()
+    assert result == [{"label": "real", "score": 0.9}]
+    assert len(client.calls) == 1
+
+
+def test_upstream_call_is_cancelled_once_every_caller_has_gone(client):
+    async def run():
+        callers = [asyncio.ensure_future(client.query("m", {"inputs": "x"})) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        task = client._inflight[client._cache_key("m", {"inputs": "x"})]
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not task.done()
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return task
+
+    task = asyncio.run(run())
+    assert task.cancelled()
+    assert not client._inflight and not client._waiters
+
+
+def test_errors_reach_every_caller(client, monkeypatch):
+    async def failing(model_id, payload, hedge=None):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(client, "_query_upstream", failing)
+
+    async def run():
+        return await asyncio.gather(*(client.query("m", {"inputs": "x"}) for _ in range(2)),
+                                    return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+
+
+def test_results_are_cached_on_disk(client, tmp_path):
+    from app.core.cache import TieredCache
+    client.cache = TieredCache(str(tmp_path), memory_entries=1)
+
+    asyncio.run(client.query("m", {"inputs": "x"}))
+    client.cache._memory.clear()
+    assert asyncio.run(client.query("m", {"inputs": "x"})) == [{"label": "real", "score": 0.9}]
+    assert len(client.calls) == 1
+    assert client.cache.get_stats()["disk_hits"] == 1
+
+
+def test_large_payloads_are_keyed_off_the_event_loop(client, monkeypatch):
+    import threading
+
+    from app.core import huggingface
+
+    threads = []
+    cache_key = HuggingFaceClient._cache_key
+
+    def key(model_id, payload):
+        threads.append(threading.current_thread() is threading.main_thread())
+        return cache_key(model_id, payload)
+
+    monkeypatch.setattr(client, "_cache_key", key)
+    big = {"inputs": "a" * (huggingface.CACHE_KEY_INLINE_BYTES + 1)}
+
+    async def run():
+        await client.query("m", {"inputs": "x"})
+        await asyncio.gather(client.query("m", big), client.query("m", big))
+
+    asyncio.run(run())
+    assert threads == [True, False, False]
+    assert len(client.calls) == 2
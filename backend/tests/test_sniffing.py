@@ -0,0 +1,45 @@
+import base64
+
+import pytest
+
+from app.core.sniffing import sniff, type_from_magic, type_from_mime
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 40
+WAV = b"RIFF\x00\x00\x00\x00WAVEfmt " + b"\x00" * 32
+MP4 = b"\x00\x00\x00\x18ftypisom" + b"\x00" * 36
+M4A = b"\x00\x00\x00\x18ftypM4A " + b"\x00" * 36
+
+
+@pytest.mark.parametrize("head, expected", [
+    (PNG, "image"),
+    (WAV, "audio"),
+    (MP4, "video"),
+    (M4A, "audio"),
+    (b"\xff\xfb\x90\x00", "audio"),
+    (b"plain bytes", None),
+])
+def test_magic_bytes(head, expected):
+    assert type_from_magic(head) == expected
+
+
+def test_mime_types():
+    assert type_from_mime("image/PNG") == "image"
+    assert type_from_mime("application/json") == "text"
+    assert type_from_mime("application/octet-stream") is None
+    assert type_from_mime(None) is None
+
+
+def test_data_url_uses_the_declared_mime_type():
+    assert sniff("data:audio/wav;base64," + base64.b64encode(WAV).decode()) == ("audio", "mime")
+
+
+def test_bare_base64_is_sniffed_by_magic_bytes():
+    assert sniff(base64.b64encode(PNG * 2).decode()) == ("image", "magic")
+
+
+def test_prose_is_text():
+    assert sniff("The moon landing was filmed in a studio, according to a viral post.") == ("text", "text")
+
+
+def test_unknown_base64_is_ambiguous():
+    assert sniff(base64.b64encode(b"\x01\x02\x03" * 40).decode()) == (None, "ambiguous")
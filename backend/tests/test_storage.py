@@ -0,0 +1,23 @@
+import threading
+
+from app.core.storage import UnifiedJSONStorage
+
+
+def test_concurrent_writers_keep_every_record(tmp_path):
+    storage = UnifiedJSONStorage(str(tmp_path / "data.json"))
+
+    def write(n):
+        for i in range(10):
+            if n % 2:
+                storage.save_analyses([{"content_type": "text", "n": n, "i": i}])
+            else:
+                storage.save_feedback({"user_verdict": "FAKE", "n": n, "i": i})
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = storage.get_stats()
+    assert stats["total_analyses"] == 30 and stats["total_feedback"] == 30
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.streaming import stream_to_workers
+
+
+def test_items_are_all_handled():
+    seen = []
+
+    async def handle(item):
+        await asyncio.sleep(0)
+        seen.append(item)
+
+    asyncio.run(stream_to_workers(lambda: (i for i in range(20)), handle, 3))
+    assert sorted(seen) == list(range(20))
+
+
+def test_a_failing_handler_stops_the_other_workers():
+    def items():
+        yield 0
+        # Still decoding when the handler fails
+        time.sleep(0.3)
+        yield from range(1, 6)
+
+    async def handle(item):
+        if item == 0:
+            await asyncio.sleep(0.05)
+            raise ValueError("bad item")
+        await asyncio.sleep(0.01)
+
+    async def run():
+        with pytest.raises(ValueError):
+            await stream_to_workers(items, handle, 3)
+        # No worker is left waiting for an end-of-stream marker that never comes
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain")
+
+from app.api.endpoints import _cacheable
+from app.core.verdict_cache import VerdictCache
+
+
+def test_text_digest_ignores_case_punctuation_and_spacing():
+    assert VerdictCache.digest("Vaccines  cause 5G!", "text") == VerdictCache.digest("vaccines cause 5g", "text")
+    assert VerdictCache.digest("vaccines cause 5g", "text") != VerdictCache.digest("vaccines cure 5g", "text")
+
+
+def test_image_digest_covers_the_decoded_bytes():
+    assert VerdictCache.digest(b"abc", "image") == VerdictCache.digest(b"abc", "image")
+    assert VerdictCache.digest(b"abc", "image") != VerdictCache.digest(b"abd", "image")
+
+
+def test_degraded_results_are_not_cached():
+    assert _cacheable({"skipped_stages": []})
+    assert not _cacheable({"skipped_stages": ["pixel_forensics"]})
@@ -0,0 +1,36 @@
+import asyncio
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("cv2")
+
+from app.agents import video_agent
+from app.core.video_fingerprint import VideoFingerprintIndex
+
+
+def test_verified_fingerprint_hits_skip_scoring_and_stay_in_the_cache_bound(tmp_path, monkeypatch):
+    fingerprint = np.random.default_rng(0).integers(0, 2 ** 63, 40, dtype=np.uint64)
+    index = VideoFingerprintIndex(str(tmp_path))
+    index.add(fingerprint, {"temporal_score": 1.0, "verdict": "FAKE"}, verified=True)
+
+    @contextmanager
+    def content_file(data):
+        yield data
+
+    async def no_scoring(*args):
+        raise AssertionError("frames were scored")
+
+    monkeypatch.setattr(video_agent, "get_video_fingerprint_index", lambda: index)
+    monkeypatch.setattr(video_agent, "content_file", content_file)
+    monkeypatch.setattr(video_agent, "compute_fingerprint", lambda path: fingerprint)
+    monkeypatch.setattr(video_agent, "stream_to_workers", no_scoring)
+    monkeypatch.setattr(video_agent, "_frame_score_cache", video_agent.OrderedDict())
+    monkeypatch.setattr(video_agent, "_FRAME_SCORE_CACHE_SIZE", 2)
+
+    for n in range(5):
+        summary = asyncio.run(video_agent.score_video_frames(f"upload://clip-{n}"))
+        assert summary["temporal_score"] == 1.0 and summary["fingerprint_match"]["verified"]
+    assert len(video_agent._frame_score_cache) == 2
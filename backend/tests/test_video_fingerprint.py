@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from app.core.config import settings
+from app.core.video_fingerprint import VideoFingerprintIndex
+
+
+def _video_fingerprint(seed: int, frames: int = 60) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 2 ** 63, frames, dtype=np.uint64)
+
+
+def test_video_lookup_finds_a_trimmed_copy(tmp_path):
+    index = VideoFingerprintIndex(str(tmp_path))
+    index.add(_video_fingerprint(1), {"verdict": "FAKE"})
+    video_id = index.add(_video_fingerprint(2), {"verdict": "REAL"}, verified=True)
+
+    match = index.lookup(_video_fingerprint(2)[20:40])
+    assert match["id"] == video_id and match["verified"] is True
+    assert match["offset_seconds"] == 20 / settings.VIDEO_FINGERPRINT_FPS
+    assert index.lookup(_video_fingerprint(3)) is None
+
+
+def test_video_index_survives_a_reload(tmp_path):
+    index = VideoFingerprintIndex(str(tmp_path))
+    index.add(_video_fingerprint(1), {"verdict": "FAKE"})
+    index.add(_video_fingerprint(2), {"verdict": "REAL"})
+    index.flush()
+
+    reloaded = VideoFingerprintIndex(str(tmp_path))
+    assert reloaded.get_stats()["videos"] == 2
+    assert reloaded.lookup(_video_fingerprint(1)[10:])["verdict"] == "FAKE"
+
+
+def _write_video(path, seed: int, frames: int = 40):
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (64, 48))
+    for _ in range(frames // 10):
+        # Scenes of ten identical frames keep the hashes stable across sampling
+        scene = cv2.resize(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8), (64, 48), interpolation=cv2.INTER_NEAREST)
+        for _ in range(10):
+            writer.write(scene)
+    writer.release()
+
+
+def test_known_media_are_seeded_verified_once(tmp_path, monkeypatch):
+    import json
+
+    from app.core import known_media, video_fingerprint
+
+    index = VideoFingerprintIndex(str(tmp_path / "index"))
+    monkeypatch.setattr(video_fingerprint, "_video_fingerprint_index", index)
+    _write_video(tmp_path / "hoax.avi", 1)
+    manifest = tmp_path / "known_media.json"
+    manifest.write_text(json.dumps([
+        {"path": "hoax.avi", "type": "video", "verdict": "FAKE", "source": "fact-check"},
+        {"path": "missing.avi", "type": "video", "verdict": "FAKE"}
+    ]))
+
+    assert known_media.load_known_media(str(manifest)) == {"added": 1, "skipped": 0, "failed": 1}
+    assert known_media.load_known_media(str(manifest))["skipped"] == 1
+    assert index.verified == 1
+
+    match = index.lookup(video_fingerprint.compute_fingerprint(str(tmp_path / "hoax.avi")))
+    assert match["verified"] is True and match["verdict"] == "FAKE" and match["temporal_score"] == 1.0